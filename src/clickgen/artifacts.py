@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from abc import ABCMeta, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+KEY = re.compile(r"^[0-9a-f]{40}$")
+
+# A server scans its directory for eviction once every 'EVICT_EVERY' uploads
+EVICT_EVERY = 64
+
+
+class ArtifactCache(metaclass=ABCMeta):
+    """Finished Xcursor, CUR and ANI files shared between builds.
+
+    Artifacts are addressed by ``render_key()``, a hash of a cursor's input
+    bitmaps, its resolved settings and the clickgen version, so themes
+    built on other machines, or color variants sharing bitmaps, reuse each
+    other's cursors. ``hits`` and ``misses`` count the lookups. The cache
+    can be shared between threads.
+    """
+
+    hits: int
+    misses: int
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _put(self, key: str, data: bytes) -> None:
+        raise NotImplementedError()
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self._get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        self._put(key, data)
+
+    def evict(self) -> int:
+        """Drop expired artifacts, returns how many were removed."""
+        return 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class DirectoryCache(ArtifactCache):
+    """Artifacts stored as files in a directory, which can be on a shared
+    or CI-cached volume.
+
+    ``evict()`` removes artifacts not used for ``max_age`` seconds, then the
+    least recently used ones until the directory holds at most ``max_size``
+    bytes. Reading an artifact marks it as used.
+    """
+
+    path: Path
+    max_size: Optional[int]
+    max_age: Optional[float]
+
+    def __init__(
+        self,
+        path: Path,
+        max_size: Optional[int] = None,
+        max_age: Optional[float] = None,
+    ) -> None:
+        super().__init__()
+        self.path = path
+        self.max_size = max_size
+        self.max_age = max_age
+
+    def _path(self, key: str) -> Path:
+        if not KEY.match(key):
+            raise ValueError(f"Invalid artifact key: {key!r}")
+        return self.path / key[:2] / key
+
+    def _get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def _put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Written aside and renamed, so readers never see a partial file
+        tmp = path.with_name(f".{key}.{os.getpid()}.{threading.get_ident()}")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries: List[Tuple[float, int, Path]] = []
+        for path in self.path.glob("*/*"):
+            if not KEY.match(path.name):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self) -> int:
+        entries = self._entries()
+        removed: List[Path] = []
+
+        if self.max_age is not None:
+            expires = time.time() - self.max_age
+            removed.extend(p for mtime, _, p in entries if mtime < expires)
+            entries = [e for e in entries if e[0] >= expires]
+
+        if self.max_size is not None:
+            size = sum(e[1] for e in entries)
+            for _, entry_size, path in entries:
+                if size <= self.max_size:
+                    break
+                removed.append(path)
+                size -= entry_size
+
+        for path in removed:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        return len(removed)
+
+
+class HTTPCache(ArtifactCache):
+    """Artifacts on an HTTP server, fetched with ``GET <url>/<key>`` and
+    uploaded with ``PUT <url>/<key>``, as served by ``serve_artifacts()``.
+
+    An unreachable server is treated as a miss, it doesn't fail the build.
+    """
+
+    url: str
+    timeout: float
+
+    def __init__(self, url: str, timeout: float = 10) -> None:
+        super().__init__()
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _get(self, key: str) -> Optional[bytes]:
+        try:
+            with urllib.request.urlopen(
+                f"{self.url}/{key}", timeout=self.timeout
+            ) as res:
+                data: bytes = res.read()
+                return data
+        except (urllib.error.URLError, OSError):
+            return None
+
+    def _put(self, key: str, data: bytes) -> None:
+        req = urllib.request.Request(f"{self.url}/{key}", data=data, method="PUT")
+        try:
+            urllib.request.urlopen(req, timeout=self.timeout).close()
+        except (urllib.error.URLError, OSError):
+            pass
+
+
+def open_artifact_cache(
+    location: str, max_size: Optional[int] = None, max_age: Optional[float] = None
+) -> ArtifactCache:
+    """``HTTPCache`` for an http(s) URL, ``DirectoryCache`` otherwise.
+    Eviction limits only apply to directories."""
+    if location.startswith(("http://", "https://")):
+        return HTTPCache(location)
+    return DirectoryCache(Path(location), max_size, max_age)
+
+
+class ArtifactRequestHandler(BaseHTTPRequestHandler):
+    server: "ArtifactServer"
+
+    def _key(self) -> Optional[str]:
+        key = self.path.strip("/")
+        if KEY.match(key):
+            return key
+        self.send_error(400, "Invalid artifact key")
+        return None
+
+    def do_GET(self) -> None:
+        key = self._key()
+        if key is None:
+            return
+
+        data = self.server.cache.get(key)
+        if data is None:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_PUT(self) -> None:
+        key = self._key()
+        if key is None:
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        self.server.cache.put(key, self.rfile.read(length))
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        self.server.uploaded()
+
+
+class ArtifactServer(ThreadingHTTPServer):
+    cache: DirectoryCache
+
+    def __init__(self, address: Tuple[str, int], cache: DirectoryCache) -> None:
+        super().__init__(address, ArtifactRequestHandler)
+        self.cache = cache
+        self._uploads = 0
+        self._lock = threading.Lock()
+
+    def uploaded(self) -> None:
+        with self._lock:
+            self._uploads += 1
+            if self._uploads % EVICT_EVERY == 0:
+                self.cache.evict()
+
+
+def serve_artifacts(
+    path: Path,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_size: Optional[int] = None,
+    max_age: Optional[float] = None,
+) -> ArtifactServer:
+    """HTTP artifact cache backed by a directory, to stand in for a shared
+    cache. Call ``serve_forever()`` on the returned server to run it."""
+    cache = DirectoryCache(path, max_size, max_age)
+    cache.evict()
+    return ArtifactServer((host, port), cache)
@@ -0,0 +1,43 @@
+from abc import ABCMeta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from _typeshed import Incomplete
+
+KEY: Incomplete
+EVICT_EVERY: int
+
+class ArtifactCache(metaclass=ABCMeta):
+    hits: int
+    misses: int
+    def __init__(self) -> None: ...
+    def get(self, key: str) -> bytes | None: ...
+    def put(self, key: str, data: bytes) -> None: ...
+    def evict(self) -> int: ...
+    @property
+    def hit_rate(self) -> float: ...
+
+class DirectoryCache(ArtifactCache):
+    path: Path
+    max_size: int | None
+    max_age: float | None
+    def __init__(self, path: Path, max_size: int | None = None, max_age: float | None = None) -> None: ...
+    def evict(self) -> int: ...
+
+class HTTPCache(ArtifactCache):
+    url: str
+    timeout: float
+    def __init__(self, url: str, timeout: float = 10) -> None: ...
+
+def open_artifact_cache(location: str, max_size: int | None = None, max_age: float | None = None) -> ArtifactCache: ...
+
+class ArtifactRequestHandler(BaseHTTPRequestHandler):
+    server: ArtifactServer
+    def do_GET(self) -> None: ...
+    def do_PUT(self) -> None: ...
+
+class ArtifactServer(ThreadingHTTPServer):
+    cache: DirectoryCache
+    def __init__(self, address: tuple[str, int], cache: DirectoryCache) -> None: ...
+    def uploaded(self) -> None: ...
+
+def serve_artifacts(path: Path, host: str = '127.0.0.1', port: int = 8000, max_size: int | None = None, max_age: float | None = None) -> ArtifactServer: ...
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import heapq
+import os
+from collections import Counter
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from clickgen.configparser import CursorSpec, render_cursor, write_cursor
+from clickgen.parser import ImageCache
+from clickgen.writer.windows import EntryCache
+
+# Bitmap caches of a worker process, shared by all tasks it runs
+_cache: Optional[ImageCache] = None
+_entry_cache: Optional[EntryCache] = None
+
+
+def render_platform(
+    spec: CursorSpec,
+    platform: str,
+    cache: Optional[ImageCache] = None,
+    entry_cache: Optional[EntryCache] = None,
+) -> bytes:
+    """Rendered cursor file of ``spec`` on ``platform``."""
+    c = render_cursor(spec, cache, entry_cache, [platform])
+    blob = c.x11_cursor if platform == "x11" else c.win_cursor
+    if blob is None:
+        raise ValueError(f"Cursor '{spec.name}' has no {platform} name")
+    return blob
+
+
+def write_platform(
+    spec: CursorSpec,
+    platform: str,
+    out_dir: Path,
+    cache: Optional[ImageCache] = None,
+    entry_cache: Optional[EntryCache] = None,
+) -> Path:
+    """Render ``spec`` on ``platform`` straight into its file in ``out_dir``,
+    returns the file's path.
+
+    The file is written aside and renamed, so a failed render never leaves
+    a partial cursor behind, and an earlier symlink of that name is
+    replaced instead of followed.
+    """
+    tmp = out_dir / f".{spec.name}.{platform}.{os.getpid()}"
+    try:
+        with open(tmp, "wb") as fp:
+            name = write_cursor(spec, platform, fp, cache, entry_cache)
+        path = out_dir / name
+        os.replace(tmp, path)
+    finally:
+        try:
+            tmp.unlink()
+        except FileNotFoundError:
+            pass
+    return path
+
+
+def write_platforms(
+    specs: List[CursorSpec],
+    platform: str,
+    out_dir: Path,
+    cache: Optional[ImageCache] = None,
+    entry_cache: Optional[EntryCache] = None,
+) -> List[Path]:
+    """``write_platform()`` for several cursors sharing the same caches."""
+    return [write_platform(s, platform, out_dir, cache, entry_cache) for s in specs]
+
+
+def init_worker() -> None:
+    global _cache, _entry_cache
+    _cache = ImageCache()
+    _entry_cache = EntryCache()
+
+
+def write_task(
+    spec: CursorSpec, platform: str, out_dir: Path, release: bool = False
+) -> Path:
+    """``write_platform()`` with the caches of the calling worker process,
+    only the path is sent back to the parent. With ``release`` the cursor's
+    bitmaps and encoded entries are dropped from the worker's caches once
+    written, so a worker only holds the cursor it renders."""
+    return write_group([spec], platform, out_dir, release)[0]
+
+
+def write_group(
+    specs: List[CursorSpec], platform: str, out_dir: Path, release: bool = False
+) -> List[Path]:
+    """``write_task()`` for cursors sharing bitmaps, see ``group_by_bitmaps()``.
+    They are written one after the other on the calling worker process, so
+    they share its caches, and with ``release`` their bitmaps and encoded
+    entries are dropped once all of them are written."""
+    global _entry_cache
+    if _cache is None:
+        init_worker()
+    assert _cache is not None
+    paths = write_platforms(specs, platform, out_dir, _cache, _entry_cache)
+    if release:
+        for key in {key for spec in specs for key in spec.digests}:
+            _cache.release(key)
+        _entry_cache = EntryCache()
+    return paths
+
+
+def group_by_bitmaps(specs: List[CursorSpec]) -> List[List[CursorSpec]]:
+    """``specs`` grouped so that cursors sharing a bitmap, directly or through
+    other cursors, are in the same group. Groups are ordered by their first
+    cursor."""
+    groups: List[List[CursorSpec]] = []
+    owners: Dict[str, int] = {}
+    for spec in specs:
+        found = sorted({owners[key] for key in spec.digests if key in owners})
+        if found:
+            group = found[0]
+            for other in found[1:]:
+                for member in groups[other]:
+                    owners.update(dict.fromkeys(member.digests, group))
+                groups[group].extend(groups[other])
+                groups[other] = []
+        else:
+            group = len(groups)
+            groups.append([])
+
+        groups[group].append(spec)
+        owners.update(dict.fromkeys(spec.digests, group))
+    return [g for g in groups if g]
+
+
+def process_pool(jobs: int = 0) -> ProcessPoolExecutor:
+    """Pool of ``jobs`` worker processes for ``write_task()``, one per CPU
+    for 0."""
+    return ProcessPoolExecutor(jobs or os.cpu_count(), initializer=init_worker)
+
+
+class BitmapRefs:
+    """Count of pending renders using each bitmap, by its ``CursorSpec``
+    digest, to drop a bitmap and its resamples from an ``ImageCache`` once
+    its last render is done."""
+
+    def __init__(self, cache: ImageCache) -> None:
+        self.cache = cache
+        self._refs: Counter[str] = Counter()
+
+    def acquire(self, spec: CursorSpec) -> None:
+        self._refs.update(spec.digests)
+
+    def release(self, spec: CursorSpec) -> None:
+        for key in spec.digests:
+            self._refs[key] -= 1
+            if self._refs[key] <= 0:
+                del self._refs[key]
+                self.cache.release(key)
+
+
+class Task(NamedTuple):
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...]
+    cost: int
+    memory: int
+    deps: List[Hashable]
+    then: Optional[Callable[[Any], None]]
+    local: bool
+    skip: Optional[Callable[[], bool]]
+
+
+class TaskGraph:
+    """Tasks with dependencies, started heaviest first.
+
+    A task's ``fn`` runs on the executor given to ``run()``, so it has to be
+    picklable for a process pool, while ``local`` tasks (and every task
+    without an executor) run on the calling thread. ``then`` is called with
+    the result on the calling thread. A task becomes ready once all its
+    dependencies succeeded, and ready tasks are started by decreasing
+    ``cost``.
+
+    With a memory ``budget``, tasks sent to the executor are only started
+    while the estimated ``memory`` of those running stays within it,
+    smaller ready tasks going ahead of one that doesn't fit. A task above
+    the budget on its own still runs once nothing else does.
+
+    ``skip`` is called on the calling thread once a task is ready, a task
+    it returns true for isn't run and counts as succeeded, without its
+    ``then`` being called.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[Hashable, Task] = {}
+        self._dependents: Dict[Hashable, List[Hashable]] = {}
+
+        # State of the current 'run()'
+        self._pending: Dict[Hashable, int] = {}
+        self._order: Dict[Hashable, int] = {}
+        self._failed: Dict[Hashable, BaseException] = {}
+        self._ready: List[Tuple[int, int, Hashable]] = []
+        self._running: Dict["Future[Any]", Hashable] = {}
+        self._memory = 0
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def add(
+        self,
+        name: Hashable,
+        fn: Callable[..., Any],
+        *args: Any,
+        cost: int = 0,
+        memory: int = 0,
+        deps: Iterable[Hashable] = (),
+        then: Optional[Callable[[Any], None]] = None,
+        local: bool = False,
+        skip: Optional[Callable[[], bool]] = None,
+    ) -> Hashable:
+        """Add a task, its dependencies have to be added before it."""
+        if name in self._tasks:
+            raise ValueError(f"Duplicate task: {name!r}")
+        deps = list(deps)
+        for dep in deps:
+            if dep not in self._tasks:
+                raise KeyError(f"Unknown dependency of {name!r}: {dep!r}")
+            self._dependents[dep].append(name)
+
+        self._tasks[name] = Task(fn, args, cost, memory, deps, then, local, skip)
+        self._dependents[name] = []
+        return name
+
+    def _push(self, name: Hashable) -> None:
+        heapq.heappush(self._ready, (-self._tasks[name].cost, self._order[name], name))
+
+    def _fail(self, name: Hashable, error: BaseException) -> None:
+        self._failed[name] = error
+        for dependent in self._dependents[name]:
+            if dependent not in self._failed:
+                self._fail(dependent, error)
+
+    def _finish(self, name: Hashable, result: Any) -> None:
+        task = self._tasks[name]
+        try:
+            if task.then is not None:
+                task.then(result)
+        except Exception as e:
+            self._fail(name, e)
+            return
+        self._release_dependents(name)
+
+    def _release_dependents(self, name: Hashable) -> None:
+        for dependent in self._dependents[name]:
+            self._pending[dependent] -= 1
+            if self._pending[dependent] == 0 and dependent not in self._failed:
+                self._push(dependent)
+
+    def _fits(
+        self, name: Hashable, executor: Optional[Executor], budget: Optional[int]
+    ) -> bool:
+        task = self._tasks[name]
+        if executor is None or task.local or budget is None or not self._running:
+            return True
+        return self._memory + task.memory <= budget
+
+    def _start(self, name: Hashable, executor: Optional[Executor]) -> None:
+        task = self._tasks[name]
+        if task.skip is not None and task.skip():
+            self._release_dependents(name)
+            return
+
+        if executor is not None and not task.local:
+            self._running[executor.submit(task.fn, *task.args)] = name
+            self._memory += task.memory
+            return
+
+        try:
+            result = task.fn(*task.args)
+        except Exception as e:
+            self._fail(name, e)
+        else:
+            self._finish(name, result)
+
+    def _start_ready(
+        self, executor: Optional[Executor], limit: Optional[int], budget: Optional[int]
+    ) -> None:
+        waiting: List[Tuple[int, int, Hashable]] = []
+        while self._ready and (limit is None or len(self._running) < limit):
+            item = heapq.heappop(self._ready)
+            if self._fits(item[2], executor, budget):
+                self._start(item[2], executor)
+            else:
+                waiting.append(item)
+
+        for item in waiting:
+            heapq.heappush(self._ready, item)
+
+    def run(
+        self,
+        executor: Optional[Executor] = None,
+        limit: Optional[int] = None,
+        budget: Optional[int] = None,
+    ) -> Dict[Hashable, BaseException]:
+        """Run every task, at most ``limit`` of them on ``executor`` at once
+        and within a memory ``budget``.
+
+        Returns the error of every failed task. Tasks depending on a failed
+        task are skipped, and reported with the same error.
+        """
+        self._pending = {name: len(t.deps) for name, t in self._tasks.items()}
+        self._order = {name: i for i, name in enumerate(self._tasks)}
+        self._failed = {}
+        self._ready = []
+        self._running = {}
+        self._memory = 0
+
+        for name, count in self._pending.items():
+            if count == 0:
+                self._push(name)
+
+        while self._ready or self._running:
+            self._start_ready(executor, limit, budget)
+
+            if self._running:
+                done, _ = wait(self._running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = self._running.pop(future)
+                    self._memory -= self._tasks[name].memory
+                    error = future.exception()
+                    if error is None:
+                        self._finish(name, future.result())
+                    else:
+                        self._fail(name, error)
+
+        return self._failed
@@ -0,0 +1,37 @@
+from clickgen.configparser import CursorSpec as CursorSpec, render_cursor as render_cursor, write_cursor as write_cursor
+from clickgen.parser import ImageCache as ImageCache
+from clickgen.writer.windows import EntryCache as EntryCache
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Hashable, Iterable, NamedTuple
+
+def render_platform(spec: CursorSpec, platform: str, cache: ImageCache | None = None, entry_cache: EntryCache | None = None) -> bytes: ...
+def write_platform(spec: CursorSpec, platform: str, out_dir: Path, cache: ImageCache | None = None, entry_cache: EntryCache | None = None) -> Path: ...
+def write_platforms(specs: list[CursorSpec], platform: str, out_dir: Path, cache: ImageCache | None = None, entry_cache: EntryCache | None = None) -> list[Path]: ...
+def init_worker() -> None: ...
+def write_task(spec: CursorSpec, platform: str, out_dir: Path, release: bool = False) -> Path: ...
+def write_group(specs: list[CursorSpec], platform: str, out_dir: Path, release: bool = False) -> list[Path]: ...
+def group_by_bitmaps(specs: list[CursorSpec]) -> list[list[CursorSpec]]: ...
+def process_pool(jobs: int = 0) -> ProcessPoolExecutor: ...
+
+class BitmapRefs:
+    cache: ImageCache
+    def __init__(self, cache: ImageCache) -> None: ...
+    def acquire(self, spec: CursorSpec) -> None: ...
+    def release(self, spec: CursorSpec) -> None: ...
+
+class Task(NamedTuple):
+    fn: Callable[..., Any]
+    args: tuple[Any, ...]
+    cost: int
+    memory: int
+    deps: list[Hashable]
+    then: Callable[[Any], None] | None
+    local: bool
+    skip: Callable[[], bool] | None
+
+class TaskGraph:
+    def __init__(self) -> None: ...
+    def __len__(self) -> int: ...
+    def add(self, name: Hashable, fn: Callable[..., Any], *args: Any, cost: int = 0, memory: int = 0, deps: Iterable[Hashable] = (), then: Callable[[Any], None] | None = None, local: bool = False, skip: Callable[[], bool] | None = None) -> Hashable: ...
+    def run(self, executor: Executor | None = None, limit: int | None = None, budget: int | None = None) -> dict[Hashable, BaseException]: ...
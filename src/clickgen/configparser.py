@@ -1,19 +1,27 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import hashlib
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Optional, TypeVar, Union
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, TypeVar, Union
 
 import toml
 import yaml
 from attr import dataclass
 
+import clickgen
+from clickgen.artifacts import ArtifactCache
 from clickgen.libs.colors import print_warning
-from clickgen.parser import open_blob
-from clickgen.parser.png import DELAY, SIZES
-from clickgen.writer.windows import to_win
-from clickgen.writer.x11 import to_x11
+from clickgen.parser import ImageCache, open_blob, probe_blobs, validate_blobs
+from clickgen.parser.base import BaseParser
+from clickgen.parser.png import DELAY, HEADER_SIZE, SIZES, parse_size
+from clickgen.writer.windows import EntryCache, to_win, write_win
+from clickgen.writer.x11 import to_x11, write_x11
+
+# Enough for the chunks in front of a PNG's first 'IDAT', an APNG's frame
+# count among them
+PROBE_SIZE = 4096
 
 
 @dataclass
@@ -77,9 +85,220 @@ class CursorSection:
     win_cursor: Union[bytes, None]
 
 
-def parse_cursors_section(
-    d: Dict[str, Any], config: ConfigSection, **kwargs
-) -> List[CursorSection]:
+@dataclass
+class CursorSpec:
+    """Everything needed to render a cursor, resolved from the config
+    without decoding any bitmap. ``files`` holds a list of files per source
+    resolution for source sets. ``source_pixels`` and ``source_frames`` are
+    read from the bitmap headers by ``probe_blobs()``, and ``digests`` are
+    the ``ImageCache`` keys of the ``bitmaps``."""
+
+    name: str
+    files: Union[List[Path], List[List[Path]]]
+    hotspot: Tuple[int, int]
+    x11_name: Union[str, None]
+    x11_symlinks: List[str]
+    x11_sizes: List[Union[int, str]]
+    x11_delay: int
+    win_name: Union[str, None]
+    win_sizes: List[Union[int, str]]
+    win_delay: int
+    pyramid: bool = False
+    lazy: bool = False
+    compression: str = "default"
+    dib_max_size: int = 0
+    source_pixels: int = 0
+    source_frames: int = 1
+    digests: Tuple[str, ...] = ()
+
+    @property
+    def frames(self) -> int:
+        files = self.files[0] if isinstance(self.files[0], list) else self.files
+        return len(files) * self.source_frames
+
+    @property
+    def bitmaps(self) -> List[Path]:
+        """Every bitmap file of the cursor, source sets flattened."""
+        files: List[Path] = []
+        for f in self.files:
+            files.extend(f if isinstance(f, list) else [f])
+        return files
+
+    def platform_work(self, platform: str) -> int:
+        """Estimated work units on ``platform``, the number of output pixels."""
+        if platform == "x11":
+            return estimate_work(self.frames, self.x11_sizes) if self.x11_name else 0
+        return estimate_work(self.frames, self.win_sizes) if self.win_name else 0
+
+    @property
+    def work(self) -> int:
+        """Estimated work units, the number of output pixels."""
+        return self.platform_work("x11") + self.platform_work("windows")
+
+    def platform_memory(self, platform: str) -> int:
+        """Estimated peak memory of rendering on ``platform``, in bytes."""
+        name, sizes = (
+            (self.x11_name, self.x11_sizes)
+            if platform == "x11"
+            else (self.win_name, self.win_sizes)
+        )
+        if not name:
+            return 0
+
+        # Animations are always resampled eagerly
+        lazy = self.lazy and self.source_frames == 1
+        return estimate_memory(
+            self.frames, sizes, self.source_pixels, self.pyramid, lazy
+        )
+
+
+def estimate_work(frames: int, sizes: List[Union[int, str]]) -> int:
+    return frames * sum(parse_size(s)[1] ** 2 for s in sizes)
+
+
+def estimate_memory(
+    frames: int,
+    sizes: List[Union[int, str]],
+    source_pixels: int,
+    pyramid: bool = False,
+    lazy: bool = False,
+) -> int:
+    """Peak memory of a render with every source and image held as RGBA,
+    and each image once more while it's encoded. A pyramid adds a third to
+    the sources, and ``lazy`` renders hold a single image at a time."""
+    sources = source_pixels * 4 // 3 if pyramid else source_pixels
+    images = [parse_size(s)[1] ** 2 for s in sizes]
+    if lazy:
+        return 4 * (sources + 2 * max(images, default=0))
+    return 4 * frames * (sources + 2 * sum(images))
+
+
+# Settings the rendered cursor of each platform depends on
+RENDER_SETTINGS: Dict[str, List[str]] = {
+    "x11": ["hotspot", "x11_sizes", "x11_delay", "pyramid"],
+    "windows": [
+        "hotspot",
+        "win_sizes",
+        "win_delay",
+        "pyramid",
+        "compression",
+        "dib_max_size",
+    ],
+}
+
+
+def input_digest(spec: CursorSpec, platform: str, settings: List[str]) -> str:
+    """Hash of a cursor's input bitmaps and of its ``settings``, along with
+    the platform and the clickgen version."""
+    values = {k: getattr(spec, k) for k in settings}
+    digest = hashlib.sha1(
+        json.dumps(
+            [clickgen.__version__, platform, values],  # type: ignore
+            sort_keys=True,
+        ).encode()
+    )
+
+    sets = spec.files if isinstance(spec.files[0], list) else [spec.files]
+    for files in sets:
+        for f in files:  # type: ignore
+            blob = f.read_bytes()
+            digest.update(len(blob).to_bytes(8, "little"))
+            digest.update(blob)
+    return digest.hexdigest()
+
+
+def render_key(spec: CursorSpec, platform: str) -> str:
+    """Key of a cursor's rendered file in an ``ArtifactCache``."""
+    return input_digest(spec, platform, RENDER_SETTINGS[platform])
+
+
+def win_extension(blob: bytes) -> str:
+    return ".ani" if blob[:4] == b"RIFF" else ".cur"
+
+
+def glob_bitmaps(png: str, bitmaps_dir: Path) -> List[Path]:
+    files = sorted(bitmaps_dir.glob(png))
+
+    if not files:
+        raise FileNotFoundError(f"Bitmaps not found '{png}' in '{bitmaps_dir}'")
+    return files
+
+
+def read_bitmaps(
+    files: Union[List[Path], List[List[Path]]],
+) -> Union[List[bytes], List[List[bytes]]]:
+    """Bitmaps of a cursor, or of every resolution of a source set."""
+    if files and isinstance(files[0], list):
+        return [[f.read_bytes() for f in s] for s in files]  # type: ignore
+    return [f.read_bytes() for f in files]  # type: ignore
+
+
+def bitmap_digests(files: Union[List[Path], List[List[Path]]]) -> Tuple[str, ...]:
+    """``ImageCache`` keys of a cursor's bitmap files, source sets flattened."""
+    digests: List[str] = []
+    for f in files:
+        for path in f if isinstance(f, list) else [f]:
+            digests.append(ImageCache.digest(path.read_bytes()))
+    return tuple(digests)
+
+
+def read_headers(sets: List[List[Path]]) -> List[List[bytes]]:
+    """Headers of a cursor's bitmaps, as needed by ``validate_blobs()`` and
+    ``probe_blobs()``."""
+    heads: List[List[bytes]] = []
+    for files in sets:
+        heads.append([])
+        for f in files:
+            with f.open("rb") as fh:
+                # SVG sizes live in the root element, which can come after
+                # comments or a doctype, and GIFs only record their frame
+                # count by their frames, so both are read whole
+                if f.suffix in (".svg", ".gif"):
+                    heads[-1].append(fh.read())
+                else:
+                    heads[-1].append(fh.read(HEADER_SIZE if files[1:] else PROBE_SIZE))
+    return heads
+
+
+def _validate_cursor_bitmaps(
+    name: str,
+    png: Union[str, List[str]],
+    bitmaps_dir: Path,
+    hotspot: Tuple[int, int],
+    rgba: bool = False,
+) -> Tuple[Union[List[Path], List[List[Path]]], Tuple[int, int]]:
+    globs = png if isinstance(png, list) else [png]
+    sets = [glob_bitmaps(p, bitmaps_dir) for p in globs]
+    heads = read_headers(sets)
+    blobs = heads if isinstance(png, list) else heads[0]
+
+    try:
+        validate_blobs(blobs, hotspot, rgba)
+    except ValueError as e:
+        raise ValueError(f"Invalid bitmaps '{png}' in '{name}': {e}") from e
+
+    return (sets if isinstance(png, list) else sets[0]), probe_blobs(blobs)
+
+
+def validate_cursor_bitmaps(
+    name: str,
+    png: Union[str, List[str]],
+    bitmaps_dir: Path,
+    hotspot: Tuple[int, int],
+    rgba: bool = False,
+) -> Union[List[Path], List[List[Path]]]:
+    """Validate a cursor's bitmaps from their headers, 'png' is a glob or a
+    list of globs, one per source resolution. Returns the matched files."""
+    return _validate_cursor_bitmaps(name, png, bitmaps_dir, hotspot, rgba)[0]
+
+
+def parse_cursor_spec(
+    name: str,
+    v: Dict[str, Any],
+    fb: Dict[str, Any],
+    config: ConfigSection,
+    **kwargs,
+) -> CursorSpec:
     def get_value(k: str, def_val: Optional[T] = None) -> T:
         return kwargs.get(k, v.get(k, fb.get(k, def_val)))
 
@@ -89,54 +308,184 @@ def parse_cursors_section(
         elif isinstance(s, List):
             return s
 
-    result: List[CursorSection] = []
+    hotspot = (
+        get_value("x_hotspot"),
+        get_value("y_hotspot"),
+    )
+    files, (source_pixels, source_frames) = _validate_cursor_bitmaps(
+        name, v["png"], config.bitmaps_dir, hotspot
+    )
 
+    return CursorSpec(
+        name=name,
+        files=files,
+        hotspot=hotspot,
+        x11_name=v.get("x11_name"),
+        x11_symlinks=v.get("x11_symlinks", []),
+        x11_sizes=size_typing(get_value("x11_sizes", SIZES)),
+        x11_delay=get_value("x11_delay", DELAY),
+        win_name=v.get("win_name"),
+        win_sizes=size_typing(get_value("win_sizes", SIZES)),
+        win_delay=get_value("win_delay", DELAY),
+        pyramid=bool(get_value("pyramid", False)),
+        lazy=bool(get_value("lazy", False)),
+        compression=str(get_value("compression", "default")),
+        dib_max_size=int(get_value("dib_max_size", 0)),
+        source_pixels=source_pixels,
+        source_frames=source_frames,
+        digests=bitmap_digests(files),
+    )
+
+
+def plan_cursors_section(
+    d: Dict[str, Any], config: ConfigSection, **kwargs
+) -> List[CursorSpec]:
+    """Resolve and validate every cursor from the PNG headers, nothing is
+    rendered."""
     fb = d["cursors"]["fallback_settings"]
-    del d["cursors"]["fallback_settings"]
+    return [
+        parse_cursor_spec(k, v, fb, config, **kwargs)
+        for k, v in d["cursors"].items()
+        if k != "fallback_settings"
+    ]
+
+
+def _cached(
+    artifacts: Optional[ArtifactCache],
+    spec: CursorSpec,
+    platform: str,
+    render: Callable[[], bytes],
+) -> bytes:
+    if artifacts is None:
+        return render()
+
+    key = render_key(spec, platform)
+    data = artifacts.get(key)
+    if data is None:
+        data = render()
+        artifacts.put(key, data)
+    return data
+
+
+def open_cursor(
+    spec: CursorSpec, platform: str, cache: Optional[ImageCache] = None
+) -> BaseParser:
+    """Parser of a cursor's bitmaps at its sizes and delay on ``platform``."""
+    if platform == "x11":
+        sizes, delay = spec.x11_sizes, spec.x11_delay
+    else:
+        sizes, delay = spec.win_sizes, spec.win_delay
+
+    return open_blob(
+        read_bitmaps(spec.files),
+        spec.hotspot,
+        sizes,  # type: ignore
+        delay,
+        cache,
+        spec.pyramid,
+        spec.lazy,
+    )
 
-    for _, v in d["cursors"].items():
-        hotspot = (
-            get_value("x_hotspot"),
-            get_value("y_hotspot"),
+
+def render_cursor(
+    spec: CursorSpec,
+    cache: Optional[ImageCache] = None,
+    entry_cache: Optional[EntryCache] = None,
+    platforms: Optional[List[str]] = None,
+    artifacts: Optional[ArtifactCache] = None,
+) -> CursorSection:
+    """Render a cursor for ``platforms``, or for every platform it names.
+
+    Rendered files are looked up in ``artifacts`` first, and stored there
+    once rendered.
+    """
+    platforms = ["x11", "windows"] if platforms is None else platforms
+
+    def render_x11() -> bytes:
+        return to_x11(open_cursor(spec, "x11", cache).platform_frames("x11"))
+
+    def render_win() -> bytes:
+        _, blob = to_win(
+            open_cursor(spec, "windows", cache).platform_frames("windows"),
+            compression=spec.compression,
+            cache=entry_cache,
+            dib_max_size=spec.dib_max_size,
         )
-        x11_delay = get_value("x11_delay", DELAY)
-        win_delay = get_value("win_delay", DELAY)
+        return blob
+
+    x11_cursor = None
+    x11_cursor_name = None
+    if spec.x11_name and "x11" in platforms:
+        x11_cursor = _cached(artifacts, spec, "x11", render_x11)
+        x11_cursor_name = spec.x11_name
+
+    win_cursor = None
+    win_cursor_name = None
+    if spec.win_name and "windows" in platforms:
+        win_cursor = _cached(artifacts, spec, "windows", render_win)
+        win_cursor_name = spec.win_name + win_extension(win_cursor)
+
+    return CursorSection(
+        x11_cursor=x11_cursor,
+        x11_cursor_name=x11_cursor_name,
+        x11_symlinks=spec.x11_symlinks,
+        win_cursor=win_cursor,
+        win_cursor_name=win_cursor_name,
+    )
 
-        x11_sizes = size_typing(get_value("x11_sizes", SIZES))
-        win_sizes = size_typing(get_value("win_sizes", SIZES))
 
-        blobs = [f.read_bytes() for f in sorted(config.bitmaps_dir.glob(v["png"]))]
+def write_cursor(
+    spec: CursorSpec,
+    platform: str,
+    fp: BinaryIO,
+    cache: Optional[ImageCache] = None,
+    entry_cache: Optional[EntryCache] = None,
+) -> str:
+    """Render a cursor on ``platform`` straight into a seekable file object,
+    returns its file name.
+
+    Images are written one at a time instead of being collected into a
+    ``CursorSection``, and ``lazy`` cursors resample each image only when
+    it is written.
+    """
+    name = spec.x11_name if platform == "x11" else spec.win_name
+    if not name:
+        raise ValueError(f"Cursor '{spec.name}' has no {platform} name")
+
+    frames = open_cursor(spec, platform, cache).platform_frames(platform)
+    if platform == "x11":
+        write_x11(frames, fp)
+        return name
+
+    ext = write_win(
+        frames,
+        fp,
+        compression=spec.compression,
+        cache=entry_cache,
+        dib_max_size=spec.dib_max_size,
+    )
+    return name + ext
 
-        if not blobs:
-            raise FileNotFoundError(
-                f"Bitmaps not found '{v['png']}' in '{config.bitmaps_dir}'"
-            )
 
-        x11_cursor = None
-        x11_cursor_name = None
-        if "x11_name" in v:
-            x11_blob = open_blob(blobs, hotspot, x11_sizes, x11_delay)
-            x11_cursor = to_x11(x11_blob.frames)
-            x11_cursor_name = v["x11_name"]
-
-        win_cursor = None
-        win_cursor_name = None
-        if "win_name" in v:
-            win_blob = open_blob(blobs, hotspot, win_sizes, win_delay)
-            ext, win_cursor = to_win(win_blob.frames)
-            win_cursor_name = v["win_name"] + ext
-
-        result.append(
-            CursorSection(
-                x11_cursor=x11_cursor,
-                x11_cursor_name=x11_cursor_name,
-                x11_symlinks=v.get("x11_symlinks", []),
-                win_cursor=win_cursor,
-                win_cursor_name=win_cursor_name,
-            )
-        )
+def parse_cursors_section(
+    d: Dict[str, Any],
+    config: ConfigSection,
+    cache: Optional[ImageCache] = None,
+    entry_cache: Optional[EntryCache] = None,
+    artifacts: Optional[ArtifactCache] = None,
+    **kwargs,
+) -> List[CursorSection]:
+    # Check every cursor from its PNG headers before rendering any of them
+    specs = plan_cursors_section(d, config, **kwargs)
+
+    # Cursors sharing a bitmap are decoded and resampled only once
+    if cache is None:
+        cache = ImageCache()
+    entry_cache = EntryCache() if entry_cache is None else entry_cache
 
-    return result
+    return [
+        render_cursor(spec, cache, entry_cache, artifacts=artifacts) for spec in specs
+    ]
 
 
 @dataclass
@@ -181,6 +530,64 @@ def parse_json_file(fp: Path, **kwargs) -> ClickgenConfig:
     return ClickgenConfig(theme, config, cursors)
 
 
+@dataclass
+class BuildPlan:
+    theme: ThemeSection
+    config: ConfigSection
+    cursors: List[CursorSpec]
+
+    @property
+    def work(self) -> int:
+        return sum(c.work for c in self.cursors)
+
+
+def load_config_file(fp: Path) -> Dict[str, Any]:
+    ext = fp.suffix
+
+    if ext == ".yml" or ext == ".yaml":
+        with open(fp, "r") as file:
+            return yaml.safe_load(file)
+
+    elif ext == ".json":
+        with open(fp, "r") as file:
+            return json.load(file)
+
+    elif ext == ".toml":
+        return toml.load(fp)
+
+    else:
+        raise IOError("Configuration File type is not supported")
+
+
+def plan_config_file(fp: Path, **kwargs) -> BuildPlan:
+    """Build plan of a config file, validated from the bitmap headers.
+
+    Nothing is rendered, cursors are rendered on demand with
+    ``render_cursor()`` or all at once with ``render_plan()``.
+    """
+    d = load_config_file(fp)
+    theme = parse_theme_section(d, **kwargs)
+    config = parse_config_section(fp, d, **kwargs)
+    cursors = plan_cursors_section(d, config, **kwargs)
+
+    return BuildPlan(theme, config, cursors)
+
+
+def render_plan(
+    plan: BuildPlan,
+    cache: Optional[ImageCache] = None,
+    entry_cache: Optional[EntryCache] = None,
+    artifacts: Optional[ArtifactCache] = None,
+) -> ClickgenConfig:
+    cache = ImageCache() if cache is None else cache
+    entry_cache = EntryCache() if entry_cache is None else entry_cache
+    cursors = [
+        render_cursor(spec, cache, entry_cache, artifacts=artifacts)
+        for spec in plan.cursors
+    ]
+    return ClickgenConfig(plan.theme, plan.config, cursors)
+
+
 def parse_config_file(fp: Path, **kwargs) -> ClickgenConfig:
     ext = fp.suffix
     config: ClickgenConfig
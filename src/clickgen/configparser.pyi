@@ -1,10 +1,14 @@
+from clickgen.artifacts import ArtifactCache as ArtifactCache
 from clickgen.libs.colors import print_warning as print_warning
-from clickgen.parser import open_blob as open_blob
-from clickgen.parser.png import DELAY as DELAY, SIZES as SIZES
-from clickgen.writer.windows import to_win as to_win
-from clickgen.writer.x11 import to_x11 as to_x11
+from clickgen.parser import ImageCache as ImageCache, open_blob as open_blob, probe_blobs as probe_blobs, validate_blobs as validate_blobs
+from clickgen.parser.base import BaseParser as BaseParser
+from clickgen.parser.png import DELAY as DELAY, HEADER_SIZE as HEADER_SIZE, SIZES as SIZES, parse_size as parse_size
+from clickgen.writer.windows import EntryCache as EntryCache, to_win as to_win, write_win as write_win
+from clickgen.writer.x11 import to_x11 as to_x11, write_x11 as write_x11
 from pathlib import Path
-from typing import Any, TypeVar
+from typing import Any, BinaryIO, TypeVar
+
+PROBE_SIZE: int
 
 class ThemeSection:
     name: str
@@ -43,7 +47,56 @@ class CursorSection:
     def __gt__(self, other): ...
     def __ge__(self, other): ...
 
-def parse_cursors_section(d: dict[str, Any], config: ConfigSection, **kwargs) -> list[CursorSection]: ...
+class CursorSpec:
+    name: str
+    files: list[Path] | list[list[Path]]
+    hotspot: tuple[int, int]
+    x11_name: str | None
+    x11_symlinks: list[str]
+    x11_sizes: list[int | str]
+    x11_delay: int
+    win_name: str | None
+    win_sizes: list[int | str]
+    win_delay: int
+    pyramid: bool
+    lazy: bool
+    compression: str
+    dib_max_size: int
+    source_pixels: int
+    source_frames: int
+    digests: tuple[str, ...]
+    @property
+    def frames(self) -> int: ...
+    @property
+    def bitmaps(self) -> list[Path]: ...
+    def platform_work(self, platform: str) -> int: ...
+    @property
+    def work(self) -> int: ...
+    def platform_memory(self, platform: str) -> int: ...
+    def __init__(self, name, files, hotspot, x11_name, x11_symlinks, x11_sizes, x11_delay, win_name, win_sizes, win_delay, pyramid=..., lazy=..., compression=..., dib_max_size=..., source_pixels=..., source_frames=..., digests=...) -> None: ...
+    def __lt__(self, other): ...
+    def __le__(self, other): ...
+    def __gt__(self, other): ...
+    def __ge__(self, other): ...
+
+def estimate_work(frames: int, sizes: list[int | str]) -> int: ...
+def estimate_memory(frames: int, sizes: list[int | str], source_pixels: int, pyramid: bool = False, lazy: bool = False) -> int: ...
+RENDER_SETTINGS: dict[str, list[str]]
+
+def input_digest(spec: CursorSpec, platform: str, settings: list[str]) -> str: ...
+def render_key(spec: CursorSpec, platform: str) -> str: ...
+def win_extension(blob: bytes) -> str: ...
+def glob_bitmaps(png: str, bitmaps_dir: Path) -> list[Path]: ...
+def read_bitmaps(files: list[Path] | list[list[Path]]) -> list[bytes] | list[list[bytes]]: ...
+def bitmap_digests(files: list[Path] | list[list[Path]]) -> tuple[str, ...]: ...
+def read_headers(sets: list[list[Path]]) -> list[list[bytes]]: ...
+def validate_cursor_bitmaps(name: str, png: str | list[str], bitmaps_dir: Path, hotspot: tuple[int, int], rgba: bool = False) -> list[Path] | list[list[Path]]: ...
+def parse_cursor_spec(name: str, v: dict[str, Any], fb: dict[str, Any], config: ConfigSection, **kwargs) -> CursorSpec: ...
+def plan_cursors_section(d: dict[str, Any], config: ConfigSection, **kwargs) -> list[CursorSpec]: ...
+def open_cursor(spec: CursorSpec, platform: str, cache: ImageCache | None = None) -> BaseParser: ...
+def render_cursor(spec: CursorSpec, cache: ImageCache | None = None, entry_cache: EntryCache | None = None, platforms: list[str] | None = None, artifacts: ArtifactCache | None = None) -> CursorSection: ...
+def write_cursor(spec: CursorSpec, platform: str, fp: BinaryIO, cache: ImageCache | None = None, entry_cache: EntryCache | None = None) -> str: ...
+def parse_cursors_section(d: dict[str, Any], config: ConfigSection, cache: ImageCache | None = None, entry_cache: EntryCache | None = None, artifacts: ArtifactCache | None = None, **kwargs) -> list[CursorSection]: ...
 
 class ClickgenConfig:
     theme: ThemeSection
@@ -58,4 +111,19 @@ class ClickgenConfig:
 def parse_toml_file(fp: Path, **kwargs) -> ClickgenConfig: ...
 def parse_yaml_file(fp: Path, **kwargs) -> ClickgenConfig: ...
 def parse_json_file(fp: Path, **kwargs) -> ClickgenConfig: ...
+class BuildPlan:
+    theme: ThemeSection
+    config: ConfigSection
+    cursors: list[CursorSpec]
+    @property
+    def work(self) -> int: ...
+    def __init__(self, theme, config, cursors) -> None: ...
+    def __lt__(self, other): ...
+    def __le__(self, other): ...
+    def __gt__(self, other): ...
+    def __ge__(self, other): ...
+
+def load_config_file(fp: Path) -> dict[str, Any]: ...
+def plan_config_file(fp: Path, **kwargs) -> BuildPlan: ...
+def render_plan(plan: BuildPlan, cache: ImageCache | None = None, entry_cache: EntryCache | None = None, artifacts: ArtifactCache | None = None) -> ClickgenConfig: ...
 def parse_config_file(fp: Path, **kwargs) -> ClickgenConfig: ...
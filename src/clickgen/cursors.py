@@ -1,38 +1,90 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from typing import Iterator, List, Tuple
+from typing import Callable, Iterator, List, Optional, Tuple
 
 from PIL.Image import Image
 
 
 class CursorImage:
-    image: Image
+    """A single cursor bitmap.
+
+    Instead of an ``image`` a ``loader`` can be given, the image is then
+    produced on first access and dropped again by ``release()``, which the
+    writers call once the image is written. Its ``size``, when known, can
+    be given as well so writers can lay out a file without loading it.
+
+    ``blob`` is the encoded PNG of the image when it is an unmodified
+    source bitmap, writers may then store those bytes as they are.
+
+    ``source`` is the cache key of the bitmap the image is resampled from.
+    Images of a cursor with the same ``source``, size and hotspot are the
+    same, writers can compare them by it without loading their pixels.
+    """
+
     hotspot: Tuple[int, int]
     nominal: int
     re_canvas: bool
+    blob: Optional[bytes]
+    source: Optional[str]
 
     def __init__(
         self,
-        image: Image,
+        image: Optional[Image],
         hotspot: Tuple[int, int],
         nominal: int,
         re_canvas: bool = False,
+        loader: Optional[Callable[[], Image]] = None,
+        size: Optional[Tuple[int, int]] = None,
+        blob: Optional[bytes] = None,
+        source: Optional[str] = None,
     ) -> None:
-        self.image = image
+        if image is None and loader is None:
+            raise ValueError("Either 'image' or 'loader' is required")
+
+        self._image = image
+        self._loader = loader
+        self._size = size
+        self.blob = blob
+        self.source = source
         self.hotspot = hotspot
         self.nominal = nominal
         self.re_canvas = re_canvas
 
+    @property
+    def image(self) -> Image:
+        if self._image is None:
+            assert self._loader is not None
+            self._image = self._loader()
+        return self._image
+
+    @image.setter
+    def image(self, image: Image) -> None:
+        self._image = image
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        if self._image is None and self._size is not None:
+            return self._size
+        return self.image.size
+
+    @property
+    def lazy(self) -> bool:
+        return self._loader is not None
+
+    def release(self) -> None:
+        if self._loader is not None:
+            self._image = None
+
     def __repr__(self) -> str:
-        return f"CursorImage(image={self.image!r}, hotspot={self.hotspot!r}, nominal={self.nominal!r}, re_canvas={self.re_canvas!r})"
+        return f"CursorImage(image={self._image!r}, hotspot={self.hotspot!r}, nominal={self.nominal!r}, re_canvas={self.re_canvas!r})"
 
 
 class CursorFrame:
     images: List[CursorImage]
-    delay: int
+    delay: float
 
-    def __init__(self, images: List[CursorImage], delay: int = 0) -> None:
+    def __init__(self, images: List[CursorImage], delay: float = 0) -> None:
         self.images = images
         self.delay = delay
 
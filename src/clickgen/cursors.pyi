@@ -1,17 +1,27 @@
 from PIL.Image import Image as Image
-from typing import Iterator
+from typing import Callable, Iterator
 
 class CursorImage:
-    image: Image
     hotspot: tuple[int, int]
     nominal: int
     re_canvas: bool
-    def __init__(self, image: Image, hotspot: tuple[int, int], nominal: int, re_canvas: bool = False) -> None: ...
+    blob: bytes | None
+    source: str | None
+    def __init__(self, image: Image | None, hotspot: tuple[int, int], nominal: int, re_canvas: bool = False, loader: Callable[[], Image] | None = None, size: tuple[int, int] | None = None, blob: bytes | None = None, source: str | None = None) -> None: ...
+    @property
+    def image(self) -> Image: ...
+    @image.setter
+    def image(self, image: Image) -> None: ...
+    @property
+    def size(self) -> tuple[int, int]: ...
+    @property
+    def lazy(self) -> bool: ...
+    def release(self) -> None: ...
 
 class CursorFrame:
     images: list[CursorImage]
-    delay: int
-    def __init__(self, images: list[CursorImage], delay: int = 0) -> None: ...
+    delay: float
+    def __init__(self, images: list[CursorImage], delay: float = 0) -> None: ...
     def __getitem__(self, item: int) -> CursorImage: ...
     def __len__(self) -> int: ...
     def __iter__(self) -> Iterator[CursorImage]: ...
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+from clickgen.configparser import RENDER_SETTINGS, CursorSpec, input_digest
+
+MANIFEST_VERSION = 1
+
+# Settings each platform's outputs depend on, names included
+PLATFORM_SETTINGS: Dict[str, List[str]] = {
+    "x11": RENDER_SETTINGS["x11"] + ["x11_name", "x11_symlinks"],
+    "windows": RENDER_SETTINGS["windows"] + ["win_name"],
+}
+
+
+def manifest_path(out_dir: Path, theme_name: str) -> Path:
+    return out_dir / f".{theme_name}.manifest.json"
+
+
+def cursor_digest(spec: CursorSpec, platform: str) -> str:
+    """Hash of a cursor's input bitmaps and of the settings its outputs on
+    ``platform`` depend on, along with the clickgen version."""
+    return input_digest(spec, platform, PLATFORM_SETTINGS[platform])
+
+
+class Manifest:
+    """Digests of the inputs every output was built from.
+
+    Entries are keyed by platform and cursor, and record the outputs (paths
+    relative to the manifest's directory) written for them. A cursor whose
+    digest is unchanged and whose outputs all exist doesn't have to be
+    built again. An unreadable manifest, or one written by another
+    manifest version, is treated as empty.
+    """
+
+    path: Path
+    entries: Dict[str, Dict[str, Any]]
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries = {}
+
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == MANIFEST_VERSION:
+            self.entries = data.get("entries", {})
+
+    @staticmethod
+    def key(platform: str, name: str) -> str:
+        return f"{platform}:{name}"
+
+    def _exists(self, output: str) -> bool:
+        path = self.path.parent / output
+        return path.is_symlink() or path.exists()
+
+    def is_current(self, key: str, digest: str) -> bool:
+        entry = self.entries.get(key)
+        if entry is None or entry["digest"] != digest:
+            return False
+        return all(self._exists(o) for o in entry["outputs"])
+
+    def update(self, key: str, digest: str, outputs: List[Path]) -> List[Path]:
+        """Record a built cursor, returns the outputs of its previous build
+        that it no longer writes."""
+        root = self.path.parent
+        new = [str(o.relative_to(root)) for o in outputs]
+        old = self.entries.get(key, {}).get("outputs", [])
+
+        self.entries[key] = {"digest": digest, "outputs": new}
+        return [root / o for o in old if o not in new]
+
+    def prune(self, platform: str, names: List[str]) -> List[Path]:
+        """Forget the cursors of ``platform`` not in ``names``, returns their
+        outputs."""
+        keys = {self.key(platform, name) for name in names}
+        stale: List[Path] = []
+        for key in [k for k in self.entries if k.startswith(f"{platform}:")]:
+            if key in keys:
+                continue
+            stale.extend(self.path.parent / o for o in self.entries[key]["outputs"])
+            del self.entries[key]
+        return stale
+
+    def save(self) -> None:
+        data = {"version": MANIFEST_VERSION, "entries": self.entries}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(data, indent=2, sort_keys=True))
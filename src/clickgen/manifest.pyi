@@ -0,0 +1,20 @@
+from clickgen.configparser import CursorSpec as CursorSpec, RENDER_SETTINGS as RENDER_SETTINGS, input_digest as input_digest
+from pathlib import Path
+from typing import Any
+
+MANIFEST_VERSION: int
+PLATFORM_SETTINGS: dict[str, list[str]]
+
+def manifest_path(out_dir: Path, theme_name: str) -> Path: ...
+def cursor_digest(spec: CursorSpec, platform: str) -> str: ...
+
+class Manifest:
+    path: Path
+    entries: dict[str, dict[str, Any]]
+    def __init__(self, path: Path) -> None: ...
+    @staticmethod
+    def key(platform: str, name: str) -> str: ...
+    def is_current(self, key: str, digest: str) -> bool: ...
+    def update(self, key: str, digest: str, outputs: list[Path]) -> list[Path]: ...
+    def prune(self, platform: str, names: list[str]) -> list[Path]: ...
+    def save(self) -> None: ...
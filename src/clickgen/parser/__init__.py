@@ -1,23 +1,123 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from typing import List, Optional, Tuple, Type, Union
+from concurrent.futures import Executor
+from typing import List, Optional, Tuple, Type, Union, cast
 
+from clickgen.parser.animated import AnimatedParser, is_gif, probe_frames, probe_gif
 from clickgen.parser.base import BaseParser
-from clickgen.parser.png import MultiPNGParser, SinglePNGParser
+from clickgen.parser.cache import ImageCache
+from clickgen.parser.png import (
+    MultiPNGParser,
+    PNGSetParser,
+    SinglePNGParser,
+    probe_png,
+    validate_png,
+    validate_png_set,
+)
+from clickgen.parser.svg import SVGParser, is_svg, probe_svg
 
-__all__ = ["SinglePNGParser", "MultiPNGParser", "open_blob"]
+__all__ = [
+    "SinglePNGParser",
+    "MultiPNGParser",
+    "PNGSetParser",
+    "AnimatedParser",
+    "SVGParser",
+    "ImageCache",
+    "open_blob",
+    "validate_blobs",
+    "probe_blobs",
+]
 
-PARSERS: List[Type[BaseParser]] = [SinglePNGParser, MultiPNGParser]
+# 'AnimatedParser' comes first, APNG files are valid PNG files as well
+PARSERS: List[Type[BaseParser]] = [
+    AnimatedParser,
+    SinglePNGParser,
+    MultiPNGParser,
+    PNGSetParser,
+    SVGParser,
+]
 
 
 def open_blob(
-    blob: Union[bytes, List[bytes]],
+    blob: Union[bytes, List[bytes], List[List[bytes]]],
     hotspot: Tuple[int, int],
     sizes: Optional[List[int]] = None,
     delay: Optional[int] = None,
+    cache: Optional[ImageCache] = None,
+    pyramid: bool = False,
+    lazy: bool = False,
+    workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
 ) -> BaseParser:
     for parser in PARSERS:
         if parser.can_parse(blob):
-            return parser(blob, hotspot, sizes, delay)  # type: ignore
+            return parser(  # type: ignore
+                blob,
+                hotspot,
+                sizes,
+                delay,
+                cache,
+                pyramid,
+                lazy,
+                workers,
+                executor,
+            )
     raise ValueError("Unsupported file format")
+
+
+def validate_blobs(
+    blobs: Union[List[bytes], List[List[bytes]]],
+    hotspot: Tuple[int, int],
+    rgba: bool = False,
+) -> None:
+    """Validate bitmaps from their file headers without decoding them.
+
+    GIF frames and rasterized SVGs are always RGBA, so ``rgba`` only
+    applies to PNG input. SVG input has to be passed whole, its size is
+    read from the root element. A list of lists is a PNG source set, as
+    read by ``PNGSetParser``.
+    """
+    if blobs and all(isinstance(b, list) for b in blobs):
+        validate_png_set(blobs, hotspot, rgba)  # type: ignore
+        return
+
+    blobs = cast(List[bytes], blobs)
+    if all(is_svg(b) for b in blobs):
+        sizes = {probe_svg(b) for b in blobs}
+        if len(sizes) > 1:
+            raise ValueError("Frames must be the same size")
+        width, height = sizes.pop()
+    elif len(blobs) == 1 and is_gif(blobs[0]):
+        width, height = probe_gif(blobs[0])
+    else:
+        validate_png(blobs, hotspot, rgba)
+        return
+
+    if hotspot[0] > width:
+        raise ValueError(f"Hotspot x-coordinate too large: {hotspot[0]}")
+    if hotspot[1] > height:
+        raise ValueError(f"Hotspot y-coordinate too large: {hotspot[1]}")
+
+
+def probe_blobs(blobs: Union[List[bytes], List[List[bytes]]]) -> Tuple[int, int]:
+    """Pixels of a frame's source bitmaps and the number of frames in each
+    file, read from the headers passed to ``validate_blobs()``.
+
+    SVGs are rasterized straight at every size, so they have no source
+    pixels.
+    """
+    if blobs and all(isinstance(b, list) for b in blobs):
+        infos = [probe_png(s[0]) for s in blobs]  # type: ignore
+        return sum(i.width * i.height for i in infos), 1
+
+    blobs = cast(List[bytes], blobs)
+    if all(is_svg(b) for b in blobs):
+        return 0, 1
+    elif len(blobs) == 1 and is_gif(blobs[0]):
+        width, height = probe_gif(blobs[0])
+        return width * height, probe_frames(blobs[0])
+
+    info = probe_png(blobs[0])
+    frames = probe_frames(blobs[0]) if len(blobs) == 1 else 1
+    return info.width * info.height, frames
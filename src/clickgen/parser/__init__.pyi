@@ -1,6 +1,12 @@
+from clickgen.parser.animated import AnimatedParser as AnimatedParser
 from clickgen.parser.base import BaseParser
-from clickgen.parser.png import MultiPNGParser as MultiPNGParser, SinglePNGParser as SinglePNGParser
+from clickgen.parser.cache import ImageCache as ImageCache
+from clickgen.parser.png import MultiPNGParser as MultiPNGParser, PNGSetParser as PNGSetParser, SinglePNGParser as SinglePNGParser
+from clickgen.parser.svg import SVGParser as SVGParser
+from concurrent.futures import Executor
 
-__all__ = ['SinglePNGParser', 'MultiPNGParser', 'open_blob']
+__all__ = ['SinglePNGParser', 'MultiPNGParser', 'PNGSetParser', 'AnimatedParser', 'SVGParser', 'ImageCache', 'open_blob', 'validate_blobs', 'probe_blobs']
 
-def open_blob(blob: bytes | list[bytes], hotspot: tuple[int, int], sizes: list[int] | None = None, delay: int | None = None) -> BaseParser: ...
+def open_blob(blob: bytes | list[bytes] | list[list[bytes]], hotspot: tuple[int, int], sizes: list[int] | None = None, delay: int | None = None, cache: ImageCache | None = None, pyramid: bool = False, lazy: bool = False, workers: int | None = None, executor: Executor | None = None) -> BaseParser: ...
+def validate_blobs(blobs: list[bytes] | list[list[bytes]], hotspot: tuple[int, int], rgba: bool = False) -> None: ...
+def probe_blobs(blobs: list[bytes] | list[list[bytes]]) -> tuple[int, int]: ...
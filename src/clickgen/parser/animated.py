@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import struct
+from concurrent.futures import Executor
+from typing import List, Optional, Tuple, Union
+
+from PIL import Image
+
+from clickgen.cursors import CursorFrame, CursorImage
+from clickgen.parser.base import BaseParser
+from clickgen.parser.cache import ImageCache
+from clickgen.parser.png import (
+    DELAY,
+    SIGNATURE,
+    SIZES,
+    parse_size,
+    scale_hotspot,
+)
+
+# GIF FILE FORMAT
+GIF_MAGICS = (b"GIF87a", b"GIF89a")
+GIF_HEADER = struct.Struct("<6sHH")
+
+# APNG FILE FORMAT
+CHUNK_HEADER = struct.Struct(">I4s")
+ANIMATION_CHUNK = b"acTL"
+ANIMATION_CONTROL = struct.Struct(">II")
+DATA_CHUNK = b"IDAT"
+
+# File durations are in milliseconds, Windows delays in 1/30 s (a '.ani'
+# rate is twice the delay, in 1/60 s jiffies)
+WIN_DELAY_MS = 1000 / 30
+
+
+def is_gif(blob: bytes) -> bool:
+    return blob[:6] in GIF_MAGICS
+
+
+def is_apng(blob: bytes) -> bool:
+    """Look for an 'acTL' chunk, it has to come before the first 'IDAT'."""
+    if blob[: len(SIGNATURE)] != SIGNATURE:
+        return False
+
+    offset = len(SIGNATURE)
+    while offset + CHUNK_HEADER.size <= len(blob):
+        length, chunk = CHUNK_HEADER.unpack_from(blob, offset)
+        if chunk == ANIMATION_CHUNK:
+            return True
+        if chunk == DATA_CHUNK:
+            return False
+        offset += CHUNK_HEADER.size + length + 4  # trailing CRC
+    return False
+
+
+def probe_gif(blob: bytes) -> Tuple[int, int]:
+    """Read the logical screen size from the GIF header."""
+    if not is_gif(blob) or len(blob) < GIF_HEADER.size:
+        raise ValueError("Not a GIF file")
+    _, width, height = GIF_HEADER.unpack_from(blob)
+    return width, height
+
+
+def probe_frames(blob: bytes) -> int:
+    """Number of frames of a bitmap, 1 for still images.
+
+    An APNG's count is read from its 'acTL' chunk, so the bytes up to the
+    first 'IDAT' are enough. GIFs don't record it, they have to be passed
+    whole and their frames are counted without being decoded.
+    """
+    if is_gif(blob):
+        with Image.open(io.BytesIO(blob)) as img:
+            return int(getattr(img, "n_frames", 1))
+    if blob[: len(SIGNATURE)] != SIGNATURE:
+        return 1
+
+    offset = len(SIGNATURE)
+    while offset + CHUNK_HEADER.size + ANIMATION_CONTROL.size <= len(blob):
+        length, chunk = CHUNK_HEADER.unpack_from(blob, offset)
+        if chunk == ANIMATION_CHUNK:
+            frames, _ = ANIMATION_CONTROL.unpack_from(blob, offset + CHUNK_HEADER.size)
+            return max(frames, 1)
+        if chunk == DATA_CHUNK:
+            break
+        offset += CHUNK_HEADER.size + length + 4  # trailing CRC
+    return 1
+
+
+class AnimatedParser(BaseParser):
+    """Animated cursor from a single APNG or GIF file.
+
+    Frames are decoded one at a time and resampled before the next one is
+    read, so only one full size frame is alive at a time. Frame delays
+    come from the file (in milliseconds) unless ``delay`` is given. Frames
+    depend on their predecessors, so they're always decoded in order on
+    the calling thread and resampled eagerly; ``lazy``, ``workers`` and
+    ``executor`` have no effect. Delays from the file are converted for
+    Windows by ``platform_frames()``.
+    """
+
+    @classmethod
+    def can_parse(cls, blob: Union[bytes, List[bytes]]) -> bool:
+        if isinstance(blob, list):
+            if len(blob) != 1:
+                return False
+            blob = blob[0]
+        if not isinstance(blob, bytes):
+            return False
+        return is_gif(blob) or is_apng(blob)
+
+    def __init__(
+        self,
+        blob: Union[bytes, List[bytes]],
+        hotspot: Tuple[int, int],
+        sizes: Optional[List[Union[int, str]]] = None,
+        delay: Optional[int] = None,
+        cache: Optional[ImageCache] = None,
+        pyramid: bool = False,
+        lazy: bool = False,
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        if isinstance(blob, list):
+            blob = blob[0]
+        super().__init__(blob)
+        self.pyramid = pyramid
+        self._cache = ImageCache() if cache is None else cache
+        self._image = Image.open(io.BytesIO(self.blob))
+
+        # 'set' to prevent value duplication
+        if not sizes:
+            self.sizes = set(SIZES)
+        else:
+            self.sizes = set(sizes)
+
+        self.delay = delay
+
+        if hotspot[0] > self._image.size[0]:
+            raise ValueError(f"Hotspot x-coordinate too large: {hotspot[0]}")
+        if hotspot[1] > self._image.size[1]:
+            raise ValueError(f"Hotspot y-coordinate too large: {hotspot[1]}")
+        self.hotspot = hotspot
+
+        self.frames = self._parse()
+
+    def _parse(self) -> List[CursorFrame]:
+        sizes = [parse_size(s) for s in sorted(self.sizes)]
+        digest = ImageCache.digest(self.blob)
+
+        frames: List[CursorFrame] = []
+        for i in range(getattr(self._image, "n_frames", 1)):
+            self._image.seek(i)
+            frame = self._image.convert("RGBA")
+            key = self._cache.add_image(f"{digest}:{i}", frame, digest)
+
+            images: List[CursorImage] = []
+            for size, canvas_size in sizes:
+                images.append(
+                    CursorImage(
+                        image=self._cache.resize(key, size, canvas_size, self.pyramid),
+                        hotspot=scale_hotspot(self.hotspot, size, self._image.size),
+                        nominal=canvas_size,
+                        re_canvas=size != canvas_size,
+                    )
+                )
+            self._cache.discard(key)
+
+            if self.delay:
+                delay = self.delay
+            else:
+                delay = int(round(self._image.info.get("duration", DELAY)))
+            frames.append(CursorFrame(images, delay=delay))
+
+        return frames
+
+    def platform_frames(self, platform: str) -> List[CursorFrame]:
+        if platform != "windows" or self.delay:
+            return self.frames
+        return [CursorFrame(f.images, f.delay / WIN_DELAY_MS) for f in self.frames]
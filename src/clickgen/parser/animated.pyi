@@ -0,0 +1,30 @@
+from _typeshed import Incomplete
+from clickgen.cursors import CursorFrame as CursorFrame, CursorImage as CursorImage
+from clickgen.parser.base import BaseParser as BaseParser
+from clickgen.parser.cache import ImageCache as ImageCache
+from clickgen.parser.png import DELAY as DELAY, SIGNATURE as SIGNATURE, SIZES as SIZES, parse_size as parse_size, scale_hotspot as scale_hotspot
+from concurrent.futures import Executor
+
+GIF_MAGICS: Incomplete
+GIF_HEADER: Incomplete
+CHUNK_HEADER: Incomplete
+ANIMATION_CHUNK: bytes
+ANIMATION_CONTROL: Incomplete
+DATA_CHUNK: bytes
+WIN_DELAY_MS: float
+
+def is_gif(blob: bytes) -> bool: ...
+def is_apng(blob: bytes) -> bool: ...
+def probe_gif(blob: bytes) -> tuple[int, int]: ...
+def probe_frames(blob: bytes) -> int: ...
+
+class AnimatedParser(BaseParser):
+    @classmethod
+    def can_parse(cls, blob: bytes | list[bytes]) -> bool: ...
+    pyramid: Incomplete
+    sizes: Incomplete
+    delay: Incomplete
+    hotspot: Incomplete
+    frames: Incomplete
+    def __init__(self, blob: bytes | list[bytes], hotspot: tuple[int, int], sizes: list[int | str] | None = None, delay: int | None = None, cache: ImageCache | None = None, pyramid: bool = False, lazy: bool = False, workers: int | None = None, executor: Executor | None = None) -> None: ...
+    def platform_frames(self, platform: str) -> list[CursorFrame]: ...
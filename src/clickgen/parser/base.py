@@ -19,3 +19,7 @@ class BaseParser(metaclass=ABCMeta):
     @abstractmethod
     def can_parse(cls, blob: Any) -> bool:
         raise NotImplementedError()
+
+    def platform_frames(self, platform: str) -> List[CursorFrame]:
+        """Frames with their delays in the unit of ``platform``'s writer."""
+        return self.frames
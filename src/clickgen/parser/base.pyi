@@ -10,3 +10,4 @@ class BaseParser(metaclass=ABCMeta):
     @classmethod
     @abstractmethod
     def can_parse(cls, blob: Any) -> bool: ...
+    def platform_frames(self, platform: str) -> list[CursorFrame]: ...
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import io
+from threading import Lock
+from typing import Dict, List, Optional, Set, Tuple
+
+from PIL import Image
+
+
+class ImageCache:
+    """Decoded and resized bitmaps shared between parser instances.
+
+    Entries are addressed by a hash of the PNG bytes, so every cursor
+    pointing at the same bitmap (even when read from different files)
+    shares one decode and one resample per ``(size, canvas_size)``.
+    ``hits`` and ``misses`` count the resize lookups. The cache can be
+    shared between threads.
+
+    With ``pyramid`` set, sources are first halved with ``reduce()`` and
+    each size is resampled from the smallest level at or above it,
+    instead of from the full resolution source.
+
+    Resamples that aren't stored (``store=False``) decode their source on
+    their own, unless they were announced with ``expect()``: the source
+    and its pyramid are then decoded once and kept until the last
+    announced resample is done.
+
+    Bitmaps derived from a source, such as animation frames or SVG
+    rasterizations, are added with that source's key and released with it.
+    """
+
+    hits: int
+    misses: int
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._blobs: Dict[str, bytes] = {}
+        self._images: Dict[str, Image.Image] = {}
+        self._resized: Dict[Tuple[str, int, int, bool], Image.Image] = {}
+        self._levels: Dict[str, List[Image.Image]] = {}
+        self._pending: Dict[str, int] = {}
+        self._pending_levels: Dict[str, List[Image.Image]] = {}
+        self._derived: Dict[str, Set[str]] = {}
+        self._lock = Lock()
+        self._locks: Dict[str, Lock] = {}
+
+    @staticmethod
+    def digest(blob: bytes) -> str:
+        return hashlib.sha1(blob).hexdigest()
+
+    def add(self, blob: bytes) -> str:
+        key = self.digest(blob)
+        with self._lock:
+            if key not in self._images:
+                self._blobs[key] = blob
+                self._images[key] = Image.open(io.BytesIO(blob))
+        return key
+
+    def add_image(
+        self, key: str, image: Image.Image, source: Optional[str] = None
+    ) -> str:
+        """Register an already decoded bitmap, such as an animation frame,
+        derived from the bitmap of key ``source``."""
+        with self._lock:
+            self._images.setdefault(key, image)
+            if source is not None:
+                self._derived.setdefault(source, set()).add(key)
+        return key
+
+    def discard(self, key: str) -> None:
+        """Drop a source bitmap and its pyramid, its resamples are kept."""
+        with self._lock:
+            self._blobs.pop(key, None)
+            self._images.pop(key, None)
+            self._levels.pop(key, None)
+            self._locks.pop(key, None)
+            self._pending.pop(key, None)
+            self._pending_levels.pop(key, None)
+
+    def expect(self, key: str) -> None:
+        """Announce a resample of ``key`` that won't be stored."""
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+
+    def release(self, key: str) -> None:
+        """Drop a source bitmap along with its pyramid and resamples, and
+        every bitmap derived from it."""
+        with self._lock:
+            keys = {key} | self._derived.pop(key, set())
+        for k in keys:
+            self.discard(k)
+        with self._lock:
+            for res_key in [k for k in self._resized if k[0] in keys]:
+                del self._resized[res_key]
+
+    def image(self, key: str) -> Image.Image:
+        return self._images[key]
+
+    def cached(
+        self, key: str, size: int, canvas_size: int, pyramid: bool = False
+    ) -> bool:
+        """Whether ``resize()`` would return a stored resample."""
+        with self._lock:
+            return (key, size, canvas_size, pyramid) in self._resized
+
+    def _lock_for(self, key: str) -> Lock:
+        with self._lock:
+            return self._locks.setdefault(key, Lock())
+
+    @staticmethod
+    def _scale(levels: List[Image.Image], size: int, pyramid: bool) -> Image.Image:
+        if not pyramid:
+            return levels[0].resize((size, size), 1)
+
+        last = levels[-1]
+        while last.width >= size * 2 and last.height >= size * 2:
+            last = last.reduce(2)
+            levels.append(last)
+
+        for lvl in reversed(levels):
+            if lvl.width >= size and lvl.height >= size:
+                return lvl.resize((size, size), 1)
+        return levels[0].resize((size, size), 1)
+
+    def _resample(
+        self, key: str, size: int, canvas_size: int, pyramid: bool, store: bool
+    ) -> Image.Image:
+        source = self._images[key]
+
+        # 'reduce()' doesn't support palette and bilevel images
+        if source.mode in ("1", "P"):
+            pyramid = False
+
+        if store:
+            levels = self._levels.setdefault(key, [source])
+        else:
+            levels = self._unstored_levels(key)
+        if levels[0].size == (size, size):
+            # Already at the requested size, used as it is instead of copied
+            res_img = levels[0]
+            res_img.load()
+        else:
+            res_img = self._scale(levels, size, pyramid)
+
+        if size != canvas_size:
+            canvas = Image.new("RGBA", (canvas_size, canvas_size), (0, 0, 0, 0))
+            canvas.paste(res_img, (0, 0))
+            res_img = canvas
+        elif res_img.mode != "RGBA":
+            # The Xcursor writer reads RGBA pixels, so other modes are converted
+            res_img = res_img.convert("RGBA")
+
+        return res_img
+
+    def _unstored_levels(self, key: str) -> List[Image.Image]:
+        # A decode of its own, so neither the source pixels nor the result
+        # stay alive in the cache, shared by the announced resamples only
+        with self._lock:
+            levels = self._pending_levels.get(key)
+            if levels is None:
+                levels = [Image.open(io.BytesIO(self._blobs[key]))]
+
+            count = self._pending.get(key, 0) - 1
+            if count > 0:
+                self._pending[key] = count
+                self._pending_levels[key] = levels
+            else:
+                self._pending.pop(key, None)
+                self._pending_levels.pop(key, None)
+        return levels
+
+    def resize(
+        self,
+        key: str,
+        size: int,
+        canvas_size: int,
+        pyramid: bool = False,
+        store: bool = True,
+    ) -> Image.Image:
+        res_key = (key, size, canvas_size, pyramid)
+
+        # A source is decoded and resampled by one thread at a time, while
+        # different sources can be processed in parallel
+        with self._lock_for(key):
+            res_img = self._resized.get(res_key)
+
+            with self._lock:
+                if res_img is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+
+            if res_img is None:
+                res_img = self._resample(key, size, canvas_size, pyramid, store)
+                if store:
+                    self._resized[res_key] = res_img
+
+        return res_img
@@ -0,0 +1,16 @@
+from PIL import Image
+
+class ImageCache:
+    hits: int
+    misses: int
+    def __init__(self) -> None: ...
+    @staticmethod
+    def digest(blob: bytes) -> str: ...
+    def add(self, blob: bytes) -> str: ...
+    def add_image(self, key: str, image: Image.Image, source: str | None = None) -> str: ...
+    def discard(self, key: str) -> None: ...
+    def expect(self, key: str) -> None: ...
+    def release(self, key: str) -> None: ...
+    def image(self, key: str) -> Image.Image: ...
+    def cached(self, key: str, size: int, canvas_size: int, pyramid: bool = False) -> bool: ...
+    def resize(self, key: str, size: int, canvas_size: int, pyramid: bool = False, store: bool = True) -> Image.Image: ...
@@ -1,24 +1,184 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import io
-from typing import List, Optional, Tuple, Union
+import math
+import struct
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
 
-from PIL import Image
+import numpy as np
 
 from clickgen.cursors import CursorFrame, CursorImage
 from clickgen.parser.base import BaseParser
+from clickgen.parser.cache import ImageCache
 
 SIZES = [16, 20, 22, 24, 28, 32, 40, 48, 56, 64, 72, 80, 88, 96]
 DELAY = 0
 
+# PNG FILE FORMAT
+SIGNATURE = b"\x89PNG\r\n\x1a\n"
+IHDR_CHUNK = struct.Struct(">I4sIIBBBBB")
+HEADER_SIZE = len(SIGNATURE) + IHDR_CHUNK.size + 4  # trailing CRC
+COLOR_TYPES = {
+    0: (1, 2, 4, 8, 16),  # Grayscale
+    2: (8, 16),  # RGB
+    3: (1, 2, 4, 8),  # Palette
+    4: (8, 16),  # Grayscale + Alpha
+    6: (8, 16),  # RGBA
+}
+COLOR_TYPE_RGBA = 6
+
+
+class PNGInfo(NamedTuple):
+    width: int
+    height: int
+    bit_depth: int
+    color_type: int
+
+
+def probe_png(blob: bytes) -> PNGInfo:
+    """Read the IHDR chunk, only the first ``HEADER_SIZE`` bytes are needed."""
+    if blob[: len(SIGNATURE)] != SIGNATURE:
+        raise ValueError("Not a PNG file")
+    if len(blob) < HEADER_SIZE:
+        raise ValueError("Truncated PNG header")
+
+    length, chunk, width, height, depth, color, _, _, _ = IHDR_CHUNK.unpack_from(
+        blob, len(SIGNATURE)
+    )
+
+    if chunk != b"IHDR" or length != 13:
+        raise ValueError("PNG doesn't start with an IHDR chunk")
+    if depth not in COLOR_TYPES.get(color, ()):
+        raise ValueError(f"Invalid PNG bit depth {depth} for color type {color}")
+    if width == 0 or height == 0:
+        raise ValueError(f"Invalid PNG size: {width}x{height}")
+
+    return PNGInfo(width, height, depth, color)
+
+
+def validate_png(
+    blobs: List[bytes], hotspot: Tuple[int, int], rgba: bool = False
+) -> List[PNGInfo]:
+    """Check hotspot, frame sizes and color types before decoding any pixels.
+
+    ``rgba`` requires RGBA bitmaps, which is what the Xcursor writer reads.
+    """
+    infos = [probe_png(blob) for blob in blobs]
+
+    for i, info in enumerate(infos):
+        if (info.width, info.height) != (infos[0].width, infos[0].height):
+            raise ValueError(
+                f"Frame {i + 1} size {info.width}x{info.height} doesn't match"
+                f" frame 1 size {infos[0].width}x{infos[0].height}"
+            )
+        if rgba and info.color_type != COLOR_TYPE_RGBA:
+            raise ValueError(
+                f"Frame {i + 1} must be an RGBA PNG (color type {info.color_type})"
+            )
+
+    if hotspot[0] > infos[0].width:
+        raise ValueError(f"Hotspot x-coordinate too large: {hotspot[0]}")
+    if hotspot[1] > infos[0].height:
+        raise ValueError(f"Hotspot y-coordinate too large: {hotspot[1]}")
+
+    return infos
+
+
+def validate_png_set(
+    sets: List[List[bytes]], hotspot: Tuple[int, int], rgba: bool = False
+) -> List[PNGInfo]:
+    """Validate a source set, one list of frames per resolution.
+
+    Every resolution needs the same number of frames, and the hotspot is
+    checked against the largest one.
+    """
+    infos: List[PNGInfo] = []
+    for i, blobs in enumerate(sets):
+        if len(blobs) != len(sets[0]):
+            raise ValueError(
+                f"Source {i + 1} has {len(blobs)} frames, source 1 has {len(sets[0])}"
+            )
+        infos.append(validate_png(blobs, (0, 0), rgba)[0])
+
+    largest = max(infos, key=lambda info: (info.width, info.height))
+    validate_png(sets[infos.index(largest)][:1], hotspot)
+    return infos
+
+
+def parse_size(s: Union[int, str]) -> Tuple[int, int]:
+    """Split a 'sizes' entry into '(size, canvas_size)'."""
+    if isinstance(s, str):
+        try:
+            if ":" in s:
+                size_str, canvas_size_str = s.split(":")
+                return int(size_str), int(canvas_size_str)
+            else:
+                return int(s), int(s)
+        except ValueError:
+            raise ValueError(
+                f"'sizes' input '{s}' must be an integer or integers separated by ':'."
+            )
+    elif isinstance(s, int):
+        return s, s
+    else:
+        raise TypeError("Input must be 'cursor_size:canvas_size' or an integer.")
+
+
+def scale_hotspot(
+    hotspot: Tuple[int, int], size: int, source_size: Tuple[int, int]
+) -> Tuple[int, int]:
+    def _dim(i: int) -> int:
+        return int((hotspot[i] * (size / source_size[i])))
+
+    return _dim(0), _dim(1)
+
+
+def _cursor_image(
+    cache: ImageCache,
+    key: str,
+    info: PNGInfo,
+    blob: bytes,
+    size: int,
+    canvas_size: int,
+    hotspot: Tuple[int, int],
+    pyramid: bool,
+    lazy: bool,
+) -> CursorImage:
+    # Lazy images are resampled when a writer reads them, from a source
+    # decoded once for all of them
+    resize = partial(cache.resize, key, size, canvas_size, pyramid, not lazy)
+    if lazy:
+        cache.expect(key)
+
+    # A source already at the target canvas is passed through, only 8-bit
+    # RGBA sources are stored as they are in .cur entries
+    unmodified = (info.width, info.height) == (size, size) and size == canvas_size
+    rgba8 = info.color_type == COLOR_TYPE_RGBA and info.bit_depth == 8
+
+    return CursorImage(
+        image=None if lazy else resize(),
+        hotspot=hotspot,
+        nominal=canvas_size,
+        re_canvas=size != canvas_size,
+        loader=resize if lazy else None,
+        size=(canvas_size, canvas_size),
+        blob=blob if unmodified and rgba8 else None,
+        source=key,
+    )
+
 
 class SinglePNGParser(BaseParser):
-    MAGIC = bytes.fromhex("89504e47")
+    MAGIC = SIGNATURE
 
     @classmethod
     def can_parse(cls, blob: bytes) -> bool:
-        return blob[: len(cls.MAGIC)] == cls.MAGIC
+        try:
+            probe_png(blob)
+        except (ValueError, TypeError):
+            return False
+        return True
 
     def __init__(
         self,
@@ -26,9 +186,21 @@ class SinglePNGParser(BaseParser):
         hotspot: Tuple[int, int],
         sizes: Optional[List[Union[int, str]]] = None,
         delay: Optional[int] = None,
+        cache: Optional[ImageCache] = None,
+        pyramid: bool = False,
+        lazy: bool = False,
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
     ) -> None:
+        # A single frame is always parsed on the calling thread, 'workers'
+        # and 'executor' only keep the signature in line with 'open_blob()'
         super().__init__(blob)
-        self._image = Image.open(io.BytesIO(self.blob))
+        self.pyramid = pyramid
+        self.lazy = lazy
+        self._cache = ImageCache() if cache is None else cache
+        self._key = self._cache.add(self.blob)
+        self._image = self._cache.image(self._key)
+        self._info = probe_png(self.blob)
 
         # 'set' to prevent value duplication
         if not sizes:
@@ -49,53 +221,24 @@ class SinglePNGParser(BaseParser):
 
         self.frames = self._parse()
 
-    def _cal_hotspot(self, res_img: Image.Image) -> Tuple[int, int]:
-        def _dim(i: int) -> int:
-            return int((self.hotspot[i] * (res_img.size[i] / self._image.size[i])))
-
-        return _dim(0), _dim(1)
+    def _cal_hotspot(self, size: int) -> Tuple[int, int]:
+        return scale_hotspot(self.hotspot, size, self._image.size)
 
     def _parse(self) -> List[CursorFrame]:
         images: List[CursorImage] = []
         for s in sorted(self.sizes):
-            size: int = 0
-            canvas_size: int = 0
-
-            if isinstance(s, str):
-                try:
-                    if ":" in s:
-                        size_str, canvas_size_str = s.split(":")
-                        size = int(size_str)
-                        canvas_size = int(canvas_size_str)
-                    else:
-                        size = int(s)
-                        canvas_size = size
-                except ValueError:
-                    raise ValueError(
-                        f"'sizes' input '{s}' must be an integer or integers separated by ':'."
-                    )
-            elif isinstance(s, int):
-                size = s
-                canvas_size = s
-            else:
-                raise TypeError(
-                    "Input must be 'cursor_size:canvas_size' or an integer."
-                )
-
-            res_img = self._image.resize((size, size), 1)
-            res_hotspot = self._cal_hotspot(res_img)
-
-            if size != canvas_size:
-                canvas = Image.new("RGBA", (canvas_size, canvas_size), (0, 0, 0, 0))
-                canvas.paste(res_img, (0, 0))
-                res_img = canvas
-
+            size, canvas_size = parse_size(s)
             images.append(
-                CursorImage(
-                    image=res_img,
-                    hotspot=res_hotspot,
-                    nominal=canvas_size,
-                    re_canvas=size != canvas_size,
+                _cursor_image(
+                    self._cache,
+                    self._key,
+                    self._info,
+                    self.blob,
+                    size,
+                    canvas_size,
+                    self._cal_hotspot(size),
+                    self.pyramid,
+                    self.lazy,
                 )
             )
 
@@ -103,6 +246,13 @@ class SinglePNGParser(BaseParser):
 
 
 class MultiPNGParser(BaseParser):
+    """Animated cursor from one PNG per frame.
+
+    Frames are parsed on ``executor``, or on a temporary thread pool of
+    ``workers`` threads. Pillow releases the GIL while decoding and
+    resampling, and frame order is kept either way.
+    """
+
     @classmethod
     def can_parse(cls, blobs: List[bytes]) -> bool:
         checks: List[bool] = []
@@ -116,9 +266,136 @@ class MultiPNGParser(BaseParser):
         hotspot: Tuple[int, int],
         sizes: Optional[List[Union[int, str]]] = None,
         delay: Optional[int] = None,
+        cache: Optional[ImageCache] = None,
+        pyramid: bool = False,
+        lazy: bool = False,
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
     ) -> None:
         super().__init__(blobs[0])
-        self.frames = []
-        for blob in blobs:
-            png = SinglePNGParser(blob, hotspot, sizes, delay)
-            self.frames.append(png.frames[0])
+        if cache is None:
+            cache = ImageCache()
+
+        def _parse(blob: bytes) -> CursorFrame:
+            png = SinglePNGParser(blob, hotspot, sizes, delay, cache, pyramid, lazy)
+            return png.frames[0]
+
+        if executor is not None:
+            self.frames = list(executor.map(_parse, blobs))
+        elif workers and workers > 1:
+            with ThreadPoolExecutor(workers) as pool:
+                self.frames = list(pool.map(_parse, blobs))
+        else:
+            self.frames = [_parse(blob) for blob in blobs]
+
+
+class PNGSetParser(BaseParser):
+    """Cursor from the same bitmap at several resolutions.
+
+    ``blobs`` holds the frames of each resolution, e.g. ``pointer@32.png``,
+    ``pointer@64.png`` and ``pointer@256.png``. Every size is resampled
+    from the smallest source at or above it, or from the largest source,
+    and an exact match is passed through. Source sizes are read from the
+    PNG headers, the hotspot is given for the largest source.
+    """
+
+    @classmethod
+    def can_parse(cls, blobs: List[List[bytes]]) -> bool:
+        if not isinstance(blobs, list) or not blobs:
+            return False
+        return all(
+            isinstance(b, list) and bool(b) and MultiPNGParser.can_parse(b)
+            for b in blobs
+        )
+
+    def __init__(
+        self,
+        blobs: List[List[bytes]],
+        hotspot: Tuple[int, int],
+        sizes: Optional[List[Union[int, str]]] = None,
+        delay: Optional[int] = None,
+        cache: Optional[ImageCache] = None,
+        pyramid: bool = False,
+        lazy: bool = False,
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        super().__init__(blobs[0][0])
+        self.pyramid = pyramid
+        self.lazy = lazy
+        self._cache = ImageCache() if cache is None else cache
+
+        # 'set' to prevent value duplication
+        if not sizes:
+            self.sizes = set(SIZES)
+        else:
+            self.sizes = set(sizes)
+
+        if not delay:
+            self.delay = DELAY
+        else:
+            self.delay = delay
+
+        infos = validate_png_set(blobs, hotspot)
+        order = sorted(range(len(blobs)), key=lambda i: infos[i][:2])
+        self._infos = [infos[i] for i in order]
+        self._size = self._infos[-1][:2]
+        self.hotspot = hotspot
+
+        # Frames of every resolution, smallest resolution first
+        frames = list(zip(*(blobs[i] for i in order)))
+
+        if executor is not None:
+            self.frames = list(executor.map(self._parse, frames))
+        elif workers and workers > 1:
+            with ThreadPoolExecutor(workers) as pool:
+                self.frames = list(pool.map(self._parse, frames))
+        else:
+            self.frames = [self._parse(f) for f in frames]
+
+    def _source(self, size: int) -> int:
+        for i, info in enumerate(self._infos):
+            if info.width >= size and info.height >= size:
+                return i
+        return len(self._infos) - 1
+
+    def _parse(self, sources: Tuple[bytes, ...]) -> CursorFrame:
+        images: List[CursorImage] = []
+        for s in sorted(self.sizes):
+            size, canvas_size = parse_size(s)
+            i = self._source(size)
+            images.append(
+                _cursor_image(
+                    self._cache,
+                    self._cache.add(sources[i]),
+                    self._infos[i],
+                    sources[i],
+                    size,
+                    canvas_size,
+                    scale_hotspot(self.hotspot, size, self._size),
+                    self.pyramid,
+                    self.lazy,
+                )
+            )
+
+        return CursorFrame(images, delay=self.delay)
+
+
+def pyramid_quality(blob: bytes, sizes: Optional[List[int]] = None) -> Dict[int, float]:
+    """PSNR (in dB) of each pyramid resample against the direct resample.
+
+    Pixels are compared alpha-premultiplied, so color noise hidden under
+    fully transparent pixels doesn't count as a difference.
+    """
+    cache = ImageCache()
+    key = cache.add(blob)
+
+    def _pixels(size: int, pyramid: bool) -> np.ndarray:
+        img = cache.resize(key, size, size, pyramid).convert("RGBA").convert("RGBa")
+        return np.asarray(img, dtype=np.double)
+
+    result: Dict[int, float] = {}
+    for size in sorted(set(sizes or SIZES)):
+        mse = float(np.mean((_pixels(size, False) - _pixels(size, True)) ** 2))
+        result[size] = math.inf if mse == 0 else 10 * math.log10(255**2 / mse)
+    return result
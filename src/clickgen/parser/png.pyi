@@ -1,22 +1,57 @@
 from _typeshed import Incomplete
 from clickgen.cursors import CursorFrame as CursorFrame, CursorImage as CursorImage
 from clickgen.parser.base import BaseParser as BaseParser
+from clickgen.parser.cache import ImageCache as ImageCache
+from concurrent.futures import Executor
+from typing import NamedTuple
 
 SIZES: Incomplete
 DELAY: int
+SIGNATURE: bytes
+IHDR_CHUNK: Incomplete
+HEADER_SIZE: Incomplete
+COLOR_TYPES: Incomplete
+COLOR_TYPE_RGBA: int
+
+class PNGInfo(NamedTuple):
+    width: int
+    height: int
+    bit_depth: int
+    color_type: int
+
+def probe_png(blob: bytes) -> PNGInfo: ...
+def validate_png(blobs: list[bytes], hotspot: tuple[int, int], rgba: bool = False) -> list[PNGInfo]: ...
+def validate_png_set(sets: list[list[bytes]], hotspot: tuple[int, int], rgba: bool = False) -> list[PNGInfo]: ...
+def parse_size(s: int | str) -> tuple[int, int]: ...
+def scale_hotspot(hotspot: tuple[int, int], size: int, source_size: tuple[int, int]) -> tuple[int, int]: ...
 
 class SinglePNGParser(BaseParser):
     MAGIC: Incomplete
     @classmethod
     def can_parse(cls, blob: bytes) -> bool: ...
+    pyramid: Incomplete
+    lazy: Incomplete
     sizes: Incomplete
     delay: Incomplete
     hotspot: Incomplete
     frames: Incomplete
-    def __init__(self, blob: bytes, hotspot: tuple[int, int], sizes: list[int | str] | None = None, delay: int | None = None) -> None: ...
+    def __init__(self, blob: bytes, hotspot: tuple[int, int], sizes: list[int | str] | None = None, delay: int | None = None, cache: ImageCache | None = None, pyramid: bool = False, lazy: bool = False, workers: int | None = None, executor: Executor | None = None) -> None: ...
 
 class MultiPNGParser(BaseParser):
     @classmethod
     def can_parse(cls, blobs: list[bytes]) -> bool: ...
     frames: Incomplete
-    def __init__(self, blobs: list[bytes], hotspot: tuple[int, int], sizes: list[int | str] | None = None, delay: int | None = None) -> None: ...
+    def __init__(self, blobs: list[bytes], hotspot: tuple[int, int], sizes: list[int | str] | None = None, delay: int | None = None, cache: ImageCache | None = None, pyramid: bool = False, lazy: bool = False, workers: int | None = None, executor: Executor | None = None) -> None: ...
+
+class PNGSetParser(BaseParser):
+    @classmethod
+    def can_parse(cls, blobs: list[list[bytes]]) -> bool: ...
+    pyramid: Incomplete
+    lazy: Incomplete
+    sizes: Incomplete
+    delay: Incomplete
+    hotspot: Incomplete
+    frames: Incomplete
+    def __init__(self, blobs: list[list[bytes]], hotspot: tuple[int, int], sizes: list[int | str] | None = None, delay: int | None = None, cache: ImageCache | None = None, pyramid: bool = False, lazy: bool = False, workers: int | None = None, executor: Executor | None = None) -> None: ...
+
+def pyramid_quality(blob: bytes, sizes: list[int] | None = None) -> dict[int, float]: ...
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import re
+from concurrent.futures import Executor
+from functools import partial
+from typing import List, Optional, Tuple, Union
+from xml.etree import ElementTree
+
+from PIL import Image
+
+from clickgen.cursors import CursorFrame, CursorImage
+from clickgen.parser.base import BaseParser
+from clickgen.parser.cache import ImageCache
+from clickgen.parser.png import DELAY, SIZES, parse_size, scale_hotspot
+
+SVG_TAG = "{http://www.w3.org/2000/svg}svg"
+LENGTH = re.compile(r"^\s*([0-9]*\.?[0-9]+)\s*(px)?\s*$")
+
+
+def is_svg(blob: bytes) -> bool:
+    head = blob[:1024].lstrip(b"\xef\xbb\xbf \t\r\n")
+    return head.startswith(b"<") and b"<svg" in head
+
+
+def probe_svg(blob: bytes) -> Tuple[float, float]:
+    """Size of the SVG in user units, from 'width'/'height' or the 'viewBox'."""
+    try:
+        _, root = next(ElementTree.iterparse(io.BytesIO(blob), events=("start",)))
+    except (ElementTree.ParseError, StopIteration) as e:
+        raise ValueError(f"Invalid SVG file: {e}") from e
+
+    if root.tag not in (SVG_TAG, "svg"):
+        raise ValueError("Not an SVG file")
+
+    width = LENGTH.match(root.get("width", ""))
+    height = LENGTH.match(root.get("height", ""))
+    if width and height:
+        return float(width.group(1)), float(height.group(1))
+
+    view_box = root.get("viewBox", "").replace(",", " ").split()
+    if len(view_box) == 4:
+        return float(view_box[2]), float(view_box[3])
+
+    raise ValueError("SVG needs 'width' and 'height' in px or a 'viewBox'")
+
+
+def rasterize_svg(blob: bytes, size: int) -> Image.Image:
+    try:
+        import cairosvg
+    except (ImportError, OSError) as e:
+        raise ImportError(
+            "SVG support requires 'cairosvg', install it with 'pip install clickgen[svg]'"
+        ) from e
+
+    png = cairosvg.svg2png(bytestring=blob, output_width=size, output_height=size)
+    return Image.open(io.BytesIO(png)).convert("RGBA")
+
+
+class SVGParser(BaseParser):
+    """Cursor from SVG sources, rasterized directly at every target size.
+
+    The hotspot is given in SVG user units and scaled like the PNG
+    parsers scale it. A list of SVGs is parsed as animation frames.
+    Rasterizing needs the optional 'cairosvg' dependency.
+    """
+
+    @classmethod
+    def can_parse(cls, blob: Union[bytes, List[bytes]]) -> bool:
+        blobs = blob if isinstance(blob, list) else [blob]
+        return bool(blobs) and all(isinstance(b, bytes) and is_svg(b) for b in blobs)
+
+    def __init__(
+        self,
+        blob: Union[bytes, List[bytes]],
+        hotspot: Tuple[int, int],
+        sizes: Optional[List[Union[int, str]]] = None,
+        delay: Optional[int] = None,
+        cache: Optional[ImageCache] = None,
+        pyramid: bool = False,
+        lazy: bool = False,
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        # Nothing is downscaled, so 'pyramid' has no effect. Frames are
+        # rasterized on the calling thread.
+        blobs = blob if isinstance(blob, list) else [blob]
+        super().__init__(blobs[0])
+        self.lazy = lazy
+        self._cache = ImageCache() if cache is None else cache
+
+        # 'set' to prevent value duplication
+        if not sizes:
+            self.sizes = set(SIZES)
+        else:
+            self.sizes = set(sizes)
+
+        if not delay:
+            self.delay = DELAY
+        else:
+            self.delay = delay
+
+        self._size = probe_svg(self.blob)
+        if hotspot[0] > self._size[0]:
+            raise ValueError(f"Hotspot x-coordinate too large: {hotspot[0]}")
+        if hotspot[1] > self._size[1]:
+            raise ValueError(f"Hotspot y-coordinate too large: {hotspot[1]}")
+        self.hotspot = hotspot
+
+        self.frames = [self._parse(b) for b in blobs]
+
+    def _render(self, blob: bytes, size: int, canvas_size: int) -> Image.Image:
+        digest = ImageCache.digest(blob)
+        key = f"{digest}@{size}"
+        if not self.lazy:
+            # Reuse a rasterization done for another cursor or platform
+            # by going through the cache. A same size 'resize' returns the
+            # rasterization itself, it's shared and never modified
+            if not self._cache.cached(key, size, canvas_size):
+                self._cache.add_image(key, rasterize_svg(blob, size), digest)
+            try:
+                return self._cache.resize(key, size, canvas_size)
+            finally:
+                self._cache.discard(key)
+
+        res_img = rasterize_svg(blob, size)
+        if size != canvas_size:
+            canvas = Image.new("RGBA", (canvas_size, canvas_size), (0, 0, 0, 0))
+            canvas.paste(res_img, (0, 0))
+            res_img = canvas
+        return res_img
+
+    def _parse(self, blob: bytes) -> CursorFrame:
+        digest = ImageCache.digest(blob)
+        images: List[CursorImage] = []
+        for s in sorted(self.sizes):
+            size, canvas_size = parse_size(s)
+            render = partial(self._render, blob, size, canvas_size)
+
+            images.append(
+                CursorImage(
+                    image=None if self.lazy else render(),
+                    hotspot=scale_hotspot(self.hotspot, size, self._size),  # type: ignore
+                    nominal=canvas_size,
+                    re_canvas=size != canvas_size,
+                    loader=render if self.lazy else None,
+                    size=(canvas_size, canvas_size),
+                    source=f"{digest}@{size}",
+                )
+            )
+
+        return CursorFrame(images, delay=self.delay)
@@ -0,0 +1,24 @@
+from _typeshed import Incomplete
+from PIL import Image
+from clickgen.cursors import CursorFrame as CursorFrame, CursorImage as CursorImage
+from clickgen.parser.base import BaseParser as BaseParser
+from clickgen.parser.cache import ImageCache as ImageCache
+from clickgen.parser.png import DELAY as DELAY, SIZES as SIZES, parse_size as parse_size, scale_hotspot as scale_hotspot
+from concurrent.futures import Executor
+
+SVG_TAG: str
+LENGTH: Incomplete
+
+def is_svg(blob: bytes) -> bool: ...
+def probe_svg(blob: bytes) -> tuple[float, float]: ...
+def rasterize_svg(blob: bytes, size: int) -> Image.Image: ...
+
+class SVGParser(BaseParser):
+    @classmethod
+    def can_parse(cls, blob: bytes | list[bytes]) -> bool: ...
+    lazy: Incomplete
+    sizes: Incomplete
+    delay: Incomplete
+    hotspot: Incomplete
+    frames: Incomplete
+    def __init__(self, blob: bytes | list[bytes], hotspot: tuple[int, int], sizes: list[int | str] | None = None, delay: int | None = None, cache: ImageCache | None = None, pyramid: bool = False, lazy: bool = False, workers: int | None = None, executor: Executor | None = None) -> None: ...
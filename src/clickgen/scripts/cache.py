@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+from pathlib import Path
+
+import clickgen
+from clickgen.artifacts import serve_artifacts
+from clickgen.libs.colors import bold, cyan, print_info, print_text
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="clickgen-cache",
+        description="Serve a directory as an HTTP artifact cache for 'ctgen --cache'.",
+    )
+
+    parser.add_argument(
+        "directory",
+        type=str,
+        help="Directory holding the cached cursors.",
+    )
+
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="Address to listen on.",
+    )
+
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="Port to listen on.",
+    )
+
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        default=None,
+        help="Evict the least recently used artifacts above this size (in MiB).",
+    )
+
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=None,
+        help="Evict artifacts unused for this many days.",
+    )
+
+    parser.add_argument(
+        "-v",
+        "--version",
+        action="version",
+        version=f"%(prog)s {clickgen.__version__}",  # type: ignore
+    )
+
+    args = parser.parse_args()
+
+    server = serve_artifacts(
+        Path(args.directory),
+        args.host,
+        args.port,
+        None if args.max_size is None else args.max_size << 20,
+        None if args.max_age is None else args.max_age * 86400,
+    )
+    host, port = server.server_address[:2]
+    print_info("Serving Artifact Cache:")
+    print_text(f"URL: {bold(cyan(f'http://{host}:{port}'))}")
+
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
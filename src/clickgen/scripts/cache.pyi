@@ -0,0 +1,4 @@
+from clickgen.artifacts import serve_artifacts as serve_artifacts
+from clickgen.libs.colors import bold as bold, cyan as cyan, print_info as print_info, print_text as print_text
+
+def main() -> None: ...
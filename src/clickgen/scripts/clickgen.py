@@ -12,8 +12,8 @@ from typing import BinaryIO, List
 import clickgen
 from clickgen.parser import open_blob
 from clickgen.parser.png import DELAY, SIZES
-from clickgen.writer.windows import to_win
-from clickgen.writer.x11 import to_x11
+from clickgen.writer.windows import COMPRESSION_PROFILES, write_win
+from clickgen.writer.x11 import write_x11
 
 
 def main() -> None:
@@ -73,6 +73,23 @@ def main() -> None:
         type=int,
         help="Set delay between frames of cursor.",
     )
+    parser.add_argument(
+        "--pyramid",
+        action="store_true",
+        help="Downscale through a 'reduce()' pyramid instead of resampling every size from the full bitmap.",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=list(COMPRESSION_PROFILES),
+        default="default",
+        help="PNG compression of Windows cursors, 'fast' for previews and 'max' for releases.",
+    )
+    parser.add_argument(
+        "--dib-max-size",
+        type=int,
+        default=0,
+        help="Store Windows cursor sizes up to this canvas size as uncompressed bitmaps instead of PNG.",
+    )
     parser.add_argument(
         "-v",
         "--version",
@@ -90,7 +107,7 @@ def main() -> None:
     blobs: List[bytes] = [f.read() for f in files]
 
     try:
-        cursor = open_blob(blobs, hotspot, args.sizes, args.delay)
+        cursor = open_blob(blobs, hotspot, args.sizes, args.delay, pyramid=args.pyramid)
     except Exception:
         with print_lock:
             print(f"Error occurred while processing {name.name}:", file=sys.stderr)
@@ -98,13 +115,20 @@ def main() -> None:
     else:
 
         def gen_xcursor() -> None:
-            result = to_x11(cursor.frames)
-            output.write_bytes(result)
+            with open(output, "wb") as fp:
+                write_x11(cursor.platform_frames("x11"), fp)
 
         def gen_wincursor() -> None:
-            ext, result = to_win(cursor.frames)
-            win_output = output.with_suffix(ext)
-            win_output.write_bytes(result)
+            # The extension is only known once written
+            tmp = output.with_suffix(".part")
+            with open(tmp, "wb") as fp:
+                ext = write_win(
+                    cursor.platform_frames("windows"),
+                    fp,
+                    compression=args.compression,
+                    dib_max_size=args.dib_max_size,
+                )
+            os.replace(tmp, output.with_suffix(ext))
 
         if args.platform == "x11":
             gen_xcursor()
@@ -1,6 +1,6 @@
 from clickgen.parser import open_blob as open_blob
 from clickgen.parser.png import DELAY as DELAY, SIZES as SIZES
-from clickgen.writer.windows import to_win as to_win
-from clickgen.writer.x11 import to_x11 as to_x11
+from clickgen.writer.windows import COMPRESSION_PROFILES as COMPRESSION_PROFILES, write_win as write_win
+from clickgen.writer.x11 import write_x11 as write_x11
 
 def main() -> None: ...
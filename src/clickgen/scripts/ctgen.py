@@ -2,18 +2,41 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import operator
 import os
 import sys
 import traceback
 from contextlib import contextmanager
-from multiprocessing import cpu_count
-from multiprocessing.pool import ThreadPool
+from functools import partial
 from pathlib import Path
-from threading import Lock
-from typing import Any, Dict, Generator, List
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
 
 import clickgen
-from clickgen.configparser import parse_config_file
+from clickgen.artifacts import ArtifactCache, open_artifact_cache
+from clickgen.build import (
+    BitmapRefs,
+    TaskGraph,
+    process_pool,
+    group_by_bitmaps,
+    write_group,
+    write_platforms,
+)
+from clickgen.configparser import (
+    BuildPlan,
+    CursorSpec,
+    plan_config_file,
+    render_key,
+    win_extension,
+)
 from clickgen.libs.colors import (
     blue,
     bold,
@@ -25,8 +48,11 @@ from clickgen.libs.colors import (
     print_subtext,
     print_text,
 )
+from clickgen.manifest import Manifest, cursor_digest, manifest_path
 from clickgen.packer.windows import pack_win
 from clickgen.packer.x11 import pack_x11
+from clickgen.parser import ImageCache
+from clickgen.writer.windows import COMPRESSION_PROFILES, EntryCache
 
 
 def get_kwargs(args) -> Dict[str, Any]:
@@ -44,6 +70,11 @@ def get_kwargs(args) -> Dict[str, Any]:
         kwargs["win_sizes"] = args.sizes
         kwargs["x11_sizes"] = args.sizes
 
+    if args.compression:
+        kwargs["compression"] = args.compression
+    if args.dib_max_size is not None:
+        kwargs["dib_max_size"] = args.dib_max_size
+
     if args.bitmaps_dir:
         kwargs["bitmaps_dir"] = Path(args.bitmaps_dir)
     if args.out_dir:
@@ -52,6 +83,13 @@ def get_kwargs(args) -> Dict[str, Any]:
     return kwargs
 
 
+def non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative: {value}")
+    return number
+
+
 @contextmanager
 def cwd(path) -> Generator[None, None, None]:
     oldpwd = os.getcwd()
@@ -62,6 +100,255 @@ def cwd(path) -> Generator[None, None, None]:
         os.chdir(oldpwd)
 
 
+def remove_outputs(paths: List[Path]) -> None:
+    for path in paths:
+        if path.is_symlink() or path.is_file():
+            path.unlink()
+
+
+def stale_cursors(
+    plan: BuildPlan, platform: str, manifest: Manifest, force: bool = False
+) -> List[Tuple[CursorSpec, str, str]]:
+    """Cursors of a plan to build on ``platform`` with their manifest keys
+    and digests, skipping cursors the manifest records as built from the
+    same inputs. Outputs of cursors no longer in the plan are removed."""
+    attr, color = ("x11_name", blue) if platform == "x11" else ("win_name", magenta)
+    specs = [spec for spec in plan.cursors if getattr(spec, attr)]
+    remove_outputs(manifest.prune(platform, [spec.name for spec in specs]))
+
+    stale: List[Tuple[CursorSpec, str, str]] = []
+    for spec in specs:
+        key = Manifest.key(platform, spec.name)
+        digest = cursor_digest(spec, platform)
+        if not force and manifest.is_current(key, digest):
+            print_text(f"Unchanged '{color(getattr(spec, attr))}'")
+        else:
+            stale.append((spec, key, digest))
+    return stale
+
+
+def save_x11_cursor(out_dir: Path, spec: CursorSpec, x_cursor: Path) -> List[Path]:
+    name = x_cursor.name
+    print_text(f"Bitmaping '{blue(name)}'")
+
+    # Creating symlinks, replacing the ones of an earlier build
+    outputs = [x_cursor]
+    with cwd(out_dir):
+        for link in spec.x11_symlinks:
+            print_subtext(f"Linking '{magenta(link)}' with '{name}'")
+            remove_outputs([Path(link)])
+            os.symlink(name, link)
+            outputs.append(out_dir / link)
+    return outputs
+
+
+def save_win_cursor(out_dir: Path, spec: CursorSpec, win_cursor: Path) -> List[Path]:
+    print_text(f"Bitmaping '{magenta(win_cursor.name)}'")
+    return [win_cursor]
+
+
+def write_artifact(
+    out_dir: Path, spec: CursorSpec, platform: str, artifacts: ArtifactCache, key: str
+) -> Optional[Path]:
+    """Copy the artifact ``key`` of a cursor to ``out_dir``, returns its path
+    or ``None`` when it isn't cached."""
+    blob = artifacts.get(key)
+    if blob is None:
+        return None
+
+    if platform == "x11":
+        path = out_dir / str(spec.x11_name)
+    else:
+        path = out_dir / f"{spec.win_name}{win_extension(blob)}"
+    remove_outputs([path])
+    path.write_bytes(blob)
+    return path
+
+
+def schedule_cursors(  # noqa: C901
+    graph: TaskGraph,
+    source: str,
+    plan: BuildPlan,
+    platform: str,
+    out_dir: Path,
+    manifest: Manifest,
+    save: Callable[[CursorSpec, Path], List[Path]],
+    refs: BitmapRefs,
+    entry_cache: EntryCache,
+    force: bool = False,
+    artifacts: Optional[ArtifactCache] = None,
+    pool: bool = False,
+    release: bool = False,
+) -> List[Hashable]:
+    """Add a task for every stale cursor of a plan on ``platform``, which
+    renders it straight into ``out_dir``. With ``artifacts`` a cursor is
+    first looked up by a task of its own, the render is skipped when it's
+    found and copied there. In a pool, cursors sharing bitmaps are written
+    by one task, weighed by its estimated memory, and with ``release`` the
+    worker drops their bitmaps once written. Returns the task names."""
+
+    def done(spec: CursorSpec, key: str, digest: str, miss: str, path: Path) -> None:
+        if artifacts is not None and miss:
+            artifacts.put(miss, path.read_bytes())
+        remove_outputs(manifest.update(key, digest, save(spec, path)))
+        if not pool:
+            refs.release(spec)
+
+    def copied(spec: CursorSpec, path: Optional[Path]) -> None:
+        if path is not None:
+            # Dropped from its render task, which hasn't started yet
+            members[spec.name].remove(spec)
+            key, digest, _ = inputs[spec.name]
+            done(spec, key, digest, "", path)
+
+    def written(specs: List[CursorSpec], paths: List[Path]) -> None:
+        for spec, path in zip(specs, paths):
+            done(spec, *inputs[spec.name], path)
+
+    stale = stale_cursors(plan, platform, manifest, force)
+    inputs: Dict[str, Tuple[str, str, str]] = {}
+    fetches: Dict[str, Hashable] = {}
+    for spec, key, digest in stale:
+        render = render_key(spec, platform) if artifacts is not None else ""
+        inputs[spec.name] = (key, digest, render)
+        if not pool:
+            refs.acquire(spec)
+
+        if artifacts is not None:
+            fetches[spec.name] = graph.add(
+                ("fetch", source, platform, spec.name),
+                write_artifact,
+                out_dir,
+                spec,
+                platform,
+                artifacts,
+                render,
+                cost=spec.platform_work(platform),
+                then=partial(copied, spec),
+                local=True,
+            )
+
+    specs = [spec for spec, _, _ in stale]
+    groups = group_by_bitmaps(specs) if pool else [[spec] for spec in specs]
+    members: Dict[str, List[CursorSpec]] = {}
+    names: List[Hashable] = []
+    for group in groups:
+        # Cursors found in 'artifacts' are removed from their group before
+        # its task starts, and the task is skipped once the group is empty
+        members.update(dict.fromkeys((spec.name for spec in group), group))
+
+        name = ("render", source, platform, group[0].name)
+        cost = sum(spec.platform_work(platform) for spec in group)
+        deps = [fetches[spec.name] for spec in group if spec.name in fetches]
+        then = partial(written, group)
+        skip = partial(operator.not_, group)
+        if pool:
+            # The cursors of a group share their sources and resamples
+            memory = max(spec.platform_memory(platform) for spec in group)
+            args = (write_group, group, platform, out_dir, release)
+        else:
+            memory = 0
+            args = (write_platforms, group, platform, out_dir, refs.cache, entry_cache)
+        graph.add(
+            name,
+            *args,
+            cost=cost,
+            memory=memory,
+            deps=deps,
+            then=then,
+            skip=skip,
+        )
+        names.append(name)
+    return names
+
+
+def schedule_theme(
+    graph: TaskGraph,
+    source: str,
+    plan: BuildPlan,
+    force: bool = False,
+    artifacts: Optional[ArtifactCache] = None,
+    pool: bool = False,
+    release: bool = False,
+) -> None:
+    """Add the render tasks of a plan, and a packaging task per platform that
+    runs as soon as that platform's cursors are written. Tasks are named
+    after ``source``, the config file the plan comes from."""
+    theme = plan.theme
+    config = plan.config
+    manifest = Manifest(manifest_path(config.out_dir, theme.name))
+    refs = BitmapRefs(ImageCache())
+    entry_cache = EntryCache()
+
+    def pack(platform: str, out_dir: Path) -> None:
+        manifest.save()
+        if platform == "x11":
+            print_done(f"XCursors Generation of '{theme.name}'")
+            pack_x11(out_dir.parent, theme.name, theme.comment)
+            print_done(f"Packaging XCursors of '{theme.name}'")
+        else:
+            print_done(f"Windows Cursors Generation of '{theme.name}'")
+            pack_win(out_dir, theme.name, theme.comment, theme.website)
+            print_done(f"Packaging Windows Cursors of '{theme.name}'")
+
+    # Generating XCursor
+    if "x11" in config.platforms:
+        print_info(f"Scheduling XCursors of '{theme.name}':")
+
+        x11_out_dir = config.out_dir / theme.name / "cursors"
+        x11_out_dir.mkdir(parents=True, exist_ok=True)
+        save = partial(save_x11_cursor, x11_out_dir)
+        deps = schedule_cursors(
+            graph,
+            source,
+            plan,
+            "x11",
+            x11_out_dir,
+            manifest,
+            save,
+            refs,
+            entry_cache,
+            force,
+            artifacts,
+            pool,
+            release,
+        )
+        graph.add(
+            ("pack", source, "x11"), pack, "x11", x11_out_dir, deps=deps, local=True
+        )
+
+    # Generating Windows cursors
+    if "windows" in config.platforms:
+        print_info(f"Scheduling Windows Cursors of '{theme.name}':")
+
+        win_out_dir = config.out_dir / f"{theme.name}-Windows"
+        win_out_dir.mkdir(parents=True, exist_ok=True)
+        save = partial(save_win_cursor, win_out_dir)
+        deps = schedule_cursors(
+            graph,
+            source,
+            plan,
+            "windows",
+            win_out_dir,
+            manifest,
+            save,
+            refs,
+            entry_cache,
+            force,
+            artifacts,
+            pool,
+            release,
+        )
+        graph.add(
+            ("pack", source, "windows"),
+            pack,
+            "windows",
+            win_out_dir,
+            deps=deps,
+            local=True,
+        )
+
+
 def main() -> None:  # noqa: C901
     parser = argparse.ArgumentParser(
         prog="ctgen",
@@ -135,6 +422,70 @@ def main() -> None:  # noqa: C901
         help="Change Platform for output cursors.",
     )
 
+    parser.add_argument(
+        "--compression",
+        choices=list(COMPRESSION_PROFILES),
+        default=None,
+        help="PNG compression of Windows cursors, 'fast' for previews and 'max' for releases.",
+    )
+
+    parser.add_argument(
+        "--dib-max-size",
+        type=int,
+        default=None,
+        help="Store Windows cursor sizes up to this canvas size as uncompressed bitmaps instead of PNG.",
+    )
+
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        default=False,
+        help="Only validate the config files and their bitmaps, without building the theme.",
+    )
+
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        default=False,
+        help="Rebuild every cursor, even those unchanged since the last build.",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=non_negative_int,
+        default=0,
+        help="Render cursors in this many worker processes, 1 to render on the main process (default: one per CPU).",
+    )
+
+    parser.add_argument(
+        "--max-memory",
+        type=int,
+        default=None,
+        help="Only start renders while their estimated peak memory stays within this budget (in MiB).",
+    )
+
+    parser.add_argument(
+        "--cache",
+        type=str,
+        default=None,
+        help="Directory or http(s) URL of an artifact cache shared between builds.",
+    )
+
+    parser.add_argument(
+        "--cache-max-size",
+        type=int,
+        default=None,
+        help="Evict the least recently used artifacts above this size (in MiB) after the build.",
+    )
+
+    parser.add_argument(
+        "--cache-max-age",
+        type=float,
+        default=None,
+        help="Evict artifacts unused for this many days after the build.",
+    )
+
     parser.add_argument(
         "-v",
         "--version",
@@ -144,26 +495,50 @@ def main() -> None:  # noqa: C901
 
     args = parser.parse_args()
     kwargs = get_kwargs(args)
-    print_lock = Lock()
+
+    artifacts = None
+    if args.cache:
+        artifacts = open_artifact_cache(
+            args.cache,
+            None if args.cache_max_size is None else args.cache_max_size << 20,
+            None if args.cache_max_age is None else args.cache_max_age * 86400,
+        )
 
     files: List[Path] = []
     for f in args.files:
         files.append(Path(f.name))
 
-    def process(file: Path) -> None:
+    def check(file: Path) -> bool:
         try:
-            cfg = parse_config_file(file, **kwargs)
-        except Exception:
-            with print_lock:
-                print(
-                    fail(f"Error occurred while processing {file.name}:"),
-                    file=sys.stderr,
-                )
-                traceback.print_exc()
-        else:
-            theme = cfg.theme
-            config = cfg.config
-            cursors = cfg.cursors
+            plan = plan_config_file(file, **kwargs)
+            work = plan.work
+        except Exception as e:
+            print(fail(f"{file.name}: {e}"), file=sys.stderr)
+            return False
+
+        print_info(f"Checking '{file.name}':")
+        print_text(f"Cursor Package: {bold(cyan(plan.theme.name))}")
+        print_text(f"Cursors: {len(plan.cursors)}")
+        print_text(f"Work Units: {work}")
+        print_done("Config Check")
+        return True
+
+    if args.check:
+        if not all([check(f) for f in files]):
+            sys.exit(1)
+        return
+
+    # One task graph for every cursor and platform of every config, workers
+    # only drop their caches after every task under a memory budget
+    jobs = args.jobs or os.cpu_count() or 1
+    executor = None if jobs == 1 else process_pool(jobs)
+    budget = None if args.max_memory is None else args.max_memory << 20
+    graph = TaskGraph()
+    for file in files:
+        try:
+            plan = plan_config_file(file, **kwargs)
+            theme = plan.theme
+            config = plan.config
 
             # Display Theme Info
             print_info("Parsing Metadata:")
@@ -172,49 +547,44 @@ def main() -> None:  # noqa: C901
             print_text(f"Platform Compliblity: {config.platforms}")
             print_done("Metadata Parsing")
 
-            # Generating XCursor
-            if "x11" in config.platforms:
-                print_info("Generating XCursors:")
-
-                x11_out_dir = config.out_dir / theme.name / "cursors"
-                x11_out_dir.mkdir(parents=True, exist_ok=True)
-
-                for c in cursors:
-                    if c.x11_cursor and c.x11_cursor_name:
-                        print_text(f"Bitmaping '{blue(c.x11_cursor_name)}'")
-                        x_cursor = x11_out_dir / c.x11_cursor_name
-                        x_cursor.write_bytes(c.x11_cursor)
-
-                        # Creating symlinks
-                        with cwd(x11_out_dir):
-                            for link in c.x11_symlinks:
-                                print_subtext(
-                                    f"Linking '{magenta(link)}' with '{c.x11_cursor_name}'"
-                                )
-                                os.symlink(x_cursor.name, link)
-
-                print_done("XCursors Generation")
-
-                pack_x11(x11_out_dir.parent, theme.name, theme.comment)
-                print_done("Packaging XCursors")
-
-            # Generating Windows cursors
-            if "windows" in config.platforms:
-                print_info("Generating Windows Cursors:")
-
-                win_out_dir = config.out_dir / f"{theme.name}-Windows"
-                win_out_dir.mkdir(parents=True, exist_ok=True)
-
-                for c in cursors:
-                    if c.win_cursor and c.win_cursor_name:
-                        print_text(f"Bitmaping '{magenta(c.win_cursor_name)}'")
-                        win_cursor = win_out_dir / c.win_cursor_name
-                        win_cursor.write_bytes(c.win_cursor)
-
-                print_done("Windows Cursors Generation")
-
-                pack_win(win_out_dir, theme.name, theme.comment, theme.website)
-                print_done("Packaging Windows Cursors")
+            schedule_theme(
+                graph,
+                file.name,
+                plan,
+                args.force,
+                artifacts,
+                executor is not None,
+                budget is not None,
+            )
+        except Exception:
+            print(
+                fail(f"Error occurred while processing {file.name}:"),
+                file=sys.stderr,
+            )
+            traceback.print_exc()
 
-    with ThreadPool(cpu_count()) as pool:
-        pool.map(process, files)
+    try:
+        # Only as many tasks as there are workers are submitted, so queued
+        # tasks don't count against the budget and the heaviest ready task
+        # is picked whenever a worker becomes free
+        failed = graph.run(executor, jobs, budget)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Errors are reported once, not for the tasks skipped because of them
+    reported: List[BaseException] = []
+    for name, error in failed.items():
+        if any(error is e for e in reported):
+            continue
+        reported.append(error)
+        print(fail(f"Error occurred while processing {name[1]}:"), file=sys.stderr)
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+    if artifacts is not None:
+        evicted = artifacts.evict()
+        print_info("Artifact Cache:")
+        print_text(f"Hits: {artifacts.hits}, Misses: {artifacts.misses}")
+        print_text(f"Hit Rate: {artifacts.hit_rate:.0%}")
+        if evicted:
+            print_text(f"Evicted: {evicted}")
@@ -1,9 +1,23 @@
-from clickgen.configparser import parse_config_file as parse_config_file
+from clickgen.artifacts import ArtifactCache as ArtifactCache, open_artifact_cache as open_artifact_cache
+from clickgen.build import BitmapRefs as BitmapRefs, TaskGraph as TaskGraph, group_by_bitmaps as group_by_bitmaps, process_pool as process_pool, write_group as write_group, write_platforms as write_platforms
+from clickgen.configparser import BuildPlan as BuildPlan, CursorSpec as CursorSpec, plan_config_file as plan_config_file, render_key as render_key, win_extension as win_extension
 from clickgen.libs.colors import blue as blue, bold as bold, cyan as cyan, fail as fail, magenta as magenta, print_done as print_done, print_info as print_info, print_subtext as print_subtext, print_text as print_text
+from clickgen.manifest import Manifest as Manifest, cursor_digest as cursor_digest, manifest_path as manifest_path
 from clickgen.packer.windows import pack_win as pack_win
 from clickgen.packer.x11 import pack_x11 as pack_x11
-from typing import Any, Generator
+from clickgen.parser import ImageCache as ImageCache
+from clickgen.writer.windows import COMPRESSION_PROFILES as COMPRESSION_PROFILES, EntryCache as EntryCache
+from pathlib import Path
+from typing import Any, Callable, Generator, Hashable
 
 def get_kwargs(args) -> dict[str, Any]: ...
+def non_negative_int(value: str) -> int: ...
 def cwd(path) -> Generator[None, None, None]: ...
+def remove_outputs(paths: list[Path]) -> None: ...
+def stale_cursors(plan: BuildPlan, platform: str, manifest: Manifest, force: bool = False) -> list[tuple[CursorSpec, str, str]]: ...
+def save_x11_cursor(out_dir: Path, spec: CursorSpec, x_cursor: Path) -> list[Path]: ...
+def save_win_cursor(out_dir: Path, spec: CursorSpec, win_cursor: Path) -> list[Path]: ...
+def write_artifact(out_dir: Path, spec: CursorSpec, platform: str, artifacts: ArtifactCache, key: str) -> Path | None: ...
+def schedule_cursors(graph: TaskGraph, source: str, plan: BuildPlan, platform: str, out_dir: Path, manifest: Manifest, save: Callable[[CursorSpec, Path], list[Path]], refs: BitmapRefs, entry_cache: EntryCache, force: bool = False, artifacts: ArtifactCache | None = None, pool: bool = False, release: bool = False) -> list[Hashable]: ...
+def schedule_theme(graph: TaskGraph, source: str, plan: BuildPlan, force: bool = False, artifacts: ArtifactCache | None = None, pool: bool = False, release: bool = False) -> None: ...
 def main() -> None: ...
@@ -1,7 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from clickgen.writer.windows import to_cur, to_win
-from clickgen.writer.x11 import to_x11
+from clickgen.writer.windows import EntryCache, to_cur, to_win, write_cur, write_win
+from clickgen.writer.x11 import to_x11, write_x11
 
-__all__ = ["to_x11", "to_cur", "to_win"]
+__all__ = [
+    "to_x11",
+    "to_cur",
+    "to_win",
+    "write_x11",
+    "write_cur",
+    "write_win",
+    "EntryCache",
+]
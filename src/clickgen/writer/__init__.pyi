@@ -1,4 +1,4 @@
-from clickgen.writer.windows import to_cur as to_cur, to_win as to_win
-from clickgen.writer.x11 import to_x11 as to_x11
+from clickgen.writer.windows import EntryCache as EntryCache, to_cur as to_cur, to_win as to_win, write_cur as write_cur, write_win as write_win
+from clickgen.writer.x11 import to_x11 as to_x11, write_x11 as write_x11
 
-__all__ = ['to_x11', 'to_cur', 'to_win']
+__all__ = ['to_x11', 'to_cur', 'to_win', 'write_x11', 'write_cur', 'write_win', 'EntryCache']
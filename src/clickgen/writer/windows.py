@@ -1,86 +1,289 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import hashlib
 import struct
+from collections import deque
+from concurrent.futures import Executor
+from functools import partial
 from io import BytesIO
-from itertools import chain
-from typing import List, Tuple
+from threading import Lock
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
+import numpy as np
 from PIL import Image
 
-from clickgen.cursors import CursorFrame
+from clickgen.cursors import CursorFrame, CursorImage
 
 # .CUR FILE FORMAT
 MAGIC = b"\0\0\02\0"
 ICO_TYPE_CUR = 2
 ICON_DIR = struct.Struct("<HHH")
 ICON_DIR_ENTRY = struct.Struct("<BBBBHHII")
+BITMAP_INFO_HEADER = struct.Struct("<IiiHHIIiiII")
 
 
-def to_cur(frame: CursorFrame) -> bytes:
-    header = ICON_DIR.pack(0, ICO_TYPE_CUR, len(frame))
-    directory: List[bytes] = []
-    image_data: List[bytes] = []
-    offset = ICON_DIR.size + len(frame) * ICON_DIR_ENTRY.size
+# Keyword arguments of 'Image.save()' for each PNG compression profile
+COMPRESSION_PROFILES: Dict[str, Dict[str, Any]] = {
+    "fast": {"compress_level": 1},
+    "default": {},
+    "max": {"compress_level": 9, "optimize": True},
+}
 
-    def re_canvas(size: int, img: Image.Image):
-        canvas = Image.new("RGBA", (size, size), (0, 0, 0, 0))
-        canvas.paste(img, (0, 0))
-        return canvas
 
-    for image in frame:
-        clone = image.image.copy()
-        width, height = clone.size
-        if width > 256 or height > 256:
-            raise ValueError(f"Image too big for CUR format: {width}x{height}")
-
-        # Resize cursor canvas to prevent blurriness
-        # Bug Report: https://github.com/ful1e5/Bibata_Cursor/issues/149
-        #
-        # | size | Regular (× ²⁄₃) | Large (× ⁴⁄₅) | Extra-Large (× 1) |
-        # | ---: | --------------: | ------------: | ----------------: |
-        # |   32 |     21.333 → 22 |     25.6 → 26 |                32 |
-        # |   48 |              32 |     38.4 → 39 |                48 |
-        # |   64 |     42.666 → 43 |     51.2 → 52 |                64 |
-        # |   96 |              64 |     76.8 → 77 |                96 |
-        # |  128 |     85.333 → 86 |   102.4 → 103 |               128 |
-        # |  256 |   170.666 → 171 |   204.8 → 205 |               256 |
+class EntryCache:
+    """Encoded PNG entries shared between .cur and .ani files.
 
-        blob = BytesIO()
-        if not image.re_canvas:
-            if width <= 32 or height <= 32:
-                re_canvas(32, clone).save(blob, "PNG")
-            elif width <= 48 or height <= 48:
-                re_canvas(48, clone).save(blob, "PNG")
-            elif width <= 64 or height <= 64:
-                re_canvas(64, clone).save(blob, "PNG")
-            elif width <= 96 or height <= 96:
-                re_canvas(96, clone).save(blob, "PNG")
-            elif width <= 128 or height <= 128:
-                re_canvas(128, clone).save(blob, "PNG")
+    Entries are addressed by a hash of the pixels, the canvas they are
+    padded to and the compression profile, so a bitmap showing up again
+    (in another cursor, or as a repeated frame) is encoded only once.
+    ``hits`` and ``misses`` count the lookups. The cache can be shared
+    between threads.
+    """
+
+    hits: int
+    misses: int
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[bytes, int, str], bytes] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def digest(image: Image.Image) -> bytes:
+        digest = hashlib.sha1(repr((image.mode, image.size)).encode())
+        digest.update(image.tobytes())
+        return digest.digest()
+
+    def get(self, key: Tuple[bytes, int, str]) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
             else:
-                re_canvas(256, clone).save(blob, "PNG")
-        else:
-            image.image.save(blob, "PNG")
+                self.hits += 1
+            return data
+
+    def put(self, key: Tuple[bytes, int, str], data: bytes) -> None:
+        with self._lock:
+            self._entries[key] = data
+
+
+def _re_canvas(size: int, img: Image.Image) -> Image.Image:
+    canvas = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    canvas.paste(img, (0, 0))
+    return canvas
+
+
+def _canvas_size(width: int, height: int) -> int:
+    # Resize cursor canvas to prevent blurriness
+    # Bug Report: https://github.com/ful1e5/Bibata_Cursor/issues/149
+    #
+    # | size | Regular (× ²⁄₃) | Large (× ⁴⁄₅) | Extra-Large (× 1) |
+    # | ---: | --------------: | ------------: | ----------------: |
+    # |   32 |     21.333 → 22 |     25.6 → 26 |                32 |
+    # |   48 |              32 |     38.4 → 39 |                48 |
+    # |   64 |     42.666 → 43 |     51.2 → 52 |                64 |
+    # |   96 |              64 |     76.8 → 77 |                96 |
+    # |  128 |     85.333 → 86 |   102.4 → 103 |               128 |
+    # |  256 |   170.666 → 171 |   204.8 → 205 |               256 |
+    for size in (32, 48, 64, 96, 128):
+        if width <= size or height <= size:
+            return size
+    return 256
+
+
+def _encode_dib(img: Image.Image) -> bytes:
+    """32-bit BGRA bitmap with an AND mask, stored bottom-up as in .ico files."""
+    pixels = np.asarray(img.convert("RGBA"))[::-1]
+    height, width = pixels.shape[:2]
+
+    xor_mask = pixels[..., [2, 1, 0, 3]].tobytes()
+
+    # 1-bit mask, set for fully transparent pixels, rows padded to 32 bits
+    bits = np.packbits(pixels[..., 3] == 0, axis=1)
+    and_mask = np.zeros((height, (bits.shape[1] + 3) & ~3), dtype=np.uint8)
+    and_mask[:, : bits.shape[1]] = bits
+
+    header = BITMAP_INFO_HEADER.pack(
+        BITMAP_INFO_HEADER.size,
+        width,
+        height * 2,
+        1,
+        32,
+        0,
+        len(xor_mask) + and_mask.nbytes,
+        0,
+        0,
+        0,
+        0,
+    )
+    return header + xor_mask + and_mask.tobytes()
+
+
+def _encode_cur_image(
+    image: CursorImage,
+    compression: str = "default",
+    cache: Optional[EntryCache] = None,
+    dib_max_size: int = 0,
+) -> Tuple[bytes, int]:
+    """Encoded entry and the size recorded for it in the directory."""
+    width, height = image.size
+    if width > 256 or height > 256:
+        raise ValueError(f"Image too big for CUR format: {width}x{height}")
+
+    # Re-canvased images are already padded and are stored as they are
+    canvas_size = 0 if image.re_canvas else _canvas_size(width, height)
+
+    # Small entries are stored uncompressed, nothing to deflate or inflate
+    dib = (canvas_size or max(width, height)) <= dib_max_size
+    profile = "dib" if dib else compression
+
+    # Bitmaps are read with the size from the directory, so it has to be
+    # the padded one. PNG entries keep recording the source height.
+    size = (canvas_size or height) if dib else height
+
+    # The source PNG already fits the canvas, stored without decoding it
+    fits = canvas_size in (0, width) and width == height
+    if image.blob is not None and fits and not dib:
+        return image.blob, size
+
+    img = image.image
+    key = None
+    if cache is not None:
+        key = (cache.digest(img), canvas_size, profile)
+        data = cache.get(key)
+        if data is not None:
+            return data, size
+
+    if canvas_size:
+        img = _re_canvas(canvas_size, img)
+
+    if dib:
+        data = _encode_dib(img)
+    else:
+        blob = BytesIO()
+        img.save(blob, "PNG", **COMPRESSION_PROFILES[compression])
+        data = blob.getvalue()
+
+    if cache is not None and key is not None:
+        cache.put(key, data)
+    return data, size
+
+
+def _encode_entry(
+    image: CursorImage,
+    compression: str = "default",
+    cache: Optional[EntryCache] = None,
+    dib_max_size: int = 0,
+) -> Tuple[Tuple[int, int], bytes, int]:
+    data, size = _encode_cur_image(image, compression, cache, dib_max_size)
+    image.release()
+    return image.hotspot, data, size
+
+
+def _encode_frame(
+    frame: CursorFrame,
+    executor: Optional[Executor] = None,
+    compression: str = "default",
+    cache: Optional[EntryCache] = None,
+    dib_max_size: int = 0,
+) -> Iterator[Tuple[Tuple[int, int], bytes, int]]:
+    """Encoded ``(hotspot, data, size)`` entries of a frame, in order.
+
+    With an ``executor`` all entries are submitted right away and encoded
+    concurrently, zlib releases the GIL.
+    """
+    if compression not in COMPRESSION_PROFILES:
+        raise ValueError(f"Unknown compression profile: {compression!r}")
+
+    encode = partial(
+        _encode_entry,
+        compression=compression,
+        cache=cache,
+        dib_max_size=dib_max_size,
+    )
+    if executor is None:
+        return map(encode, frame)
+    return executor.map(encode, frame)
+
 
-        blob.seek(0)
-        image_data.append(blob.read())
-        x_offset, y_offset = image.hotspot
+def _write_cur(
+    fp: BinaryIO, count: int, entries: Iterable[Tuple[Tuple[int, int], bytes, int]]
+) -> int:
+    base = fp.tell()
+    fp.write(ICON_DIR.pack(0, ICO_TYPE_CUR, count))
+    fp.write(bytes(count * ICON_DIR_ENTRY.size))
+    offset = ICON_DIR.size + count * ICON_DIR_ENTRY.size
+
+    directory: List[bytes] = []
+    for (x_offset, y_offset), data, size in entries:
+        fp.write(data)
         directory.append(
             ICON_DIR_ENTRY.pack(
-                height & 0xFF,
-                height & 0xFF,
+                size & 0xFF,
+                size & 0xFF,
                 0,
                 0,
                 x_offset,
                 y_offset,
-                blob.getbuffer().nbytes,
+                len(data),
                 offset,
             )
         )
-        offset += blob.getbuffer().nbytes
+        offset += len(data)
+
+    fp.seek(base + ICON_DIR.size)
+    fp.write(b"".join(directory))
+    fp.seek(base + offset)
+    return offset
+
+
+def write_cur(
+    frame: CursorFrame,
+    fp: BinaryIO,
+    executor: Optional[Executor] = None,
+    compression: str = "default",
+    cache: Optional[EntryCache] = None,
+    dib_max_size: int = 0,
+) -> int:
+    """Write a .cur file to a seekable binary file object, one image at a time.
 
-    return b"".join(chain([header], directory, image_data))
+    The directory is written as a placeholder and patched once every image
+    size is known. With an ``executor`` the images are encoded
+    concurrently, the output is the same. ``compression`` is one of
+    ``COMPRESSION_PROFILES``, encoded entries are reused through ``cache``.
+    Entries up to ``dib_max_size`` pixels are stored as uncompressed 32-bit
+    bitmaps instead of PNG. Images carrying their source PNG (``blob``) that
+    already fit their canvas are stored as they are, without being decoded
+    or compressed again. Returns the number of bytes written.
+    """
+    entries = _encode_frame(frame, executor, compression, cache, dib_max_size)
+    return _write_cur(fp, len(frame), entries)
+
+
+def to_cur(
+    frame: CursorFrame,
+    executor: Optional[Executor] = None,
+    compression: str = "default",
+    cache: Optional[EntryCache] = None,
+    dib_max_size: int = 0,
+) -> bytes:
+    fp = BytesIO()
+    write_cur(frame, fp, executor, compression, cache, dib_max_size)
+    return fp.getvalue()
 
 
 # .ANI FILE FORMAT
@@ -99,15 +302,29 @@ UNSIGNED = struct.Struct("<I")
 SEQUENCE_FLAG = 0x2
 ICON_FLAG = 0x1
 
+# Distinct frames encoded ahead of the one being written, with an executor
+FRAMES_IN_FLIGHT = 4
+
+
+def _write_chunk(fp: BinaryIO, chunk_id: bytes, write: Callable[[], int]) -> int:
+    """Write a RIFF chunk whose size is only known once its data is written."""
+    start = fp.tell()
+    fp.write(CHUNK_HEADER.pack(chunk_id, 0))
+    size = write()
+    if size & 1:
+        fp.write(b"\0")
+    end = fp.tell()
+
+    fp.seek(start)
+    fp.write(CHUNK_HEADER.pack(chunk_id, size))
+    fp.seek(end)
+    return end - start
+
 
 def get_ani_cur_list(frames: List[CursorFrame]) -> bytes:
     io = BytesIO()
     for frame in frames:
-        cur_file = to_cur(frame)
-        io.write(CHUNK_HEADER.pack(ICON_CHUNK, len(cur_file)))
-        io.write(cur_file)
-        if len(cur_file) & 1:
-            io.write(b"\0")
+        _write_chunk(io, ICON_CHUNK, partial(write_cur, frame, io))
     return io.getvalue()
 
 
@@ -119,26 +336,158 @@ def get_ani_rate_chunk(frames: List[CursorFrame]) -> bytes:
     return io.getvalue()
 
 
-def to_ani(frames: List[CursorFrame]) -> bytes:
-    ani_header = ANIH_HEADER.pack(
-        ANIH_HEADER.size, len(frames), len(frames), 0, 0, 32, 1, 1, ICON_FLAG
-    )
+def get_ani_seq_chunk(sequence: List[int]) -> bytes:
+    io = BytesIO()
+    io.write(CHUNK_HEADER.pack(SEQ_CHUNK, UNSIGNED.size * len(sequence)))
+    for index in sequence:
+        io.write(UNSIGNED.pack(index))
+    return io.getvalue()
+
+
+def _frame_digest(frame: CursorFrame) -> bytes:
+    # Images resampled from a known source are identified by it, so lazy
+    # images aren't loaded here, the others by their pixels
+    digest = hashlib.sha1()
+    for image in frame:
+        key = (image.size, image.nominal, image.hotspot, image.re_canvas)
+        if image.source is not None:
+            digest.update(repr((key, image.source)).encode())
+        else:
+            digest.update(repr((key, image.image.mode)).encode())
+            digest.update(image.image.tobytes())
+    return digest.digest()
 
-    cur_list = get_ani_cur_list(frames)
-    chunks = [
-        CHUNK_HEADER.pack(HEADER_CHUNK, len(ani_header)),
-        ani_header,
-        RIFF_HEADER.pack(LIST_CHUNK, len(cur_list) + 4, FRAME_TYPE),
-        cur_list,
-        get_ani_rate_chunk(frames),
-    ]
-    body = b"".join(chunks)
-    riff_header: bytes = RIFF_HEADER.pack(SIGNATURE, len(body) + 4, ANI_TYPE)
-    return riff_header + body
 
+def _encode_frames(
+    frames: List[CursorFrame],
+    sequence: List[int],
+    executor: Optional[Executor],
+    compression: str,
+    cache: Optional[EntryCache],
+    dib_max_size: int,
+) -> Iterator[Tuple[int, Iterator[Tuple[Tuple[int, int], bytes, int]]]]:
+    """Entry counts and encoded entries of every distinct frame, ``sequence``
+    is filled with the index of the distinct frame used at each step."""
+    unique: Dict[bytes, int] = {}
+    submitted: Deque[Tuple[int, Iterator[Tuple[Tuple[int, int], bytes, int]]]]
+    submitted = deque()
 
-def to_win(frames: List[CursorFrame]) -> Tuple[str, bytes]:
+    for frame in frames:
+        key = _frame_digest(frame)
+        if key in unique:
+            for image in frame:
+                image.release()
+        else:
+            unique[key] = len(unique)
+            # Serially a frame is written before the next one is loaded, with
+            # an executor at most 'FRAMES_IN_FLIGHT' frames are submitted
+            # ahead of the one being written
+            if executor is not None and len(submitted) >= FRAMES_IN_FLIGHT:
+                yield submitted.popleft()
+            entries = (
+                len(frame),
+                _encode_frame(frame, executor, compression, cache, dib_max_size),
+            )
+            if executor is None:
+                yield entries
+            else:
+                submitted.append(entries)
+        sequence.append(unique[key])
+
+    yield from submitted
+
+
+def write_ani(
+    frames: List[CursorFrame],
+    fp: BinaryIO,
+    executor: Optional[Executor] = None,
+    compression: str = "default",
+    cache: Optional[EntryCache] = None,
+    dib_max_size: int = 0,
+) -> int:
+    """Write a .ani file to a seekable binary file object, one frame at a time.
+
+    Frames identical to an earlier one are stored once and referenced from
+    a 'seq ' chunk. Chunk sizes are patched in once each chunk is written.
+    With an ``executor`` the images of all frames are encoded concurrently,
+    the output is the same. ``compression``, ``cache`` and ``dib_max_size``
+    are used as in ``write_cur()``. Returns the number of bytes written.
+    """
+    sequence: List[int] = []
+
+    def write_cur_list() -> int:
+        size = fp.write(FRAME_TYPE)
+        for count, entries in _encode_frames(
+            frames, sequence, executor, compression, cache, dib_max_size
+        ):
+            write = partial(_write_cur, fp, count, entries)
+            size += _write_chunk(fp, ICON_CHUNK, write)
+        return size
+
+    def write_body() -> int:
+        size = fp.write(ANI_TYPE)
+        size += fp.write(CHUNK_HEADER.pack(HEADER_CHUNK, ANIH_HEADER.size))
+        header_pos = fp.tell()
+        size += fp.write(bytes(ANIH_HEADER.size))
+        size += _write_chunk(fp, LIST_CHUNK, write_cur_list)
+
+        # Without repeated frames the layout is the plain one, without 'seq '
+        flags = ICON_FLAG
+        count = len(set(sequence))
+        if count < len(frames):
+            flags |= SEQUENCE_FLAG
+            size += fp.write(get_ani_seq_chunk(sequence))
+        size += fp.write(get_ani_rate_chunk(frames))
+
+        end = fp.tell()
+        fp.seek(header_pos)
+        fp.write(
+            ANIH_HEADER.pack(
+                ANIH_HEADER.size, count, len(frames), 0, 0, 32, 1, 1, flags
+            )
+        )
+        fp.seek(end)
+        return size
+
+    return _write_chunk(fp, SIGNATURE, write_body)
+
+
+def to_ani(
+    frames: List[CursorFrame],
+    executor: Optional[Executor] = None,
+    compression: str = "default",
+    cache: Optional[EntryCache] = None,
+    dib_max_size: int = 0,
+) -> bytes:
+    fp = BytesIO()
+    write_ani(frames, fp, executor, compression, cache, dib_max_size)
+    return fp.getvalue()
+
+
+def write_win(
+    frames: List[CursorFrame],
+    fp: BinaryIO,
+    executor: Optional[Executor] = None,
+    compression: str = "default",
+    cache: Optional[EntryCache] = None,
+    dib_max_size: int = 0,
+) -> str:
+    """Write a .cur or .ani file to ``fp``, returns the file extension."""
     if len(frames) == 1:
-        return ".cur", to_cur(frames[0])
+        write_cur(frames[0], fp, executor, compression, cache, dib_max_size)
+        return ".cur"
     else:
-        return ".ani", to_ani(frames)
+        write_ani(frames, fp, executor, compression, cache, dib_max_size)
+        return ".ani"
+
+
+def to_win(
+    frames: List[CursorFrame],
+    executor: Optional[Executor] = None,
+    compression: str = "default",
+    cache: Optional[EntryCache] = None,
+    dib_max_size: int = 0,
+) -> Tuple[str, bytes]:
+    fp = BytesIO()
+    ext = write_win(frames, fp, executor, compression, cache, dib_max_size)
+    return ext, fp.getvalue()
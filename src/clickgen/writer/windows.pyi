@@ -1,12 +1,27 @@
 from _typeshed import Incomplete
-from clickgen.cursors import CursorFrame as CursorFrame
+from PIL import Image
+from clickgen.cursors import CursorFrame as CursorFrame, CursorImage as CursorImage
+from concurrent.futures import Executor
+from typing import Any, BinaryIO
 
 MAGIC: bytes
 ICO_TYPE_CUR: int
 ICON_DIR: Incomplete
 ICON_DIR_ENTRY: Incomplete
+BITMAP_INFO_HEADER: Incomplete
+COMPRESSION_PROFILES: dict[str, dict[str, Any]]
 
-def to_cur(frame: CursorFrame) -> bytes: ...
+class EntryCache:
+    hits: int
+    misses: int
+    def __init__(self) -> None: ...
+    @staticmethod
+    def digest(image: Image.Image) -> bytes: ...
+    def get(self, key: tuple[bytes, int, str]) -> bytes | None: ...
+    def put(self, key: tuple[bytes, int, str], data: bytes) -> None: ...
+
+def write_cur(frame: CursorFrame, fp: BinaryIO, executor: Executor | None = None, compression: str = 'default', cache: EntryCache | None = None, dib_max_size: int = 0) -> int: ...
+def to_cur(frame: CursorFrame, executor: Executor | None = None, compression: str = 'default', cache: EntryCache | None = None, dib_max_size: int = 0) -> bytes: ...
 
 SIGNATURE: bytes
 ANI_TYPE: bytes
@@ -22,8 +37,12 @@ ANIH_HEADER: Incomplete
 UNSIGNED: Incomplete
 SEQUENCE_FLAG: int
 ICON_FLAG: int
+FRAMES_IN_FLIGHT: int
 
 def get_ani_cur_list(frames: list[CursorFrame]) -> bytes: ...
 def get_ani_rate_chunk(frames: list[CursorFrame]) -> bytes: ...
-def to_ani(frames: list[CursorFrame]) -> bytes: ...
-def to_win(frames: list[CursorFrame]) -> tuple[str, bytes]: ...
+def get_ani_seq_chunk(sequence: list[int]) -> bytes: ...
+def write_ani(frames: list[CursorFrame], fp: BinaryIO, executor: Executor | None = None, compression: str = 'default', cache: EntryCache | None = None, dib_max_size: int = 0) -> int: ...
+def to_ani(frames: list[CursorFrame], executor: Executor | None = None, compression: str = 'default', cache: EntryCache | None = None, dib_max_size: int = 0) -> bytes: ...
+def write_win(frames: list[CursorFrame], fp: BinaryIO, executor: Executor | None = None, compression: str = 'default', cache: EntryCache | None = None, dib_max_size: int = 0) -> str: ...
+def to_win(frames: list[CursorFrame], executor: Executor | None = None, compression: str = 'default', cache: EntryCache | None = None, dib_max_size: int = 0) -> tuple[str, bytes]: ...
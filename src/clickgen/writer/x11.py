@@ -1,14 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import hashlib
 import struct
-from itertools import chain
-from operator import itemgetter
-from typing import Any, List
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 
-from clickgen.cursors import CursorFrame
+from clickgen.cursors import CursorFrame, CursorImage
 
 # XCURSOR FILE FORMAT
 MAGIC = b"Xcur"
@@ -18,60 +17,174 @@ TOC_CHUNK = struct.Struct("<III")
 CHUNK_IMAGE = 0xFFFD0002
 IMAGE_HEADER = struct.Struct("<IIIIIIIII")
 
+# Pixels premultiplied per pass, bounds the scratch buffers
+PREMULTIPLY_BLOCK = 1 << 16
+
+
+def premultiply_alpha_inplace(
+    buffer: Union[bytearray, memoryview, np.ndarray],
+    block: Optional[int] = None,
+) -> None:
+    """Premultiply a writable buffer of 8-bit BGRA/RGBA pixels in place.
+
+    Each pixel is read as a little-endian 32-bit word, and the color
+    channels are multiplied two at a time in 16-bit fixed point lanes:
+    ``(x + 1 + (x >> 8)) >> 8`` with ``x = c * a`` is exactly
+    ``c * a // 255``. Pixels are processed in blocks, through scratch
+    buffers allocated once per call.
+    """
+    words = np.frombuffer(buffer, dtype="<u4")
+    block = block or PREMULTIPLY_BLOCK
+    alpha, lanes, green, carry = np.empty((4, min(block, len(words))), np.uint32)
+
+    for start in range(0, len(words), block):
+        end = start + block
+        px = words[start:end]
+        n = len(px)
+        a, rb, g, c = alpha[:n], lanes[:n], green[:n], carry[:n]
+
+        np.right_shift(px, 24, out=a)
+
+        # blue and red
+        np.bitwise_and(px, 0x00FF00FF, out=rb)
+        rb *= a
+        np.right_shift(rb, 8, out=c)
+        c &= 0x00FF00FF
+        rb += c
+        rb += 0x00010001
+        rb >>= 8
+        rb &= 0x00FF00FF
+
+        # green, kept in its byte
+        np.right_shift(px, 8, out=g)
+        g &= 0xFF
+        g *= a
+        np.right_shift(g, 8, out=c)
+        g += c
+        g += 1
+        g &= 0xFF00
+
+        a <<= 24
+        np.bitwise_or(rb, g, out=px)
+        px |= a
+
 
 def premultiply_alpha(source: bytes) -> bytes:
-    buffer: np.ndarray[Any, np.dtype[np.double]] = np.frombuffer(
-        source, dtype=np.uint8
-    ).astype(np.double)
-    alpha = buffer[3::4] / 255.0
-    buffer[0::4] *= alpha
-    buffer[1::4] *= alpha
-    buffer[2::4] *= alpha
-    return buffer.astype(np.uint8).tobytes()
+    buffer = bytearray(source)
+    premultiply_alpha_inplace(buffer)
+    return bytes(buffer)
 
 
-def to_x11(frames: List[CursorFrame]) -> bytes:
-    chunks = []
+def _pack_headers(toc: List[Tuple[int, int]]) -> bytes:
+    header = FILE_HEADER.pack(MAGIC, FILE_HEADER.size, VERSION, len(toc))
+    return header + b"".join(
+        TOC_CHUNK.pack(CHUNK_IMAGE, nominal, offset) for nominal, offset in toc
+    )
+
+
+def _pack_image_header(
+    delay: int, cursor: CursorImage, width: int, height: int
+) -> bytes:
+    hx, hy = cursor.hotspot
+    return IMAGE_HEADER.pack(
+        IMAGE_HEADER.size,
+        CHUNK_IMAGE,
+        cursor.nominal,
+        1,
+        width,
+        height,
+        hx,
+        hy,
+        delay,
+    )
+
+
+def _iter_chunks(
+    frames: List[CursorFrame], toc: List[Tuple[int, int]]
+) -> Iterator[Tuple[int, bytes, bytes]]:
+    """Yield every distinct image chunk as ``(offset, header, pixels)``.
+
+    ``toc`` is filled with a ``(nominal, offset)`` entry per image, images
+    with the same header and pixels share the offset of one chunk.
+    """
+    chunks: Dict[bytes, int] = {}
+    offset = FILE_HEADER.size + sum(map(len, frames)) * TOC_CHUNK.size
 
     for frame in frames:
         for cursor in frame:
-            hx, hy = cursor.hotspot
-            header = IMAGE_HEADER.pack(
-                IMAGE_HEADER.size,
-                CHUNK_IMAGE,
-                cursor.nominal,
-                1,
-                cursor.image.width,
-                cursor.image.height,
-                hx,
-                hy,
-                int(frame.delay),
-            )
-            chunks.append(
-                (
-                    CHUNK_IMAGE,
-                    cursor.nominal,
-                    header + premultiply_alpha(cursor.image.tobytes("raw", "BGRA")),
-                )
-            )
-
-    header = FILE_HEADER.pack(
-        MAGIC,
-        FILE_HEADER.size,
-        VERSION,
-        len(chunks),
-    )
+            width, height = cursor.size
+            header = _pack_image_header(int(frame.delay), cursor, width, height)
+            pixels = cursor.image.tobytes("raw", "BGRA")
+            if len(pixels) != width * height * 4:
+                raise ValueError(f"Image size changed while loading: {cursor!r}")
+            cursor.release()
+
+            digest = hashlib.sha1(header)
+            digest.update(pixels)
+            key = digest.digest()
+
+            if key not in chunks:
+                chunks[key] = offset
+                yield offset, header, pixels
+                offset += len(header) + len(pixels)
+
+            toc.append((cursor.nominal, chunks[key]))
+
+
+def to_x11(frames: List[CursorFrame]) -> bytes:
+    # The deduplicated layout is computed first, so the file is written
+    # into a single buffer allocated at its exact size
+    toc: List[Tuple[int, int]] = []
+    chunks = list(_iter_chunks(frames, toc))
+    size = FILE_HEADER.size + len(toc) * TOC_CHUNK.size
+    if chunks:
+        offset, header, pixels = chunks[-1]
+        size = offset + len(header) + len(pixels)
+
+    blob = bytearray(size)
+    with memoryview(blob) as view:
+        for offset, header, pixels in chunks:
+            start = offset + len(header)
+            end = start + len(pixels)
+            view[start:end] = pixels
+    headers = [(offset, header) for offset, header, _ in chunks]
+    del chunks
+
+    # One vectorized pass over the whole file: every header is a multiple
+    # of 4 bytes long, so pixels stay word aligned, and the headers
+    # are only written afterwards
+    premultiply_alpha_inplace(blob)
+
+    with memoryview(blob) as view:
+        data = _pack_headers(toc)
+        view[: len(data)] = data
+        for offset, header in headers:
+            end = offset + len(header)
+            view[offset:end] = header
+
+    return bytes(blob)
+
+
+def write_x11(frames: List[CursorFrame], fp: BinaryIO) -> int:
+    """Write an Xcursor file to a seekable binary file object, one image at
+    a time.
+
+    The TOC is written as a placeholder and patched once every chunk is
+    written. Returns the number of bytes written.
+    """
+    base = fp.tell()
+    end = FILE_HEADER.size + sum(map(len, frames)) * TOC_CHUNK.size
+    fp.write(bytes(end))
+
+    toc: List[Tuple[int, int]] = []
+    for offset, header, pixels in _iter_chunks(frames, toc):
+        data = bytearray(pixels)
+        premultiply_alpha_inplace(data)
+        fp.write(header)
+        fp.write(data)
+        end = offset + len(header) + len(data)
 
-    offset = FILE_HEADER.size + len(chunks) * TOC_CHUNK.size
-    toc = []
-    for chunk_type, chunk_subtype, chunk in chunks:
-        toc.append(
-            TOC_CHUNK.pack(
-                chunk_type,
-                chunk_subtype,
-                offset,
-            )
-        )
-        offset += len(chunk)
-
-    return b"".join(chain([header], toc, map(itemgetter(2), chunks)))
+    fp.seek(base)
+    fp.write(_pack_headers(toc))
+    fp.seek(base + end)
+    return end
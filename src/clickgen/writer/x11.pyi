@@ -1,5 +1,7 @@
 from _typeshed import Incomplete
-from clickgen.cursors import CursorFrame as CursorFrame
+from clickgen.cursors import CursorFrame as CursorFrame, CursorImage as CursorImage
+import numpy as np
+from typing import BinaryIO
 
 MAGIC: bytes
 VERSION: int
@@ -7,6 +9,9 @@ FILE_HEADER: Incomplete
 TOC_CHUNK: Incomplete
 CHUNK_IMAGE: int
 IMAGE_HEADER: Incomplete
+PREMULTIPLY_BLOCK: int
 
+def premultiply_alpha_inplace(buffer: bytearray | memoryview | np.ndarray, block: int | None = None) -> None: ...
 def premultiply_alpha(source: bytes) -> bytes: ...
 def to_x11(frames: list[CursorFrame]) -> bytes: ...
+def write_x11(frames: list[CursorFrame], fp: BinaryIO) -> int: ...
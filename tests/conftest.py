@@ -1,9 +1,11 @@
 import io
+import sys
+import types
 from pathlib import Path
 from typing import List, Tuple
 
 import pytest
-from PIL.Image import Image, open
+from PIL.Image import Image, new, open
 
 from clickgen.cursors import CursorFrame, CursorImage
 
@@ -24,6 +26,29 @@ def blobs(blob) -> List[bytes]:
     return [blob, blob]
 
 
+@pytest.fixture
+def frame_blobs(samples_dir) -> List[bytes]:
+    return [f.read_bytes() for f in sorted(samples_dir.glob("pngs/wait-*.png"))]
+
+
+def _save_animation(blobs: List[bytes], fmt: str, **kwargs) -> bytes:
+    frames = [open(io.BytesIO(b)) for b in blobs]
+    o = io.BytesIO()
+    frames[0].save(o, fmt, save_all=True, append_images=frames[1:], **kwargs)
+    return o.getvalue()
+
+
+@pytest.fixture
+def apng_blob(frame_blobs) -> bytes:
+    durations = [20 + i for i in range(len(frame_blobs))]
+    return _save_animation(frame_blobs, "PNG", duration=durations, loop=0)
+
+
+@pytest.fixture
+def gif_blob(frame_blobs) -> bytes:
+    return _save_animation(frame_blobs, "GIF", duration=40, loop=0, disposal=2)
+
+
 @pytest.fixture
 def dummy_blob(samples_dir) -> bytes:
     txt = samples_dir / "sample.toml"
@@ -111,3 +136,38 @@ def win_ani_tmp_dir(tmpdir_factory) -> Path:
         cfile = p / f"{f}.ani"
         cfile.write_text("test win cursors")
     return p
+
+
+@pytest.fixture
+def svg_blob() -> bytes:
+    return (
+        b'<?xml version="1.0" encoding="UTF-8"?>\n'
+        b'<svg xmlns="http://www.w3.org/2000/svg" width="200" height="200" '
+        b'viewBox="0 0 100 100"><rect x="10" y="10" width="80" height="80" '
+        b'fill="#ff0000"/></svg>'
+    )
+
+
+@pytest.fixture
+def source_set(image, blob) -> List[List[bytes]]:
+    def _png(size: int) -> bytes:
+        o = io.BytesIO()
+        image.resize((size, size), 1).save(o, "PNG")
+        return o.getvalue()
+
+    return [[_png(64)], [blob], [_png(32)]]
+
+
+@pytest.fixture
+def fake_rasterizer(monkeypatch):
+    """'cairosvg' stand-in filling the requested size with red."""
+    calls: List[int] = []
+
+    def svg2png(bytestring: bytes, output_width: int, output_height: int) -> bytes:
+        calls.append(output_width)
+        out = io.BytesIO()
+        new("RGBA", (output_width, output_height), (255, 0, 0, 255)).save(out, "PNG")
+        return out.getvalue()
+
+    monkeypatch.setitem(sys.modules, "cairosvg", types.SimpleNamespace(svg2png=svg2png))
+    return calls
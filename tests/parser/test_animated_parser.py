@@ -0,0 +1,96 @@
+import struct
+
+import pytest
+
+from clickgen.cursors import CursorFrame, CursorImage
+from clickgen.parser.animated import AnimatedParser, is_apng, is_gif, probe_gif
+from clickgen.parser.cache import ImageCache
+from clickgen.parser.png import MultiPNGParser
+from clickgen.writer.windows import RATE_CHUNK, UNSIGNED, to_ani
+from clickgen.writer.x11 import to_x11
+
+
+def test_is_apng(apng_blob, blob, gif_blob):
+    assert is_apng(apng_blob)
+    assert not is_apng(blob)
+    assert not is_apng(gif_blob)
+
+
+def test_is_gif(apng_blob, gif_blob):
+    assert is_gif(gif_blob)
+    assert not is_gif(apng_blob)
+
+
+def test_probe_gif(gif_blob, blob):
+    assert probe_gif(gif_blob[:10]) == (200, 200)
+    with pytest.raises(ValueError):
+        probe_gif(blob)
+
+
+def test_animated_parser_can_parse(apng_blob, gif_blob, blob, blobs, dummy_blob):
+    assert AnimatedParser.can_parse(apng_blob)
+    assert AnimatedParser.can_parse(gif_blob)
+    assert AnimatedParser.can_parse([apng_blob])
+    assert not AnimatedParser.can_parse([apng_blob, apng_blob])
+    assert not AnimatedParser.can_parse(blob)
+    assert not AnimatedParser.can_parse(blobs)
+    assert not AnimatedParser.can_parse(dummy_blob)
+
+
+def test_animated_parser_apng(apng_blob, frame_blobs, hotspot, sizes):
+    p = AnimatedParser(apng_blob, hotspot, sizes)
+
+    assert len(p.frames) == len(frame_blobs)
+    assert [f.delay for f in p.frames] == [20 + i for i in range(len(frame_blobs))]
+
+    for frame in p.frames:
+        assert isinstance(frame, CursorFrame)
+        for j, s in enumerate([12, 24]):
+            assert isinstance(frame[j], CursorImage)
+            assert frame[j].nominal == s
+            assert frame[j].image.size == (s, s)
+
+    # Same pixels as the frames given as separate PNG files
+    m = MultiPNGParser(frame_blobs, hotspot, sizes, delay=30)
+    assert to_x11(AnimatedParser(apng_blob, hotspot, sizes, 30).frames) == to_x11(
+        m.frames
+    )
+
+
+def test_animated_parser_gif(gif_blob, frame_blobs, hotspot):
+    p = AnimatedParser([gif_blob], hotspot, [24], delay=5)
+    assert len(p.frames) == len(frame_blobs)
+    assert all(f.delay == 5 for f in p.frames)
+    assert p.frames[0][0].image.mode == "RGBA"
+
+
+def test_animated_parser_shares_cache(apng_blob, hotspot):
+    c = ImageCache()
+    p1 = AnimatedParser(apng_blob, hotspot, [24, 32], cache=c)
+    p2 = AnimatedParser(apng_blob, hotspot, ["24:32", "32"], cache=c)
+
+    assert p1.frames[3][1].image is p2.frames[3][1].image
+    assert c.hits == len(p1.frames)
+
+
+def test_animated_parser_raises(apng_blob):
+    with pytest.raises(ValueError):
+        AnimatedParser(apng_blob, (201, 0))
+    with pytest.raises(ValueError):
+        AnimatedParser(apng_blob, (0, 201))
+
+
+def test_animated_parser_win_delays(gif_blob, frame_blobs, hotspot):
+    p = AnimatedParser(gif_blob, hotspot, [24])
+    assert all(f.delay == 40 for f in p.platform_frames("x11"))
+
+    # 40 ms are 2.4 jiffies (1/60 s) in the '.ani' rate chunk
+    ani = to_ani(p.platform_frames("windows"))
+    offset = ani.index(RATE_CHUNK)
+    (length,) = UNSIGNED.unpack_from(ani, offset + 4)
+    rates = struct.unpack_from(f"<{length // 4}I", ani, offset + 8)
+    assert rates == (2,) * len(frame_blobs)
+
+    # Given delays are in the unit of each platform already
+    p = AnimatedParser(gif_blob, hotspot, [24], delay=5)
+    assert p.platform_frames("windows") is p.frames
@@ -0,0 +1,109 @@
+from unittest import mock
+
+from PIL import Image
+
+from clickgen.parser.animated import AnimatedParser
+from clickgen.parser.cache import ImageCache
+from clickgen.parser.png import MultiPNGParser, SinglePNGParser
+from clickgen.parser.svg import SVGParser
+
+
+def test_image_cache_add(blob):
+    c = ImageCache()
+    k = c.add(blob)
+    assert c.add(bytes(bytearray(blob))) == k
+    assert c.image(k).size == (200, 200)
+
+
+def test_image_cache_resize(blob):
+    c = ImageCache()
+    k = c.add(blob)
+    i = c.resize(k, 24, 24)
+    assert i.size == (24, 24)
+    assert c.resize(k, 24, 24) is i
+    assert (c.hits, c.misses) == (1, 1)
+
+    j = c.resize(k, 24, 32)
+    assert j is not i
+    assert j.size == (32, 32)
+    assert (c.hits, c.misses) == (1, 2)
+
+
+def test_image_cache_shared_between_parsers(blob, hotspot):
+    c = ImageCache()
+    p1 = SinglePNGParser(blob, hotspot, sizes=[24, 32], cache=c)
+    p2 = SinglePNGParser(blob, hotspot, sizes=["32", "24:32"], cache=c)
+
+    assert p1.frames[0][1].image is p2.frames[0][1].image
+    assert p1.frames[0][0].image is not p2.frames[0][0].image
+    assert p2.frames[0][0].hotspot == p1.frames[0][0].hotspot
+    assert (c.hits, c.misses) == (1, 3)
+
+
+def test_image_cache_duplicate_frames(blob, hotspot):
+    c = ImageCache()
+    MultiPNGParser([blob, bytes(bytearray(blob))], hotspot, sizes=[24, 32], cache=c)
+    assert (c.hits, c.misses) == (2, 2)
+
+
+def test_image_cache_pyramid(blob):
+    c = ImageCache()
+    k = c.add(blob)
+    i = c.resize(k, 24, 24, pyramid=True)
+    assert i.size == (24, 24)
+    assert i is not c.resize(k, 24, 24)
+    assert c.resize(k, 24, 24, pyramid=True) is i
+
+
+def test_image_cache_release(blob):
+    c = ImageCache()
+    k = c.add(blob)
+    c.resize(k, 24, 24)
+    c.resize(k, 32, 32, pyramid=True)
+
+    c.discard(k)
+    assert c.cached(k, 24, 24)
+    c.release(k)
+    assert not c.cached(k, 24, 24)
+    assert not c.cached(k, 32, 32, pyramid=True)
+
+
+def test_image_cache_release_derived(apng_blob, svg_blob, fake_rasterizer):
+    c = ImageCache()
+    AnimatedParser(apng_blob, (0, 0), sizes=[24], cache=c)
+    SVGParser(svg_blob, (0, 0), sizes=[24], cache=c)
+    frame = f"{c.digest(apng_blob)}:0"
+    raster = f"{c.digest(svg_blob)}@24"
+    assert c.cached(frame, 24, 24) and c.cached(raster, 24, 24)
+
+    c.release(c.digest(apng_blob))
+    assert not c.cached(frame, 24, 24)
+    assert c.cached(raster, 24, 24)
+    c.release(c.digest(svg_blob))
+    assert not c.cached(raster, 24, 24)
+    assert not c._resized
+
+
+def test_image_cache_expected_resamples(blob):
+    c = ImageCache()
+    k = c.add(blob)
+    for _ in range(3):
+        c.expect(k)
+
+    with mock.patch("PIL.Image.open", wraps=Image.open) as m:
+        images = [c.resize(k, s, s, pyramid=True, store=False) for s in (24, 32, 48)]
+        assert m.call_count == 1
+        assert not c.cached(k, 24, 24, pyramid=True)
+
+        # Once every announced resample is done the source isn't kept
+        c.resize(k, 24, 24, pyramid=True, store=False)
+        assert m.call_count == 2
+    assert [i.size for i in images] == [(24, 24), (32, 32), (48, 48)]
+
+
+def test_lazy_parser_decodes_once(blob, hotspot):
+    c = ImageCache()
+    p = SinglePNGParser(blob, hotspot, [24, 32, 48], cache=c, lazy=True)
+    with mock.patch("PIL.Image.open", wraps=Image.open) as m:
+        assert [i.image.size for i in p.frames[0]] == [(24, 24), (32, 32), (48, 48)]
+        assert m.call_count == 1
@@ -1,7 +1,22 @@
+import io
+import math
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 from clickgen.cursors import CursorFrame, CursorImage
-from clickgen.parser.png import SIZES, MultiPNGParser, SinglePNGParser
+from clickgen.parser.cache import ImageCache
+from clickgen.parser.png import (
+    HEADER_SIZE,
+    SIZES,
+    MultiPNGParser,
+    PNGInfo,
+    PNGSetParser,
+    SinglePNGParser,
+    probe_png,
+    pyramid_quality,
+    validate_png,
+)
 
 
 def test_single_png_parser(blob, hotspot, sizes, delay):
@@ -74,3 +89,170 @@ def test_multi_png_parser(blobs, hotspot, sizes, delay):
 def test_multi_png_parser_can_parse(blobs, dummy_blobs):
     assert MultiPNGParser.can_parse(blobs)
     assert not SinglePNGParser.can_parse(dummy_blobs)
+
+
+def test_single_png_parser_pyramid(blob, hotspot):
+    p = SinglePNGParser(blob, hotspot, sizes=[16, 24, 96], pyramid=True)
+    direct = SinglePNGParser(blob, hotspot, sizes=[16, 24, 96])
+
+    for i, s in enumerate([16, 24, 96]):
+        assert p.frames[0][i].image.size == (s, s)
+        assert p.frames[0][i].hotspot == direct.frames[0][i].hotspot
+
+
+def test_pyramid_quality(blob):
+    q = pyramid_quality(blob, [16, 32, 200, 400])
+    assert sorted(q) == [16, 32, 200, 400]
+    assert q[16] > 25
+    assert q[32] > 25
+
+    # No reduction happens at or above the source size
+    assert q[200] == math.inf
+    assert q[400] == math.inf
+
+
+def test_single_png_parser_lazy(blob, hotspot):
+    cache = ImageCache()
+    p = SinglePNGParser(blob, hotspot, sizes=[16, 24], cache=cache, lazy=True)
+    eager = SinglePNGParser(blob, hotspot, sizes=[16, 24])
+
+    assert cache.misses == 0
+    for i, s in enumerate([16, 24]):
+        c = p.frames[0][i]
+        assert c.lazy
+        assert c.hotspot == eager.frames[0][i].hotspot
+        assert c.image.tobytes() == eager.frames[0][i].image.tobytes()
+
+    # Lazily produced images aren't kept in the cache
+    assert cache.misses == 2
+    p.frames[0][0].release()
+    p.frames[0][0].image
+    assert cache.misses == 3
+
+
+def test_probe_png(blob):
+    info = probe_png(blob[:HEADER_SIZE])
+    assert info == PNGInfo(width=200, height=200, bit_depth=8, color_type=6)
+
+
+def test_probe_png_raises(blob, dummy_blob):
+    with pytest.raises(ValueError):
+        probe_png(dummy_blob)
+    with pytest.raises(ValueError):
+        probe_png(blob[:20])
+    with pytest.raises(ValueError):
+        probe_png(blob[:12] + b"IDAT" + blob[16:])
+    with pytest.raises(ValueError):
+        probe_png(blob[:24] + bytes([3, 6]) + blob[26:])
+
+
+def test_single_png_parser_can_parse_truncated(blob):
+    assert not SinglePNGParser.can_parse(blob[:20])
+
+
+def test_validate_png(blob, hotspot):
+    infos = validate_png([blob, blob], hotspot, rgba=True)
+    assert len(infos) == 2
+
+    with pytest.raises(ValueError, match="x-coordinate"):
+        validate_png([blob], (201, 0))
+    with pytest.raises(ValueError, match="y-coordinate"):
+        validate_png([blob], (0, 201))
+
+
+def test_validate_png_raises_frame_size_mismatch(blob, image):
+    o = io.BytesIO()
+    image.resize((100, 100)).save(o, "PNG")
+    with pytest.raises(ValueError, match="Frame 2 size 100x100"):
+        validate_png([blob, o.getvalue()], (0, 0))
+
+
+def test_validate_png_raises_non_rgba(image, hotspot):
+    o = io.BytesIO()
+    image.convert("RGB").save(o, "PNG")
+    validate_png([o.getvalue()], hotspot)
+    with pytest.raises(ValueError, match="RGBA"):
+        validate_png([o.getvalue()], hotspot, rgba=True)
+
+
+def test_multi_png_parser_workers(frame_blobs, hotspot):
+    serial = MultiPNGParser(frame_blobs, hotspot, [16, 24])
+    parallel = MultiPNGParser(frame_blobs, hotspot, [16, 24], workers=4)
+
+    assert len(parallel.frames) == len(serial.frames)
+    for f1, f2 in zip(serial.frames, parallel.frames):
+        for c1, c2 in zip(f1, f2):
+            assert c1.image.tobytes() == c2.image.tobytes()
+            assert c1.hotspot == c2.hotspot
+
+
+def test_multi_png_parser_executor(frame_blobs, hotspot):
+    cache = ImageCache()
+    with ThreadPoolExecutor(4) as pool:
+        p = MultiPNGParser(frame_blobs, hotspot, [16], cache=cache, executor=pool)
+
+    # Every frame resampled once, no matter which thread got to it
+    assert cache.hits + cache.misses == len(frame_blobs)
+    assert [f.delay for f in p.frames] == [0] * len(frame_blobs)
+
+
+def test_multi_png_parser_workers_raises(frame_blobs):
+    with pytest.raises(ValueError):
+        MultiPNGParser(frame_blobs, (201, 0), workers=4)
+
+
+def test_single_png_parser_passthrough(image, hotspot):
+    o = io.BytesIO()
+    image.resize((32, 32), 1).save(o, "PNG")
+    blob = o.getvalue()
+
+    p = SinglePNGParser(blob, (10, 10), sizes=["24", "32:48", "32"])
+    small, same, re_canvased = p.frames[0]
+    assert small.blob is None
+    assert re_canvased.blob is None
+    assert same.blob == blob
+    # The decoded source is reused instead of resampled
+    assert same.image is p._image
+
+    o = io.BytesIO()
+    image.resize((32, 32), 1).convert("P").save(o, "PNG")
+    p = SinglePNGParser(o.getvalue(), (10, 10), sizes=[32])
+    assert p.frames[0][0].blob is None
+
+
+def test_png_set_parser(source_set, hotspot):
+    small, master, large = source_set[2][0], source_set[1][0], source_set[0][0]
+    assert PNGSetParser.can_parse(source_set)
+    assert not PNGSetParser.can_parse([small])
+
+    cache = ImageCache()
+    p = PNGSetParser(source_set, hotspot, sizes=[24, 32, 48, 96], cache=cache)
+    s24, s32, s48, s96 = p.frames[0]
+
+    def resampled(blob: bytes, size: int) -> bytes:
+        c = ImageCache()
+        return c.resize(c.add(blob), size, size).tobytes()
+
+    # Resampled from the smallest source at or above each size
+    assert s24.image.tobytes() == resampled(small, 24)
+    assert s48.image.tobytes() == resampled(large, 48)
+    assert s96.image.tobytes() == resampled(master, 96)
+    assert s32.blob == small
+    assert s48.blob is None
+
+    # The hotspot is given for the largest source
+    single = SinglePNGParser(master, hotspot, sizes=[24, 32, 48, 96])
+    assert [c.hotspot for c in p.frames[0]] == [c.hotspot for c in single.frames[0]]
+
+    with pytest.raises(ValueError):
+        PNGSetParser(source_set, (201, 0))
+    with pytest.raises(ValueError):
+        PNGSetParser([[small, small], [master]], (0, 0))
+
+
+def test_png_set_parser_frames(source_set, hotspot):
+    frames = [frame * 3 for frame in source_set]
+    with ThreadPoolExecutor(2) as executor:
+        p = PNGSetParser(frames, hotspot, sizes=[32], delay=5, executor=executor)
+    assert len(p.frames) == 3
+    assert all(f.delay == 5 and f[0].blob == source_set[2][0] for f in p.frames)
@@ -0,0 +1,131 @@
+import io
+import sys
+import types
+from typing import List
+
+import pytest
+from PIL import Image
+
+from clickgen.parser import PARSERS, SVGParser, open_blob
+from clickgen.parser.cache import ImageCache
+from clickgen.parser.svg import is_svg, probe_svg, rasterize_svg
+from clickgen.writer.windows import to_win
+from clickgen.writer.x11 import to_x11
+
+
+def _has_rasterizer() -> bool:
+    try:
+        import cairosvg  # noqa: F401
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+needs_rasterizer = pytest.mark.skipif(
+    not _has_rasterizer(), reason="'cairosvg' is not usable"
+)
+
+
+def test_svg_parser_registered():
+    assert SVGParser in PARSERS
+
+
+def test_svg_parser_can_parse(svg_blob, blob):
+    assert is_svg(svg_blob)
+    assert SVGParser.can_parse(svg_blob)
+    assert SVGParser.can_parse([svg_blob, svg_blob])
+    assert not SVGParser.can_parse(blob)
+    assert not SVGParser.can_parse([svg_blob, blob])
+    assert not SVGParser.can_parse([])
+
+
+def test_probe_svg(svg_blob):
+    assert probe_svg(svg_blob) == (200, 200)
+    assert probe_svg(b'<svg width="24px" height="32"/>') == (24, 32)
+    assert probe_svg(b'<svg width="1in" height="1in" viewBox="0,0,48,64"/>') == (
+        48,
+        64,
+    )
+
+    with pytest.raises(ValueError):
+        probe_svg(b"<svg/>")
+    with pytest.raises(ValueError):
+        probe_svg(b'<html width="1" height="1"/>')
+    with pytest.raises(ValueError):
+        probe_svg(b"<svg")
+
+
+def test_svg_parser_hotspot_out_of_bounds(svg_blob):
+    with pytest.raises(ValueError):
+        SVGParser(svg_blob, (201, 0))
+    with pytest.raises(ValueError):
+        SVGParser(svg_blob, (0, 201))
+
+
+@pytest.mark.skipif(_has_rasterizer(), reason="'cairosvg' is usable")
+def test_svg_parser_missing_rasterizer(svg_blob):
+    with pytest.raises(ImportError):
+        rasterize_svg(svg_blob, 24)
+
+
+@needs_rasterizer
+def test_svg_parser(svg_blob):
+    p = open_blob(svg_blob, (100, 50), sizes=["24", "32:48"])
+    assert isinstance(p, SVGParser)
+    assert len(p.frames) == 1
+
+    img24, img32 = p.frames[0].images
+    assert img24.image.size == (24, 24)
+    assert img24.hotspot == (12, 6)
+    assert img32.image.size == (48, 48)
+    assert img32.nominal == 48
+    assert img32.re_canvas
+
+    # rasterized at the target size, not resampled
+    assert img24.image.getpixel((12, 12)) == (255, 0, 0, 255)
+    assert img24.image.getpixel((0, 0))[3] == 0
+
+
+@needs_rasterizer
+def test_svg_parser_frames_and_cache(svg_blob):
+    cache = ImageCache()
+    p = SVGParser([svg_blob, svg_blob], (0, 0), sizes=[24], cache=cache)
+    assert len(p.frames) == 2
+    SVGParser(svg_blob, (0, 0), sizes=[24], cache=cache)
+    assert cache.misses == 1
+    assert cache.hits == 2
+
+
+@needs_rasterizer
+def test_svg_parser_lazy(svg_blob):
+    eager = SVGParser(svg_blob, (0, 0), sizes=["24:32"])
+    lazy = SVGParser(svg_blob, (0, 0), sizes=["24:32"], lazy=True)
+    img = lazy.frames[0].images[0]
+    assert img.lazy
+    assert img.image.tobytes() == eager.frames[0].images[0].image.tobytes()
+
+
+def test_svg_parser_render_and_resize(svg_blob, fake_rasterizer):
+    cache = ImageCache()
+    p = SVGParser(svg_blob, (100, 50), sizes=["24", "32:48"], cache=cache)
+    img24, img32 = p.frames[0].images
+    assert img24.image.size == (24, 24)
+    assert img24.hotspot == (12, 6)
+    assert img32.image.size == (48, 48)
+    assert img32.image.getpixel((0, 0)) == (255, 0, 0, 255)
+    assert img32.image.getpixel((40, 40))[3] == 0
+    assert sorted(fake_rasterizer) == [24, 32]
+
+    # Writers don't modify the shared rasterizations
+    to_x11(p.frames)
+    to_win(p.frames)
+
+    # Another cursor gets the shared rasterizations, left unmodified
+    q = SVGParser(svg_blob, (0, 0), sizes=["24", "32:48"], cache=cache)
+    assert q.frames[0].images[0].image is img24.image
+    assert q.frames[0].images[1].image is img32.image
+    assert sorted(fake_rasterizer) == [24, 32]
+    assert img24.image.getcolors() == [(24 * 24, (255, 0, 0, 255))]
+
+    lazy = SVGParser(svg_blob, (0, 0), sizes=["32:48"], lazy=True)
+    assert lazy.frames[0].images[0].image.tobytes() == img32.image.tobytes()
@@ -17,6 +17,9 @@ def test_clickgen_all_cursor_build(samples_dir, x11_tmp_dir, hotspot):
                 hotspot_y=hotspot[1],
                 sizes=SIZES,
                 delay=DELAY,
+                pyramid=False,
+                compression="default",
+                dib_max_size=0,
                 platform="all",
             ),
         ):
@@ -35,6 +38,9 @@ def test_clickgen_x11_build(samples_dir, x11_tmp_dir, hotspot):
                 hotspot_y=hotspot[1],
                 sizes=SIZES,
                 delay=DELAY,
+                pyramid=False,
+                compression="default",
+                dib_max_size=0,
                 platform="x11",
             ),
         ):
@@ -53,6 +59,9 @@ def test_clickgen_windows_build(samples_dir, x11_tmp_dir, hotspot):
                 hotspot_y=hotspot[1],
                 sizes=SIZES,
                 delay=DELAY,
+                pyramid=False,
+                compression="default",
+                dib_max_size=0,
                 platform="windows",
             ),
         ):
@@ -71,6 +80,9 @@ def test_clickgen_raises(capsys, samples_dir, x11_tmp_dir, hotspot):
                 hotspot_y=hotspot[1],
                 sizes=SIZES,
                 delay=DELAY,
+                pyramid=False,
+                compression="default",
+                dib_max_size=0,
                 platform="all",
             ),
         ):
@@ -1,9 +1,13 @@
 import argparse
 import os
 from pathlib import Path
+from typing import List, Optional
 from unittest import mock
 
-from clickgen.scripts.ctgen import cwd, get_kwargs, main
+import pytest
+
+from clickgen.build import TaskGraph
+from clickgen.scripts.ctgen import cwd, get_kwargs, main, schedule_theme
 
 
 def test_get_kwargs():
@@ -13,6 +17,8 @@ def test_get_kwargs():
         "website": "test",
         "platforms": "test",
         "sizes": [10, 10],
+        "compression": "fast",
+        "dib_max_size": 32,
         "bitmaps_dir": "test",
         "out_dir": "test",
     }
@@ -32,6 +38,14 @@ def test_get_kwargs():
         assert res1[i] == v
 
 
+def test_ctgen_negative_jobs(samples_dir, capsys):
+    argv = ["ctgen", str(samples_dir / "sample.toml"), "--jobs", "-1"]
+    with mock.patch("sys.argv", argv):
+        with pytest.raises(SystemExit):
+            main()
+    assert "must not be negative: -1" in capsys.readouterr().err
+
+
 def test_cwd(x11_tmp_dir: Path):
     current_dir = os.getcwd()
     with cwd(x11_tmp_dir):  # type: ignore
@@ -51,6 +65,15 @@ def test_ctgen_file_exception(samples_dir, x11_tmp_dir, capsys):
                 website=None,
                 platforms=["x11"],
                 sizes=None,
+                compression=None,
+                dib_max_size=None,
+                check=False,
+                force=False,
+                jobs=1,
+                max_memory=None,
+                cache=None,
+                cache_max_size=None,
+                cache_max_age=None,
                 bitmaps_dir=None,
                 out_dir=x11_tmp_dir,
             ),
@@ -72,6 +95,15 @@ def test_ctgen_with_x11_platform(samples_dir, x11_tmp_dir):
                 website=None,
                 platforms=["x11"],
                 sizes=None,
+                compression=None,
+                dib_max_size=None,
+                check=False,
+                force=False,
+                jobs=1,
+                max_memory=None,
+                cache=None,
+                cache_max_size=None,
+                cache_max_age=None,
                 bitmaps_dir=None,
                 out_dir=x11_tmp_dir,
             ),
@@ -91,8 +123,147 @@ def test_ctgen_with_windows_platform(samples_dir, win_cur_tmp_dir: Path):
                 website=None,
                 platforms=["windows"],
                 sizes=None,
+                compression=None,
+                dib_max_size=None,
+                check=False,
+                force=False,
+                jobs=1,
+                max_memory=None,
+                cache=None,
+                cache_max_size=None,
+                cache_max_age=None,
                 bitmaps_dir=None,
                 out_dir=win_cur_tmp_dir,
             ),
         ):
             main()
+
+
+def test_ctgen_check(samples_dir, tmp_path: Path, capsys):
+    def run(fp: Path, sizes: Optional[List[str]] = None) -> None:
+        with open(fp, "rb") as f, open(samples_dir / "sample.json", "rb") as g:
+            with mock.patch(
+                "argparse.ArgumentParser.parse_args",
+                return_value=argparse.Namespace(
+                    files=[f, g],
+                    name=None,
+                    comment=None,
+                    website=None,
+                    platforms=None,
+                    sizes=sizes,
+                    compression=None,
+                    dib_max_size=None,
+                    check=True,
+                    force=False,
+                    jobs=1,
+                    max_memory=None,
+                    cache=None,
+                    cache_max_size=None,
+                    cache_max_age=None,
+                    bitmaps_dir=None,
+                    out_dir=tmp_path,
+                ),
+            ):
+                main()
+
+    run(samples_dir / "sample.toml")
+    assert "Cursors: 15" in capsys.readouterr().out
+    assert not any(tmp_path.iterdir())
+
+    with pytest.raises(SystemExit):
+        run(samples_dir / "pngs/pointer.png")
+    assert "pointer.png" in capsys.readouterr().err
+
+    # Invalid sizes are reported, and the other files still checked
+    with pytest.raises(SystemExit):
+        run(samples_dir / "sample.toml", sizes=["abc"])
+    err = capsys.readouterr().err
+    assert "sample.toml" in err and "sample.json" in err
+
+
+def test_ctgen_incremental_build(samples_dir, tmp_path: Path, capsys):
+    bitmaps_dir = tmp_path / "bitmaps"
+    bitmaps_dir.mkdir()
+    for png in (samples_dir / "pngs").glob("*.png"):
+        (bitmaps_dir / png.name).write_bytes(png.read_bytes())
+    out_dir = tmp_path / "out"
+
+    def run(**kwargs) -> str:
+        fp = samples_dir / "sample.toml"
+        with open(fp, "rb") as f:
+            with mock.patch(
+                "argparse.ArgumentParser.parse_args",
+                return_value=argparse.Namespace(
+                    files=[f],
+                    name=None,
+                    comment=None,
+                    website=None,
+                    platforms=None,
+                    sizes=kwargs.get("sizes"),
+                    compression=None,
+                    dib_max_size=None,
+                    check=False,
+                    force=kwargs.get("force", False),
+                    jobs=kwargs.get("jobs", 1),
+                    max_memory=kwargs.get("max_memory"),
+                    cache=kwargs.get("cache"),
+                    cache_max_size=None,
+                    cache_max_age=None,
+                    bitmaps_dir=bitmaps_dir,
+                    out_dir=out_dir,
+                ),
+            ):
+                main()
+        captured = capsys.readouterr()
+        assert captured.err == ""
+        return captured.out
+
+    assert "Unchanged" not in run()
+    cursors = out_dir / "Sample/cursors"
+    built = {p: p.read_bytes() for p in cursors.iterdir() if not p.is_symlink()}
+
+    # Nothing changed, existing files and symlinks are kept
+    out = run()
+    assert "Bitmaping" not in out
+    assert out.count("Unchanged") == 30
+
+    # Only the cursors using the edited bitmap are built again
+    wait = bitmaps_dir / "wait-001.png"
+    wait.write_bytes((bitmaps_dir / "wait-002.png").read_bytes())
+    out = run()
+    assert out.count("Bitmaping") == 4
+    assert os.readlink(cursors / "link1") == "pointer1"
+
+    # Every cursor is built again with '--force' and when settings change
+    assert "Unchanged" not in run(force=True)
+    assert "Unchanged" not in run(sizes=["32"])
+    assert {p: p.read_bytes() for p in built} != built
+
+    # Forced builds reuse the cursors from the artifact cache
+    cache = str(tmp_path / "cache")
+    run(force=True, cache=cache)
+    with mock.patch("clickgen.scripts.ctgen.write_platforms") as m:
+        assert "Hit Rate: 100%" in run(force=True, cache=cache)
+        m.assert_not_called()
+
+    # Cursors rendered in worker processes are the same
+    built = {p: p.read_bytes() for p in cursors.iterdir() if not p.is_symlink()}
+    run(force=True, jobs=2)
+    assert {p: p.read_bytes() for p in built} == built
+    run(force=True, jobs=0)
+    assert {p: p.read_bytes() for p in built} == built
+
+    # A memory budget below any single cursor renders one at a time, and
+    # no more tasks than workers are submitted
+    graph_run = TaskGraph.run
+    with mock.patch.object(TaskGraph, "run", autospec=True, side_effect=graph_run) as m:
+        run(force=True, jobs=2, max_memory=0)
+    assert m.call_args[0][2:] == (2, 0)
+
+    # Workers only drop their caches after every task under a budget
+    with mock.patch("clickgen.scripts.ctgen.schedule_theme", wraps=schedule_theme) as m:
+        run(force=True, jobs=2)
+        assert m.call_args[0][5:] == (True, False)
+        run(force=True, jobs=2, max_memory=0)
+        assert m.call_args[0][5:] == (True, True)
+    assert {p: p.read_bytes() for p in built} == built
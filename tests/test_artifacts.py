@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from clickgen.artifacts import (
+    DirectoryCache,
+    HTTPCache,
+    open_artifact_cache,
+    serve_artifacts,
+)
+
+KEYS = [f"{i:040x}" for i in range(4)]
+
+
+def test_directory_cache(tmp_path: Path):
+    c = DirectoryCache(tmp_path)
+    assert c.get(KEYS[0]) is None
+    c.put(KEYS[0], b"cursor")
+    assert c.get(KEYS[0]) == b"cursor"
+    assert (c.hits, c.misses, c.hit_rate) == (1, 1, 0.5)
+
+    with pytest.raises(ValueError):
+        c.put("../cursor", b"")
+
+
+def test_directory_cache_evict(tmp_path: Path):
+    c = DirectoryCache(tmp_path, max_size=20, max_age=3600)
+    now = time.time()
+    for i, key in enumerate(KEYS):
+        c.put(key, bytes(10))
+        os.utime(c._path(key), (now - i * 1000, now - i * 1000))
+    os.utime(c._path(KEYS[3]), (now - 7200, now - 7200))
+
+    # The expired artifact, then the least recently used one
+    assert c.evict() == 2
+    assert [c.get(k) is not None for k in KEYS] == [True, True, False, False]
+
+
+def test_http_cache(tmp_path: Path):
+    server = serve_artifacts(tmp_path, port=0)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        c = open_artifact_cache(f"http://{host}:{port}/")
+        assert isinstance(c, HTTPCache)
+
+        assert c.get(KEYS[0]) is None
+        c.put(KEYS[0], b"cursor")
+        assert c.get(KEYS[0]) == b"cursor"
+        assert (c.hits, c.misses) == (1, 1)
+        assert (tmp_path / KEYS[0][:2] / KEYS[0]).read_bytes() == b"cursor"
+        assert c.get("cursor") is None
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+    # An unreachable server is a miss
+    c.put(KEYS[1], b"cursor")
+    assert c.get(KEYS[1]) is None
@@ -0,0 +1,217 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Dict, List
+
+import attr
+import pytest
+
+from clickgen import build
+from clickgen.build import (
+    BitmapRefs,
+    TaskGraph,
+    group_by_bitmaps,
+    process_pool,
+    render_platform,
+    write_group,
+    write_platform,
+    write_task,
+)
+from clickgen.configparser import parse_config_file, plan_config_file
+from clickgen.parser import ImageCache
+
+
+def test_write_task_pool(samples_dir: Path, tmp_path: Path):
+    fp = samples_dir / "sample.toml"
+    specs = plan_config_file(fp).cursors
+    cursors = parse_config_file(fp).cursors
+
+    with process_pool(2) as executor:
+        futures = [
+            executor.submit(write_task, spec, "windows", tmp_path) for spec in specs
+        ]
+        paths = [f.result() for f in futures]
+    assert [p.read_bytes() for p in paths] == [c.win_cursor for c in cursors]
+
+
+def test_render_platform_raises(samples_dir: Path):
+    spec = plan_config_file(samples_dir / "sample.toml").cursors[0]
+    spec.win_name = None
+    with pytest.raises(ValueError):
+        render_platform(spec, "windows")
+
+
+def test_task_graph_order():
+    graph = TaskGraph()
+    started: List[str] = []
+    for name, cost in [("small", 1), ("large", 3), ("medium", 2)]:
+        graph.add(name, started.append, name, cost=cost)
+    graph.add("pack", started.append, "pack", deps=["small", "large", "medium"])
+    graph.add("first", started.append, "first", cost=10)
+
+    assert len(graph) == 5
+    assert graph.run() == {}
+    assert started == ["first", "large", "medium", "small", "pack"]
+
+    with pytest.raises(ValueError):
+        graph.add("pack", print)
+    with pytest.raises(KeyError):
+        graph.add("other", print, deps=["missing"])
+
+
+def test_task_graph_executor():
+    graph = TaskGraph()
+    results: Dict[int, int] = {}
+    names = [
+        graph.add(i, pow, i, 2, cost=i, then=partial(results.__setitem__, i))
+        for i in range(8)
+    ]
+    total: List[int] = []
+    graph.add(
+        "sum", lambda: total.append(sum(results.values())), deps=names, local=True
+    )
+
+    with ThreadPoolExecutor(2) as executor:
+        assert graph.run(executor, limit=2) == {}
+    assert results == {i: i**2 for i in range(8)}
+    assert total == [140]
+
+
+def test_task_graph_failures():
+    graph = TaskGraph()
+    graph.add("ok", int, "1")
+    graph.add("bad", int, "x")
+    graph.add("pack", print, deps=["ok", "bad"])
+    graph.add("then", int, "1", then=lambda _: int("y"))
+
+    failed = graph.run()
+    assert set(failed) == {"bad", "pack", "then"}
+    assert failed["pack"] is failed["bad"]
+    assert isinstance(failed["then"], ValueError)
+
+
+def test_task_graph_skip():
+    graph = TaskGraph()
+    started: List[str] = []
+    hits: List[str] = []
+    graph.add("fetch", hits.append, "render")
+    graph.add(
+        "render",
+        started.append,
+        "render",
+        deps=["fetch"],
+        then=started.append,
+        skip=partial(hits.__contains__, "render"),
+    )
+    graph.add("pack", started.append, "pack", deps=["render"])
+
+    assert graph.run() == {}
+    assert started == ["pack"]
+
+
+def test_write_platform(samples_dir: Path, tmp_path: Path):
+    spec = plan_config_file(samples_dir / "sample.toml").cursors[0]
+    (tmp_path / "pointer1").symlink_to("missing")
+
+    path = write_platform(spec, "x11", tmp_path)
+    assert path == tmp_path / "pointer1"
+    assert not path.is_symlink()
+    assert path.read_bytes() == render_platform(spec, "x11")
+
+    with process_pool(1) as executor:
+        path = executor.submit(write_task, spec, "windows", tmp_path).result()
+    assert path.read_bytes() == render_platform(spec, "windows")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["Default.cur", "pointer1"]
+
+    # A failed render leaves neither a partial cursor nor a temporary file
+    spec.hotspot = (1000, 1000)
+    with pytest.raises(Exception):
+        write_platform(spec, "x11", tmp_path)
+    spec.win_name = None
+    with pytest.raises(ValueError):
+        write_platform(spec, "windows", tmp_path)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["Default.cur", "pointer1"]
+
+
+def test_bitmap_refs(samples_dir: Path):
+    specs = plan_config_file(samples_dir / "sample.toml").cursors[:2]
+    assert specs[0].bitmaps == specs[1].bitmaps
+
+    refs = BitmapRefs(ImageCache())
+    for spec in specs:
+        refs.acquire(spec)
+    key = specs[0].digests[0]
+    render_platform(specs[0], "x11", refs.cache)
+    assert refs.cache.cached(key, 32, 32)
+
+    refs.release(specs[0])
+    assert refs.cache.cached(key, 32, 32)
+    refs.release(specs[1])
+    assert not refs.cache.cached(key, 32, 32)
+
+
+def test_task_graph_budget():
+    graph = TaskGraph()
+    lock = threading.Lock()
+    running: List[int] = []
+    peaks: List[int] = []
+
+    def task(memory: int) -> None:
+        with lock:
+            running.append(memory)
+            peaks.append(sum(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(memory)
+
+    for i, memory in enumerate([60, 60, 30, 200, 10]):
+        graph.add(i, task, memory, cost=memory, memory=memory)
+
+    with ThreadPoolExecutor(4) as executor:
+        assert graph.run(executor, budget=100) == {}
+    assert sorted(peaks)[-1] == 200
+    assert all(p <= 100 for p in peaks if p != 200)
+    assert len(peaks) == 5
+
+
+def test_write_task_release(samples_dir: Path, tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(build, "_cache", None)
+    monkeypatch.setattr(build, "_entry_cache", None)
+    spec = plan_config_file(samples_dir / "sample.toml").cursors[0]
+    key = spec.digests[0]
+
+    write_task(spec, "windows", tmp_path)
+    assert build._cache is not None and build._cache.cached(key, 32, 32)
+    entry_cache = build._entry_cache
+
+    write_task(spec, "windows", tmp_path, release=True)
+    assert not build._cache.cached(key, 32, 32)
+    assert build._entry_cache is not entry_cache
+
+
+def test_group_by_bitmaps(samples_dir: Path):
+    spec = plan_config_file(samples_dir / "sample.toml").cursors[0]
+    specs = [
+        attr.evolve(spec, name=str(i), digests=digests)
+        for i, digests in enumerate([("a",), ("b",), ("c",), ("a", "b"), ("a",)])
+    ]
+    groups = group_by_bitmaps(specs)
+    assert [[s.name for s in g] for g in groups] == [["0", "1", "3", "4"], ["2"]]
+
+
+def test_write_group(samples_dir: Path, tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(build, "_cache", None)
+    monkeypatch.setattr(build, "_entry_cache", None)
+    specs = plan_config_file(samples_dir / "sample.toml").cursors[:2]
+    assert len(group_by_bitmaps(specs)) == 1
+    key = specs[0].digests[0]
+
+    paths = write_group(specs, "x11", tmp_path)
+    assert [p.read_bytes() for p in paths] == [render_platform(s, "x11") for s in specs]
+    assert build._cache is not None and build._cache.hits > 0
+    assert build._cache.cached(key, 32, 32)
+
+    write_group(specs, "x11", tmp_path, release=True)
+    assert not build._cache.cached(key, 32, 32)
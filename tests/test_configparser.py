@@ -1,9 +1,15 @@
+from io import BytesIO
 from pathlib import Path
+from unittest import mock
 
 import pytest
+import toml
+from PIL import Image
 
+from clickgen.artifacts import DirectoryCache
 from clickgen.configparser import (
     ClickgenConfig,
+    estimate_memory,
     parse_config_file,
     parse_config_section,
     parse_cursors_section,
@@ -11,7 +17,13 @@ from clickgen.configparser import (
     parse_theme_section,
     parse_toml_file,
     parse_yaml_file,
+    plan_config_file,
+    render_cursor,
+    render_plan,
+    write_cursor,
 )
+from clickgen.parser import ImageCache
+from clickgen.writer import EntryCache
 
 td = {"theme": {"name": "test", "comment": "test", "website": "test"}}
 
@@ -194,3 +206,177 @@ def test_parse_cursor_section_handles_png_not_found_exception():
 
     with pytest.raises(FileNotFoundError):
         parse_cursors_section(exp_dd1, c)
+
+
+def test_parse_cursors_section_shares_cache(samples_dir: Path):
+    fp = samples_dir / "sample.toml"
+    d = toml.load(fp)
+    cache = ImageCache()
+    parse_cursors_section(d, parse_config_section(fp, d), cache)
+
+    # 13 cursors share 'pointer.png' and the 'wait' animations share frames
+    assert cache.misses < cache.hits
+
+
+def test_parse_cursors_section_shares_encoded_entries(samples_dir: Path):
+    fp = samples_dir / "sample.toml"
+    d = toml.load(fp)
+    entry_cache = EntryCache()
+    cursors = parse_cursors_section(
+        d, parse_config_section(fp, d), entry_cache=entry_cache, compression="fast"
+    )
+
+    assert entry_cache.misses < entry_cache.hits
+    assert all(c.win_cursor for c in cursors if c.win_cursor_name)
+
+
+def test_parse_cursors_section_validates_before_rendering(samples_dir: Path):
+    d = {
+        "cursors": {
+            "fallback_settings": {"x_hotspot": 10, "y_hotspot": 10},
+            "bitmap1": {"png": "pointer.png", "x11_name": "test"},
+            "bitmap2": {"png": "pointer.png", "x11_name": "test", "x_hotspot": 500},
+        }
+    }
+    c = parse_config_section(samples_dir / "sample.toml", dd2)
+    c.bitmaps_dir = samples_dir / "pngs"
+
+    with mock.patch("clickgen.configparser.open_blob") as m:
+        with pytest.raises(ValueError, match="'pointer.png' in 'bitmap2'"):
+            parse_cursors_section(d, c)
+        m.assert_not_called()
+
+
+def test_parse_cursors_section_source_set(samples_dir: Path, tmp_path: Path):
+    pointer = samples_dir / "pngs/pointer.png"
+    (tmp_path / "pointer@200.png").write_bytes(pointer.read_bytes())
+    with Image.open(pointer) as i:
+        i.resize((32, 32), 1).save(tmp_path / "pointer@32.png")
+
+    d = {
+        "cursors": {
+            "fallback_settings": {"x_hotspot": 100, "y_hotspot": 105},
+            "bitmap1": {
+                "png": ["pointer@32.png", "pointer@200.png"],
+                "win_name": "test",
+                "win_sizes": [32],
+            },
+        }
+    }
+    c = parse_config_section(samples_dir / "sample.toml", dd2)
+    c.bitmaps_dir = tmp_path
+
+    cursor = parse_cursors_section(d, c)[0]
+    assert cursor.win_cursor is not None
+    assert (tmp_path / "pointer@32.png").read_bytes() in cursor.win_cursor
+
+
+def test_parse_cursors_section_non_rgba_x11(samples_dir: Path, tmp_path: Path):
+    with Image.open(samples_dir / "pngs/pointer.png") as i:
+        rgba = i.convert("RGBA")
+    rgba.save(tmp_path / "rgba.png")
+    rgba.convert("RGB").save(tmp_path / "rgb.png")
+    rgba.convert("RGB").convert("RGBA").save(tmp_path / "opaque.png")
+    rgba.convert("P").save(tmp_path / "palette.png")
+
+    def cursor(png: str) -> dict:
+        return {"png": png, "x11_name": png, "x11_sizes": [32, 200]}
+
+    d = {
+        "cursors": {
+            "fallback_settings": {"x_hotspot": 100, "y_hotspot": 105},
+            "rgb": cursor("rgb.png"),
+            "opaque": cursor("opaque.png"),
+            "palette": cursor("palette.png"),
+        }
+    }
+    c = parse_config_section(samples_dir / "sample.toml", dd2)
+    c.bitmaps_dir = tmp_path
+
+    rgb, opaque, palette = parse_cursors_section(d, c)
+    assert rgb.x11_cursor == opaque.x11_cursor
+    assert palette.x11_cursor is not None
+    assert palette.x11_cursor.startswith(b"Xcur")
+
+
+def test_plan_config_file(samples_dir: Path):
+    fp = samples_dir / "sample.toml"
+    with mock.patch("clickgen.configparser.open_blob") as m:
+        plan = plan_config_file(fp)
+        m.assert_not_called()
+
+    assert plan.theme.name == "Sample"
+    assert len(plan.cursors) == 15
+    spec = plan.cursors[0]
+    assert spec.name == "test_pointer1"
+    assert spec.files == [samples_dir / "pngs/pointer.png"]
+    assert spec.hotspot == (53, 36)
+    assert spec.digests == (ImageCache.digest(spec.files[0].read_bytes()),)
+    assert spec.work == 1 * (
+        sum(s**2 for s in [16, 20, 24, 28, 32, 40, 48, 56, 64, 72, 80, 88, 96])
+        + sum(s**2 for s in [32, 32, 48, 64, 96])
+    )
+    assert plan.work == sum(c.work for c in plan.cursors)
+
+    cursor = render_cursor(spec)
+    assert cursor.x11_cursor_name == "pointer1"
+    assert cursor.win_cursor_name == "Default.cur"
+
+    c = render_plan(plan)
+    assert_clickgen_config(c)
+    assert c.cursors == parse_config_file(fp).cursors
+
+
+def test_parse_cursors_section_artifacts(samples_dir: Path, tmp_path: Path):
+    fp = samples_dir / "sample.toml"
+    artifacts = DirectoryCache(tmp_path)
+    cursors = parse_config_file(fp, artifacts=artifacts)
+
+    # Cursors rendered from the same bitmap and settings are shared
+    assert 0 < artifacts.misses < artifacts.hits
+    lookups, misses = artifacts.hits + artifacts.misses, artifacts.misses
+
+    with mock.patch("clickgen.configparser.open_blob") as m:
+        assert parse_config_file(fp, artifacts=artifacts).cursors == cursors.cursors
+        m.assert_not_called()
+    assert artifacts.misses == misses
+    assert artifacts.hits + artifacts.misses == 2 * lookups
+
+
+def test_write_cursor(samples_dir: Path):
+    fp = samples_dir / "sample.toml"
+    specs = plan_config_file(fp).cursors
+
+    for spec, cursor in zip(specs, parse_config_file(fp).cursors):
+        for platform, name, blob in [
+            ("x11", cursor.x11_cursor_name, cursor.x11_cursor),
+            ("windows", cursor.win_cursor_name, cursor.win_cursor),
+        ]:
+            if name is None:
+                with pytest.raises(ValueError):
+                    write_cursor(spec, platform, BytesIO())
+                continue
+
+            out = BytesIO()
+            assert write_cursor(spec, platform, out) == name
+            assert out.getvalue() == blob
+
+    assert specs[0].bitmaps == specs[0].files
+
+
+def test_cursor_spec_memory(samples_dir: Path):
+    spec = plan_config_file(samples_dir / "sample.toml").cursors[0]
+    assert (spec.source_pixels, spec.source_frames) == (200 * 200, 1)
+
+    images = [32, 32, 48, 64, 96]
+    assert spec.platform_memory("windows") == 4 * (
+        200 * 200 + 2 * sum(s**2 for s in images)
+    )
+    spec.lazy = True
+    assert spec.platform_memory("windows") == 4 * (200 * 200 + 2 * 96**2)
+    spec.pyramid = True
+    assert spec.platform_memory("windows") == 4 * (200 * 200 * 4 // 3 + 2 * 96**2)
+    spec.win_name = None
+    assert spec.platform_memory("windows") == 0
+
+    assert estimate_memory(3, ["24:32"], 100) == 3 * 4 * (100 + 2 * 32**2)
@@ -35,3 +35,51 @@ def test_cursor_frame(cursor_frame, cursor_image, images, delay):
         assert isinstance(c, CursorImage)
 
     assert "delay=5" in repr(cursor_frame)
+
+
+def test_lazy_cursor_image(image, hotspot, nominal):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return image
+
+    c = CursorImage(None, hotspot, nominal, loader=loader)
+    assert c.lazy
+    assert not calls
+
+    assert c.image is image
+    assert c.image is image
+    assert len(calls) == 1
+
+    c.release()
+    assert c.image is image
+    assert len(calls) == 2
+
+
+def test_cursor_image_release_keeps_eager_image(cursor_image, image):
+    assert not cursor_image.lazy
+    cursor_image.release()
+    assert cursor_image.image is image
+
+
+def test_cursor_image_raises(hotspot, nominal):
+    with pytest.raises(ValueError):
+        CursorImage(None, hotspot, nominal)
+
+
+def test_cursor_image_size(cursor_image, image, hotspot, nominal):
+    assert cursor_image.size == image.size
+
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return image
+
+    c = CursorImage(None, hotspot, nominal, loader=loader, size=(24, 24))
+    assert c.size == (24, 24)
+    assert not calls
+
+    assert CursorImage(None, hotspot, nominal, loader=loader).size == image.size
+    assert len(calls) == 1
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+from clickgen.configparser import plan_config_file
+from clickgen.manifest import Manifest, cursor_digest, manifest_path
+
+
+def test_cursor_digest(samples_dir: Path, tmp_path: Path):
+    for png in (samples_dir / "pngs").glob("*.png"):
+        (tmp_path / png.name).write_bytes(png.read_bytes())
+    pointer = tmp_path / "pointer.png"
+
+    spec = plan_config_file(samples_dir / "sample.toml", bitmaps_dir=tmp_path).cursors[
+        0
+    ]
+    x11, win = cursor_digest(spec, "x11"), cursor_digest(spec, "windows")
+    assert x11 != win
+
+    # Only the settings of the platform count
+    spec.win_sizes = [32]
+    assert cursor_digest(spec, "x11") == x11
+    assert cursor_digest(spec, "windows") != win
+
+    pointer.write_bytes(pointer.read_bytes() + b"\0")
+    assert cursor_digest(spec, "x11") != x11
+
+
+def test_manifest(tmp_path: Path):
+    path = manifest_path(tmp_path, "Sample")
+    m = Manifest(path)
+    assert m.entries == {}
+
+    key = Manifest.key("x11", "pointer")
+    out = tmp_path / "pointer"
+    out.write_bytes(b"")
+    assert m.update(key, "a", [out]) == []
+    assert m.is_current(key, "a")
+    assert not m.is_current(key, "b")
+    m.save()
+
+    m = Manifest(path)
+    assert m.is_current(key, "a")
+    out.unlink()
+    assert not m.is_current(key, "a")
+
+    assert m.update(key, "b", [tmp_path / "default"]) == [out]
+    assert m.prune("windows", []) == []
+    assert m.prune("x11", ["pointer"]) == []
+    assert m.prune("x11", []) == [tmp_path / "default"]
+    assert m.entries == {}
+
+    path.write_text("{")
+    assert Manifest(path).entries == {}
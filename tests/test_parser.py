@@ -1,6 +1,13 @@
 import pytest
 
-from clickgen.parser import open_blob
+from clickgen.configparser import PROBE_SIZE
+from clickgen.parser import (
+    AnimatedParser,
+    PNGSetParser,
+    open_blob,
+    probe_blobs,
+    validate_blobs,
+)
 
 
 def test_open_blob(blob, dummy_blob, blobs, dummy_blobs, hotspot):
@@ -11,3 +18,51 @@ def test_open_blob(blob, dummy_blob, blobs, dummy_blobs, hotspot):
     open_blob(blobs, hotspot)
     with pytest.raises(Exception):
         open_blob(dummy_blobs, hotspot)
+
+
+def test_open_blob_animated(apng_blob, gif_blob, hotspot):
+    assert isinstance(open_blob(apng_blob, hotspot), AnimatedParser)
+    assert isinstance(open_blob([gif_blob], hotspot), AnimatedParser)
+
+
+def test_open_blob_source_set(source_set, hotspot):
+    assert isinstance(open_blob(source_set, hotspot), PNGSetParser)
+
+
+def test_validate_blobs(blob, gif_blob, hotspot):
+    validate_blobs([blob, blob], hotspot, rgba=True)
+    validate_blobs([gif_blob], hotspot, rgba=True)
+
+    with pytest.raises(ValueError):
+        validate_blobs([gif_blob], (201, 0))
+    with pytest.raises(ValueError):
+        validate_blobs([gif_blob], (0, 201))
+
+
+def test_validate_blobs_source_set(source_set):
+    validate_blobs(source_set, (200, 200), rgba=True)
+
+    with pytest.raises(ValueError):
+        validate_blobs(source_set, (201, 0))
+    with pytest.raises(ValueError):
+        validate_blobs([source_set[0], source_set[1] * 2], (0, 0))
+
+
+def test_validate_blobs_svg(svg_blob):
+    validate_blobs([svg_blob], (200, 200))
+    validate_blobs([svg_blob, svg_blob], (0, 0), rgba=True)
+
+    with pytest.raises(ValueError):
+        validate_blobs([svg_blob], (201, 0))
+    with pytest.raises(ValueError):
+        validate_blobs([svg_blob, svg_blob.replace(b'"200"', b'"100"')], (0, 0))
+
+
+def test_probe_blobs(blob, frame_blobs, apng_blob, gif_blob, source_set, svg_blob):
+    assert probe_blobs([blob]) == (200 * 200, 1)
+    assert probe_blobs(frame_blobs) == (200 * 200, 1)
+    assert probe_blobs([apng_blob]) == (200 * 200, len(frame_blobs))
+    assert probe_blobs([apng_blob[:PROBE_SIZE]]) == (200 * 200, len(frame_blobs))
+    assert probe_blobs([gif_blob]) == (200 * 200, len(frame_blobs))
+    assert probe_blobs(source_set) == (64**2 + 200**2 + 32**2, 1)
+    assert probe_blobs([svg_blob]) == (0, 1)
@@ -1,10 +1,28 @@
+import io
+import struct
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, List
+from unittest import mock
 
+import PIL.Image
 import pytest
 from PIL.Image import Image
 
 from clickgen.cursors import CursorFrame, CursorImage
-from clickgen.writer.windows import to_ani, to_cur, to_win
+from clickgen.parser.png import MultiPNGParser
+from clickgen.writer import windows
+from clickgen.writer.windows import (
+    COMPRESSION_PROFILES,
+    FRAMES_IN_FLIGHT,
+    EntryCache,
+    to_ani,
+    to_cur,
+    to_win,
+    write_ani,
+    write_cur,
+    write_win,
+)
 
 
 def test_windows_cur_writer(cursor_frame, x11_tmp_dir: Path):
@@ -58,6 +76,46 @@ def test_windows_ani_writer(cursor_frame: CursorFrame, x11_tmp_dir: Path):
     assert cfile.is_file()
 
 
+def _ani_chunks(blob: bytes) -> Dict[bytes, List[bytes]]:
+    chunks: Dict[bytes, List[bytes]] = {}
+
+    def walk(start: int, end: int) -> None:
+        while start < end:
+            chunk_id, size = struct.unpack_from("<4sI", blob, start)
+            data = blob[start + 8 : start + 8 + size]
+            if chunk_id in (b"RIFF", b"LIST"):
+                walk(start + 12, start + 8 + size)
+            else:
+                chunks.setdefault(chunk_id, []).append(data)
+            start += 8 + size + (size & 1)
+
+    walk(0, len(blob))
+    return chunks
+
+
+def test_windows_ani_writer_sequence(image: Image, hotspot):
+    def frame(size: int, delay: int) -> CursorFrame:
+        i = image.resize(size=(size, size), resample=3)
+        return CursorFrame([CursorImage(i, hotspot, nominal=32)], delay)
+
+    a, b = frame(32, 10), frame(24, 10)
+    chunks = _ani_chunks(to_ani([a, b, frame(32, 20), a]))
+
+    anih = struct.unpack("<IIIIIIIII", chunks[b"anih"][0])
+    assert anih[1:3] == (2, 4)
+    assert anih[8] == 0x3
+    assert len(chunks[b"icon"]) == 2
+    assert struct.unpack("<4I", chunks[b"seq "][0]) == (0, 1, 0, 0)
+    assert struct.unpack("<4I", chunks[b"rate"][0]) == (20, 20, 40, 20)
+
+    chunks = _ani_chunks(to_ani([a, b]))
+    anih = struct.unpack("<IIIIIIIII", chunks[b"anih"][0])
+    assert anih[1:3] == (2, 2)
+    assert anih[8] == 0x1
+    assert len(chunks[b"icon"]) == 2
+    assert b"seq " not in chunks
+
+
 def test_windows_writer(cursor_frame: CursorFrame, x11_tmp_dir: Path):
     ext, o = to_win([cursor_frame, cursor_frame])
     assert isinstance(o, bytes)
@@ -78,3 +136,149 @@ def test_windows_writer(cursor_frame: CursorFrame, x11_tmp_dir: Path):
     assert cfile1.exists()
     assert cfile1.is_file()
     assert cfile1.suffix == ".cur"
+
+
+def test_windows_writer_lazy_frames(blobs, hotspot):
+    eager = MultiPNGParser(blobs, hotspot, sizes=["24:32", "32"])
+    lazy = MultiPNGParser(blobs, hotspot, sizes=["24:32", "32"], lazy=True)
+
+    assert to_cur(lazy.frames[0]) == to_cur(eager.frames[0])
+    assert to_ani(lazy.frames) == to_ani(eager.frames)
+    for frame in lazy.frames:
+        for cursor in frame:
+            assert cursor._image is None
+
+
+def test_windows_streaming_writers(cursor_frame: CursorFrame, tmp_path: Path):
+    frames = [cursor_frame, cursor_frame]
+
+    # Written after other data, so offsets have to be relative to the file
+    for write, expected in (
+        (write_cur, to_cur(cursor_frame)),
+        (write_ani, to_ani(frames)),
+    ):
+        f = tmp_path / "cursor"
+        with f.open("wb") as fp:
+            fp.write(b"head")
+            arg = frames if write is write_ani else cursor_frame
+            assert write(arg, fp) == len(expected)  # type: ignore
+            fp.write(b"tail")
+        assert f.read_bytes() == b"head" + expected + b"tail"
+
+    with (tmp_path / "cursor").open("wb") as fp:
+        assert write_win([cursor_frame], fp) == ".cur"
+        assert write_win(frames, fp) == ".ani"
+
+
+def test_windows_writer_executor(frame_blobs, hotspot):
+    sizes = ["24:32", "32", "48"]
+    serial = MultiPNGParser(frame_blobs, hotspot, sizes=sizes).frames
+    frames = MultiPNGParser(frame_blobs, hotspot, sizes=sizes, lazy=True).frames
+
+    with ThreadPoolExecutor(4) as executor:
+        assert to_cur(frames[0], executor) == to_cur(serial[0])
+        assert to_ani(frames, executor) == to_ani(serial)
+        # repeated frames, shared through the 'seq ' chunk
+        ping_pong = frames + frames[::-1]
+        assert to_ani(ping_pong, executor) == to_ani(serial + serial[::-1])
+        assert to_win(frames, executor) == to_win(serial)
+
+    for frame in frames:
+        for cursor in frame:
+            assert cursor._image is None
+
+
+def test_windows_ani_writer_frames_in_flight(frame_blobs, hotspot):
+    serial = MultiPNGParser(frame_blobs, hotspot, sizes=[32]).frames
+    frames = MultiPNGParser(frame_blobs, hotspot, sizes=[32], lazy=True).frames
+    assert len(frames) > FRAMES_IN_FLIGHT
+
+    in_flight = [0]
+    peak = [0]
+    encode_frame = windows._encode_frame
+
+    def _encode_frame(*args, **kwargs):
+        entries = encode_frame(*args, **kwargs)
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+
+        def written():
+            yield from entries
+            in_flight[0] -= 1
+
+        return written()
+
+    with ThreadPoolExecutor(4) as executor:
+        with mock.patch.object(windows, "_encode_frame", _encode_frame):
+            assert to_ani(frames, executor) == to_ani(serial)
+    assert peak[0] == FRAMES_IN_FLIGHT
+
+    for frame in frames:
+        for cursor in frame:
+            assert cursor._image is None
+
+
+def test_windows_writer_compression(cursor_frame: CursorFrame):
+    sizes = {c: len(to_cur(cursor_frame, compression=c)) for c in COMPRESSION_PROFILES}
+    assert sizes["max"] <= sizes["default"] <= sizes["fast"]
+
+    with pytest.raises(ValueError):
+        to_cur(cursor_frame, compression="zopfli")
+
+
+def test_windows_writer_entry_cache(cursor_frame: CursorFrame):
+    cache = EntryCache()
+    o = to_cur(cursor_frame, cache=cache)
+    assert o == to_cur(cursor_frame)
+    assert cache.hits + cache.misses == len(cursor_frame)
+    misses = cache.misses
+
+    assert to_cur(cursor_frame, cache=cache) == o
+    assert cache.misses == misses
+
+    # entries are cached per compression profile
+    to_cur(cursor_frame, compression="fast", cache=cache)
+    assert cache.misses == 2 * misses
+
+
+def test_windows_cur_writer_dib_entries(image: Image, hotspot):
+    def cur_image(size: int) -> CursorImage:
+        return CursorImage(image.resize((size, size), 1), hotspot, nominal=size)
+
+    frame = CursorFrame([cur_image(20), cur_image(48)])
+    o = to_cur(frame, dib_max_size=32)
+
+    count = struct.unpack_from("<H", o, 4)[0]
+    entries = [struct.unpack_from("<BBBBHHII", o, 6 + i * 16) for i in range(count)]
+    small, large = (o[e[7] : e[7] + e[6]] for e in entries)
+
+    header = struct.unpack_from("<IiiHHIIiiII", small)
+    assert header[:5] == (40, 32, 64, 1, 32)
+    # BGRA pixels plus a 32-bit aligned 1-bit mask for 32 rows
+    assert len(small) == 40 + 32 * 32 * 4 + 32 * 4
+    assert large.startswith(b"\x89PNG")
+
+    # Pillow decodes the largest entry and only reads bitmaps
+    cur = PIL.Image.open(io.BytesIO(to_cur(CursorFrame([frame[0]]), dib_max_size=32)))
+    expected = PIL.Image.new("RGBA", (32, 32), (0, 0, 0, 0))
+    expected.paste(frame[0].image, (0, 0))
+    assert cur.convert("RGBA").tobytes() == expected.tobytes()
+
+
+def test_windows_cur_writer_passthrough(image: Image, hotspot):
+    o = io.BytesIO()
+    image.resize((32, 32), 1).save(o, "PNG")
+    blob = o.getvalue()
+
+    frame = MultiPNGParser([blob], (10, 10), sizes=[24, 32], lazy=True).frames[0]
+    cur = to_cur(frame, compression="max")
+
+    count = struct.unpack_from("<H", cur, 4)[0]
+    entries = [struct.unpack_from("<BBBBHHII", cur, 6 + i * 16) for i in range(count)]
+    padded, same = (cur[e[7] : e[7] + e[6]] for e in entries)
+    assert same == blob
+    assert padded != blob
+    assert frame[1]._image is None
+
+    # Bitmap entries still need the pixels
+    assert to_cur(frame, dib_max_size=32).count(blob) == 0
@@ -1,7 +1,18 @@
+import io
 import struct
 from typing import Any, List, Tuple
 
-from clickgen.writer.x11 import to_x11
+import numpy as np
+import pytest
+
+from clickgen.cursors import CursorFrame, CursorImage
+from clickgen.parser.png import MultiPNGParser
+from clickgen.writer.x11 import (
+    premultiply_alpha,
+    premultiply_alpha_inplace,
+    to_x11,
+    write_x11,
+)
 
 
 # Helpers
@@ -81,3 +92,81 @@ def test_animated_xcursor_file_formate(cursor_frame):
 
     assert isinstance(blob, bytes)
     assert_xcursor(blob)
+
+
+def test_xcursor_lazy_frames(blobs, hotspot):
+    eager = MultiPNGParser(blobs, hotspot, sizes=[16, 24])
+    lazy = MultiPNGParser(blobs, hotspot, sizes=[16, 24], lazy=True)
+
+    assert to_x11(lazy.frames) == to_x11(eager.frames)
+    for frame in lazy.frames:
+        for cursor in frame:
+            assert cursor._image is None
+
+
+def test_xcursor_shared_chunks(image, hotspot):
+    def frame(delay):
+        return CursorFrame([CursorImage(image, hotspot, 24)], delay=delay)
+
+    TOC_CHUNK = struct.Struct("<III")
+
+    def offsets(blob):
+        count = struct.unpack_from("<I", blob, 12)[0]
+        return [TOC_CHUNK.unpack_from(blob, 16 + i * 12)[2] for i in range(count)]
+
+    single = to_x11([frame(10)])
+    shared = to_x11([frame(10), frame(10), frame(10)])
+    assert_xcursor(shared)
+    assert len(set(offsets(shared))) == 1
+    assert len(shared) == len(single) + 2 * TOC_CHUNK.size
+
+    # the delay is part of the chunk
+    distinct = to_x11([frame(10), frame(20), frame(10)])
+    assert len(set(offsets(distinct))) == 2
+
+
+def test_xcursor_streaming_writer(cursor_frame, blobs, hotspot):
+    fp = io.BytesIO()
+    expected = to_x11([cursor_frame, cursor_frame])
+    assert write_x11([cursor_frame, cursor_frame], fp) == len(expected)
+    assert fp.getvalue() == expected
+
+    lazy = MultiPNGParser(blobs, hotspot, sizes=[16, 24], lazy=True)
+    fp = io.BytesIO()
+    write_x11(lazy.frames, fp)
+    assert fp.getvalue() == to_x11(lazy.frames)
+
+
+def test_xcursor_lazy_frames_without_size(image, hotspot):
+    eager = CursorFrame([CursorImage(image, hotspot, 24)])
+    lazy = CursorFrame([CursorImage(None, hotspot, 24, loader=lambda: image)])
+
+    assert to_x11([lazy, lazy]) == to_x11([eager, eager])
+
+
+def test_xcursor_wrong_size(image, hotspot):
+    cursor = CursorImage(None, hotspot, 24, loader=lambda: image, size=(24, 24))
+
+    with pytest.raises(ValueError):
+        to_x11([CursorFrame([cursor])])
+
+
+def test_premultiply_alpha_exact():
+    c, a = np.divmod(np.arange(256 * 256), 256)
+    pixels = np.stack([c, c, c, a], axis=1).astype(np.uint8)
+
+    out = np.frombuffer(premultiply_alpha(pixels.tobytes()), dtype=np.uint8)
+    out = out.reshape(-1, 4)
+    assert (out[:, :3] == (c * a // 255)[:, None]).all()
+    assert (out[:, 3] == a).all()
+
+
+def test_premultiply_alpha_inplace_blocks():
+    source = np.random.default_rng(0).integers(0, 256, 4 * 1000, dtype=np.uint8)
+    buffer = bytearray(source.tobytes())
+
+    premultiply_alpha_inplace(buffer, block=7)
+    assert bytes(buffer) == premultiply_alpha(source.tobytes())
+    assert bytes(buffer) != source.tobytes()
+
+    premultiply_alpha_inplace(bytearray())